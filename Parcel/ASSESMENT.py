@@ -1,4 +1,5 @@
 import json
+from parcel_system.auth import check_password, hash_password, is_hashed
 
 class User:
     def __init__(self, username, password, role='operator'):
@@ -9,18 +10,24 @@ class User:
 class UserManagementSystem:
     def __init__(self):
         self.users = []
+        self.users_by_name = {}
         self.current_user = None
 
     def login(self, username, password):
-        for user in self.users:
-            if user.username == username and user.password == password:
-                self.current_user = user
-                return True
+        user = self.users_by_name.get(username)
+        if check_password(password, None if user is None else user.password):
+            if not is_hashed(user.password):
+                # Replace the old plaintext password with its hash
+                user.password = hash_password(password)
+                self.save_users_to_file()
+            self.current_user = user
+            return True
         return False
 
-    def add_user(self, username, password, role='operator'):
-        user = User(username, password, role)
+    def add_user(self, username, password, role='operator', hashed=False):
+        user = User(username, password if hashed else hash_password(password), role)
         self.users.append(user)
+        self.users_by_name[username] = user
 
     def assign_admin_role(self, index):
         if 0 <= index < len(self.users):
@@ -36,7 +43,8 @@ class UserManagementSystem:
 
     def delete_user(self, index):
         if 0 <= index < len(self.users):
-            del self.users[index]
+            user = self.users.pop(index)
+            self.users_by_name.pop(user.username, None)
         else:
             print("Invalid user index!")
 
@@ -65,70 +73,75 @@ class UserManagementSystem:
             with open('users.json', 'r') as file:
                 data = json.load(file)
                 for user_data in data:
-                    self.add_user(user_data['username'], user_data['password'], user_data['role'])
+                    self.add_user(user_data['username'], user_data['password'], user_data['role'], hashed=True)
         except FileNotFoundError:
             pass
 
-# Example usage
-system = UserManagementSystem()
-system.load_users_from_file()
-
-# Logging in
-username = input("Enter your username: ")
-password = input("Enter your password: ")
-
-if system.login(username, password):
-    print("Login successful!")
-    if system.current_user.role == 'administrator':
-        print("Welcome, administrator:", system.current_user.username)
-        print("What would you like to do?")
-        print("1. Add user")
-        print("2. Assign administrator role")
-        print("3. Remove administrator role")
-        print("4. Delete user")
-        option = input("Enter the option number: ")
-
-        if option == '1':
-            new_username = input("Enter the username for the new user: ")
-            new_password = input("Enter the password for the new user: ")
-            new_role = input("Enter the role for the new user (default: operator): ")
-            system.add_user(new_username, new_password, new_role)
-            print("User added successfully!")
-            system.save_users_to_file()
-
-        elif option == '2':
-            users = system.get_users_by_role('operator')
-            print("Choose a user to assign as an administrator:")
-            for i, user in enumerate(users):
-                print(f"{i + 1}. {user.username}")
-            user_index = int(input("Enter the user number: ")) - 1
-            system.assign_admin_role(user_index)
-            print("Administrator role assigned successfully!")
-            system.save_users_to_file()
-
-        elif option == '3':
-            users = system.get_users_by_role('administrator')
-            print("Choose a user to remove administrator role:")
-            for i, user in enumerate(users):
-                print(f"{i + 1}. {user.username}")
-            user_index = int(input("Enter the user number: ")) - 1
-            system.remove_admin_role(user_index)
-            print("Administrator role removed successfully!")
-            system.save_users_to_file()
-
-        elif option == '4':
-            print("Choose a user to delete:")
-            for i, user in enumerate(system.users):
-                print(f"{i + 1}. {user.username}")
-            user_index = int(input("Enter the user number: ")) - 1
-            system.delete_user(user_index)
-            print("User deleted successfully!")
-            system.save_users_to_file()
+def main():
+    # Example usage
+    system = UserManagementSystem()
+    system.load_users_from_file()
+
+    # Logging in
+    username = input("Enter your username: ")
+    password = input("Enter your password: ")
+
+    if system.login(username, password):
+        print("Login successful!")
+        if system.current_user.role == 'administrator':
+            print("Welcome, administrator:", system.current_user.username)
+            print("What would you like to do?")
+            print("1. Add user")
+            print("2. Assign administrator role")
+            print("3. Remove administrator role")
+            print("4. Delete user")
+            option = input("Enter the option number: ")
+
+            if option == '1':
+                new_username = input("Enter the username for the new user: ")
+                new_password = input("Enter the password for the new user: ")
+                new_role = input("Enter the role for the new user (default: operator): ")
+                system.add_user(new_username, new_password, new_role)
+                print("User added successfully!")
+                system.save_users_to_file()
+
+            elif option == '2':
+                users = system.get_users_by_role('operator')
+                print("Choose a user to assign as an administrator:")
+                for i, user in enumerate(users):
+                    print(f"{i + 1}. {user.username}")
+                user_index = int(input("Enter the user number: ")) - 1
+                system.assign_admin_role(user_index)
+                print("Administrator role assigned successfully!")
+                system.save_users_to_file()
+
+            elif option == '3':
+                users = system.get_users_by_role('administrator')
+                print("Choose a user to remove administrator role:")
+                for i, user in enumerate(users):
+                    print(f"{i + 1}. {user.username}")
+                user_index = int(input("Enter the user number: ")) - 1
+                system.remove_admin_role(user_index)
+                print("Administrator role removed successfully!")
+                system.save_users_to_file()
+
+            elif option == '4':
+                print("Choose a user to delete:")
+                for i, user in enumerate(system.users):
+                    print(f"{i + 1}. {user.username}")
+                user_index = int(input("Enter the user number: ")) - 1
+                system.delete_user(user_index)
+                print("User deleted successfully!")
+                system.save_users_to_file()
+
+            else:
+                print("Invalid option!")
 
         else:
-            print("Invalid option!")
-
+            print("Welcome, operator:", system.current_user.username)
     else:
-        print("Welcome, operator:", system.current_user.username)
-else:
-    print("Login failed. Invalid username or password.")
\ No newline at end of file
+        print("Login failed. Invalid username or password.")
+
+
+if __name__ == '__main__':
+    main()
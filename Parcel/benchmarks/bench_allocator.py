@@ -0,0 +1,62 @@
+# Compares the old "rescan from 10000000" parcel numbering with the
+# NumberAllocator as the number of stored parcels grows.
+#
+#   python benchmarks/bench_allocator.py
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from parcel_system.numbering import FIRST_NUMBER, allocator_from_records
+
+SIZES = [1000, 10000, 100000, 1000000]
+ALLOCATIONS = 1000
+# The old scan is O(n) per call, so only time it on the smaller sizes
+OLD_SCAN_LIMIT = 10000
+
+
+def make_parcels(count):
+    return [{"parcel_number": f'P{FIRST_NUMBER + i}'} for i in range(count)]
+
+
+def old_generate_unique_parcel_number(system):
+    system["current_parcel_number"] = FIRST_NUMBER
+    while True:
+        parcel_number = system["current_parcel_number"]
+        system["current_parcel_number"] += 1
+        new_parcel_number = f'P{parcel_number}'
+        if not any(parcel["parcel_number"] == new_parcel_number for parcel in system["parcels"]):
+            return new_parcel_number
+
+
+def time_old(parcels, allocations):
+    system = {"parcels": parcels, "current_parcel_number": FIRST_NUMBER}
+    start = time.perf_counter()
+    for _ in range(allocations):
+        system["parcels"].append({"parcel_number": old_generate_unique_parcel_number(system)})
+    return (time.perf_counter() - start) / allocations
+
+
+def time_allocator(parcels, allocations):
+    allocator = allocator_from_records(parcels, "parcel_number", prefix='P')
+    start = time.perf_counter()
+    for _ in range(allocations):
+        allocator.allocate()
+    return (time.perf_counter() - start) / allocations
+
+
+def main():
+    print(f"{'parcels':>10} {'old scan (us)':>15} {'allocator (us)':>15}")
+    for size in SIZES:
+        parcels = make_parcels(size)
+        new = time_allocator(parcels, ALLOCATIONS) * 1e6
+        if size <= OLD_SCAN_LIMIT:
+            old = f'{time_old(parcels, 3) * 1e6:15.1f}'
+        else:
+            old = f"{'skipped':>15}"
+        print(f"{size:>10} {old} {new:15.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+# Booking through ParcelService with bills updated and saved on the
+# booking path (billing=False) against the billing pipeline
+# (parcel_system/billing_pipeline.py), which bills on its own thread in
+# batches grouped by consignment. Reports booking latency, how long the
+# pipeline takes to bill what is still queued, and that every consignment
+# ends up with a bill holding all its parcels.
+#
+#   python benchmarks/bench_billing.py [--parcels 5000] [--threads 8]
+import argparse
+import glob
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+PARCEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, PARCEL_DIR)
+
+ZONES = ['Zone A', 'Zone B', 'Zone C', 'Zone D', 'Zone E']
+
+
+def book(service, customer_id, parcels, latencies):
+    consignment_number = None
+    for i in range(parcels):
+        # A new consignment every few parcels, as the clerks do
+        if i % 4 == 0:
+            consignment_number = None
+        start = time.perf_counter()
+        parcel = service.book_parcel(
+            customer_id, random.choice(ZONES), round(random.uniform(0.2, 8), 2),
+            "Bench", "Bench", "000", consignment_number
+        )
+        latencies.append(time.perf_counter() - start)
+        consignment_number = parcel["consignment_number"]
+
+
+def run(billing, parcels, threads):
+    from parcel_system.service import ParcelService
+
+    with tempfile.TemporaryDirectory() as directory:
+        for path in glob.glob(os.path.join(PARCEL_DIR, '*.json')):
+            shutil.copy(path, directory)
+        os.chdir(directory)
+        service = ParcelService(billing=billing)
+        customer_id = service.add_customer("Bench", "Bench", "000")["id"]
+
+        latencies = []
+        workers = [
+            threading.Thread(target=book, args=(service, customer_id, parcels // threads, latencies))
+            for _ in range(threads)
+        ]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        booked = time.perf_counter() - start
+        service.close()
+        billed = time.perf_counter() - start
+
+        store = service.system["store"]
+        counts = {}
+        for parcel in store.parcels.values():
+            counts[parcel["consignment_number"]] = counts.get(parcel["consignment_number"], 0) + 1
+        complete = all(len(store.get_bill(number)["items"]) == count for number, count in counts.items())
+        os.chdir(PARCEL_DIR)
+    latencies.sort()
+    return latencies, booked, billed, complete
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--parcels', type=int, default=5000)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+    random.seed(6)
+
+    print(f"{args.parcels} parcels booked from {args.threads} threads")
+    print(f"{'billing':>10} {'p50 (ms)':>9} {'p99 (ms)':>9} {'booked (s)':>11} {'billed (s)':>11} {'bills complete':>15}")
+    for name, billing in (("inline", False), ("pipeline", True)):
+        latencies, booked, billed, complete = run(billing, args.parcels, args.threads)
+        p50 = latencies[len(latencies) // 2] * 1e3
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1e3
+        print(f"{name:>10} {p50:9.2f} {p99:9.2f} {booked:11.2f} {billed:11.2f} {str(complete):>15}")
+
+
+if __name__ == '__main__':
+    main()
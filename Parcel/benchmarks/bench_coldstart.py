@@ -0,0 +1,93 @@
+# Cold start of the record store: a fresh process reading parcels.json and
+# bills.json (what load_records did before binary snapshots) against one
+# opening their binary snapshots (see parcel_system/snapshot.py) and one on
+# the SQLite backend, which reads no parcels or bills at start-up (see
+# parcel_system/sqlite_store.py), plus the first lookups after start-up,
+# which is when the snapshot's pages are read, and the peak memory of the
+# process. Each run is a fresh interpreter; the times are measured inside
+# it, so they leave out Python's own start-up. The data files stay in the
+# OS page cache between runs, so disk reads are not part of either.
+#
+#   python benchmarks/bench_coldstart.py [--parcels 100000 1000000]
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_startup import PARCEL_DIR, write_dataset
+
+RUNS = 3
+
+# Prints the seconds to a loaded store, then to the first answers, and the
+# peak memory; the storage backend is its argument
+CHILD = """
+import sys, time
+start = time.perf_counter()
+from parcel_system import storage
+storage.STORAGE_BACKEND = sys.argv[1]
+from parcel_system.system import load_system
+system = load_system()
+store = system["store"]
+loaded = time.perf_counter()
+store.get_parcel("P10000007")["price"]
+store.get_bill("10000007")["total_amount"]
+store.parcels_in_consignment("10000007")
+sum(1 for _ in store.iter_parcels_between("2023-12-25", "2023-12-25"))
+queried = time.perf_counter()
+system["rollups"].total()
+revenue = time.perf_counter() - queried
+# Peak resident memory in KiB, of this process only (ru_maxrss would count
+# the benchmark's own before it started this one)
+peak = next(line.split()[1] for line in open('/proc/self/status') if line.startswith('VmHWM'))
+print(loaded - start, queried - loaded, revenue, peak)
+"""
+
+
+def run_child(directory, backend):
+    env = dict(os.environ, PYTHONPATH=PARCEL_DIR)
+    best = None
+    for _ in range(RUNS):
+        output = subprocess.run([sys.executable, '-c', CHILD, backend], cwd=directory, env=env, check=True, capture_output=True, text=True).stdout
+        times = [float(value) for value in output.split()]
+        best = times if best is None or times[0] < best[0] else best
+    return best
+
+
+def convert(directory, module):
+    env = dict(os.environ, PYTHONPATH=PARCEL_DIR)
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-m', module], cwd=directory, env=env, check=True, capture_output=True)
+    return time.perf_counter() - start
+
+
+def size_of(directory, *names):
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in names) / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--parcels', type=int, nargs='+', default=[100000, 1000000])
+    args = parser.parse_args()
+
+    print(f"{'parcels':>10} {'format':>8} {'files':>10} {'load':>10} {'lookups':>10} {'revenue':>10} {'peak RSS':>10}")
+    formats = [
+        ("json", "json", ("parcels.json", "bills.json"), None),
+        ("binary", "json", ("parcels.json.snap", "bills.json.snap"), "parcel_system.snapshot"),
+        ("sqlite", "sqlite", ("parcel_system.db",), "parcel_system.sqlite_backend"),
+    ]
+    for size in args.parcels:
+        with tempfile.TemporaryDirectory() as directory:
+            write_dataset(directory, size)
+            for name, backend, files, converter in formats:
+                if converter:
+                    seconds = convert(directory, converter)
+                    print(f"{'':>10} {'(convert':>8} {seconds:>9.2f}s)")
+                load, lookups, revenue, peak = run_child(directory, backend)
+                print(f"{size:>10} {name:>8} {size_of(directory, *files):>7.1f}MiB {load * 1e3:>8.1f}ms {lookups * 1e3:>8.1f}ms "
+                      f"{revenue * 1e3:>8.1f}ms {peak / 2 ** 10:>7.0f}MiB")
+
+
+if __name__ == '__main__':
+    main()
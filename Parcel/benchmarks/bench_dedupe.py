@@ -0,0 +1,100 @@
+# Duplicate-customer detection and merging (parcel_system/dedupe.py) on a
+# made-up customer list where some senders were entered again with another
+# telephone format, a typo, their names in another order or a new number.
+# Reports the time to find and merge them, and how many true duplicates
+# were found (recall) and how many of those found were true (precision).
+#
+#   python benchmarks/bench_dedupe.py [--customers 1000000] [--parcels 1000000]
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from parcel_system.columns import ParcelTable
+from parcel_system.dedupe import find_duplicates, merge_customers
+from parcel_system.store import ParcelStore
+
+FIRST = ["Ahmad", "Siti", "Nur", "Muhammad", "Aisyah", "Farah", "Hafiz", "Mei Ling", "Wei Jie", "Kavitha", "Arjun", "Priya"]
+LAST = ["Abdullah", "Ibrahim", "Tan", "Lim", "Ng", "Ong", "Ismail", "Yusof", "Chan", "Subramaniam", "Rahman", "Goh"]
+DUPLICATE_SHARE = 0.1
+
+
+def variant(customer, customer_id):
+    name, telephone = customer["name"], customer["telephone"]
+    kind = random.randrange(4)
+    if kind == 0:
+        telephone = f"+6{telephone[:3]}-{telephone[3:]}"
+    elif kind == 1:
+        position = random.randrange(1, len(name))
+        name = name[:position] + random.choice("aeiou") + name[position + 1:]
+    elif kind == 2:
+        words = name.split()
+        name = ' '.join(words[1:] + words[:1]).upper()
+    else:
+        telephone = f"01{random.randrange(10 ** 8):08d}"
+    return {"id": customer_id, "name": name, "address": customer["address"], "telephone": telephone}
+
+
+def make_customers(count):
+    customers, truth = [], {}
+    for customer_id in range(1, count + 1):
+        if customers and random.random() < DUPLICATE_SHARE:
+            original = random.choice(customers)
+            truth[customer_id] = truth.get(original["id"], original["id"])
+            customers.append(variant(original, customer_id))
+        else:
+            name = f"{random.choice(FIRST)} {random.choice(FIRST)} {random.choice(LAST)}"
+            address = f"{random.randrange(1, 200)} Jalan {random.choice(LAST)} {random.randrange(1, 30)}, {random.randrange(10000, 99999)}"
+            customers.append({"id": customer_id, "name": name, "address": address, "telephone": f"01{random.randrange(10 ** 8):08d}"})
+    return customers, truth
+
+
+def make_parcels(count, customers):
+    return [{
+        "consignment_number": f'{10000000 + i}', "parcel_number": f'P{10000000 + i}',
+        "customer_id": random.randrange(1, customers + 1), "destination": "Zone A", "weight": 2.5,
+        "sender_name": "Sender", "sender_address": "Address", "sender_telephone": "0123456789",
+        "price": "RM16.00", "date": "2023-12-25"
+    } for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--customers', type=int, default=1000000)
+    parser.add_argument('--parcels', type=int, default=1000000)
+    args = parser.parse_args()
+    random.seed(4)
+
+    customers, truth = make_customers(args.customers)
+    store = ParcelStore()
+    for customer in customers:
+        store.add_customer(customer)
+    store.load_parcels(ParcelTable.from_records(make_parcels(args.parcels, args.customers)))
+    store.take_changes("customers")
+
+    start = time.perf_counter()
+    mapping = find_duplicates(store.customers.values())
+    found = time.perf_counter() - start
+
+    # A true duplicate is recalled when it ends up with its original; a
+    # found one is correct when it was entered for the one it merges into
+    truth_of = lambda customer_id: truth.get(customer_id, customer_id)
+    merged_into = lambda customer_id: mapping.get(customer_id, customer_id)
+    correct = sum(truth_of(duplicate) == truth_of(keep) for duplicate, keep in mapping.items())
+    recalled = sum(merged_into(duplicate) == merged_into(original) for duplicate, original in truth.items())
+
+    start = time.perf_counter()
+    moved = merge_customers({"store": store}, mapping)
+    merged = time.perf_counter() - start
+
+    print(f"{args.customers} customers, {len(truth)} true duplicates, {args.parcels} parcels")
+    print(f"found {len(mapping)} duplicates in {found:.1f}s "
+          f"(precision {correct / max(len(mapping), 1):.1%}, recall {recalled / max(len(truth), 1):.1%})")
+    print(f"merged them in {merged:.1f}s, moving {moved} parcels")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+# Month-end invoicing (parcel_system/invoicing.py) on a made-up month of
+# parcels: the one-pass partition by customer, then rendering one invoice
+# file per customer with 1, 2, 4... worker processes. Reports parcels
+# invoiced per second and the speed-up over one process; the speed-up can
+# only follow the number of cores the machine has.
+#
+#   python benchmarks/bench_invoicing.py [--parcels 1000000] [--customers 50000] [--workers 1 2 4]
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from parcel_system.columns import ParcelTable
+from parcel_system.invoicing import partition_month, write_invoices
+from parcel_system.store import ParcelStore
+
+MONTH = "2023-12"
+ZONES = ['Zone A', 'Zone B', 'Zone C', 'Zone D', 'Zone E']
+
+
+def make_parcels(count, customers):
+    return [{
+        "consignment_number": f'{10000000 + i // 4}', "parcel_number": f'P{10000000 + i}',
+        "customer_id": random.randrange(1, customers + 1), "destination": random.choice(ZONES),
+        "weight": round(random.uniform(0.2, 8), 2), "sender_name": "Sender", "sender_address": "Address",
+        "sender_telephone": "0123456789", "price": f"RM{random.randrange(800, 4000) / 100:.2f}",
+        # November's parcels are left out of the December invoices
+        "date": f"2023-{12 - i % 8 // 7}-{1 + i % 28:02d}"
+    } for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--parcels', type=int, default=1000000)
+    parser.add_argument('--customers', type=int, default=50000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+    random.seed(7)
+
+    store = ParcelStore()
+    for customer_id in range(1, args.customers + 1):
+        store.add_customer({
+            "id": customer_id, "name": f"Customer {customer_id}", "address": f"{customer_id} Jalan Bench",
+            "telephone": f"01{customer_id:08d}"
+        })
+    store.load_parcels(ParcelTable.from_records(make_parcels(args.parcels, args.customers)))
+
+    start = time.perf_counter()
+    invoices = partition_month(store, MONTH)
+    partitioned = time.perf_counter() - start
+    parcels = sum(len(lines) for _, lines in invoices)
+    print(f"{args.parcels} parcels, {parcels} in {MONTH} for {len(invoices)} customers "
+          f"({os.cpu_count()} cores here)")
+    print(f"partition by customer: {partitioned:.2f}s")
+
+    print(f"{'workers':>7} {'time (s)':>9} {'parcels/s':>10} {'speed-up':>9}")
+    single = None
+    for workers in args.workers:
+        with tempfile.TemporaryDirectory() as directory:
+            start = time.perf_counter()
+            summaries = write_invoices(store, MONTH, directory, workers)
+            elapsed = time.perf_counter() - start
+            assert len(os.listdir(directory)) == len(summaries) + 1
+        single = single or elapsed
+        print(f"{workers:7} {elapsed:9.2f} {parcels / elapsed:10.0f} {single / elapsed:8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+# Login latency with 10k users: the old linear scan over plaintext records
+# against the hashed UserRegistry, cold (full key derivation) and from the
+# verified-credential cache.
+#
+#   python benchmarks/bench_login.py
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from parcel_system.auth import HASH_ITERATIONS, UserRegistry, hash_password
+
+USERS = 10000
+# Hashing 10k real passwords would take minutes; the benchmark users get a
+# cheap hash, and only the user that logs in gets the full cost
+SETUP_ITERATIONS = 1000
+
+
+def old_login(users, username, password):
+    for user in users:
+        if user["username"] == username and user["password"] == password:
+            return user
+    return None
+
+
+def timed(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat * 1e3
+
+
+def main():
+    plain = [{"username": f'user{i}', "password": f'pw{i}', "role": "operator"} for i in range(USERS)]
+    hashed = [dict(user, password=hash_password(user["password"], SETUP_ITERATIONS)) for user in plain]
+    last = f'user{USERS - 1}'
+    hashed[-1]["password"] = hash_password(f'pw{USERS - 1}')
+    registry = UserRegistry(hashed)
+
+    print(f"{USERS} users, {HASH_ITERATIONS} PBKDF2 iterations")
+    print(f"old plaintext scan (last user): {timed(lambda: old_login(plain, last, f'pw{USERS - 1}'), 50):8.3f} ms")
+
+    def cold_login():
+        registry.cache.forget(last)
+        assert registry.authenticate(last, f'pw{USERS - 1}')[0]
+
+    print(f"hashed login, cold:             {timed(cold_login, 5):8.3f} ms")
+    registry.authenticate(last, f'pw{USERS - 1}')
+    print(f"hashed login, cached:           {timed(lambda: registry.authenticate(last, f'pw{USERS - 1}'), 1000):8.3f} ms")
+    print(f"unknown user:                   {timed(lambda: registry.authenticate('nobody', 'x'), 5):8.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
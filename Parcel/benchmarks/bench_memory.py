@@ -0,0 +1,115 @@
+# Memory held by the parcel history: one dict per parcel (how the parcels
+# file loads, and how the store kept them before the columnar table)
+# against columns.ParcelTable, and the whole ParcelStore with its indexes.
+# The parcels are made up but shaped like real ones: fresh strings per
+# parcel (as json.load gives them), a few thousand repeat senders, 1-3
+# parcels a consignment, two years of dates in booking order. Each layout
+# is built in a fresh process and measured by its resident memory.
+#
+#   python benchmarks/bench_memory.py [--parcels 1000000]
+import argparse
+import gc
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from parcel_system.columns import ParcelTable
+from parcel_system.store import ParcelStore
+
+ZONES = ['Zone A', 'Zone B', 'Zone C', 'Zone D', 'Zone E']
+PRICES = ['RM8.00', 'RM9.00', 'RM12.00', 'RM16.00', 'RM18.00', 'RM20.00', 'RM24.00', 'RM30.00']
+SENDERS = 5000
+
+
+def iter_parcels(count):
+    random.seed(1)
+    consignment = 10000000
+    first_day = date(2023, 1, 1).toordinal()
+    for i in range(count):
+        if random.random() < 0.6:
+            consignment += 1
+        sender = random.randrange(SENDERS)
+        number = 10000000 + i
+        # ''.join makes a new string object each time, like json.load does
+        yield {
+            "consignment_number": ''.join(str(consignment)),
+            "parcel_number": ''.join(('P', str(number))),
+            "customer_id": random.randrange(1, 10001),
+            "destination": ''.join(random.choice(ZONES)),
+            "weight": round(random.uniform(0.1, 20), 2),
+            "sender_name": ''.join(('Sender ', str(sender))),
+            "sender_address": ''.join((str(sender), ' Jalan Bukit Bintang')),
+            "sender_telephone": ''.join(('01', str(sender * 7919 % 100000000).zfill(8))),
+            "price": ''.join(random.choice(PRICES)),
+            "date": date.fromordinal(first_day + i * 730 // count).isoformat(),
+        }
+
+
+def load_dicts(count):
+    return list(iter_parcels(count))
+
+
+def load_table(count):
+    table = ParcelTable()
+    for parcel in iter_parcels(count):
+        table.add(parcel)
+    return table
+
+
+def load_store(count):
+    store = ParcelStore()
+    for parcel in iter_parcels(count):
+        store.add_parcel(parcel)
+    store.take_changes("parcels")
+    return store
+
+
+def resident_memory():
+    # Bytes currently resident (Linux), else the peak so far
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def build(load, count, results):
+    gc.collect()
+    before = resident_memory()
+    start = time.perf_counter()
+    held = load(count)
+    seconds = time.perf_counter() - start
+    gc.collect()
+    results.put((resident_memory() - before, seconds))
+    del held
+
+
+def measure(load, count):
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=build, args=(load, count, results))
+    process.start()
+    memory, seconds = results.get()
+    process.join()
+    return memory, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--parcels', type=int, default=1000000)
+    args = parser.parse_args()
+
+    print(f"{args.parcels:,} parcels")
+    print(f"{'':<28}{'memory':>12}{'per parcel':>12}{'build':>10}")
+    for name, load in [("list of dicts", load_dicts), ("ParcelTable", load_table), ("ParcelStore (with indexes)", load_store)]:
+        memory, seconds = measure(load, args.parcels)
+        print(f"{name:<28}{memory / 2 ** 20:>9.0f}MiB{memory / args.parcels:>10.0f} B{seconds:>9.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+# Bill totals (parcel_system/money.py) on a made-up set of bills: totalled
+# the old way, adding ringgit floats per item and taking 0.08 of that, then
+# re-totalled in integer sen by the consistency check, once with a Python
+# sum per bill and once with numpy's integer sums over every item at once.
+# Reports the time of each and how many bills the float totals get wrong.
+#
+#   python benchmarks/bench_money.py [--bills 500000]
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from parcel_system import pricing_engine
+from parcel_system.money import mismatched_totals, money_fields
+
+PRICES = [800, 900, 1000, 1100, 1200, 1600, 1800, 2000, 2200, 2400, 2600, 1850, 2715]
+
+
+def make_bills(count):
+    bills = []
+    for _ in range(count):
+        items = [{"price": random.choice(PRICES) / 100} for _ in range(random.randint(1, 8))]
+        bill = {"items": items}
+        bill.update(money_fields(sum(round(item["price"] * 100) for item in items)))
+        bills.append(bill)
+    return bills
+
+
+def float_totals(bills):
+    # What generate_bill used to store
+    drifted = 0
+    for bill in bills:
+        total_amount = sum(item["price"] for item in bill["items"])
+        service_tax = total_amount * 0.08
+        if (total_amount, service_tax, total_amount + service_tax) != (
+                bill["total_amount"], bill["service_tax"], bill["total_amount_with_tax"]):
+            drifted += 1
+    return drifted
+
+
+def check(bills):
+    return mismatched_totals(
+        [item["price"] for bill in bills for item in bill["items"]],
+        [len(bill["items"]) for bill in bills],
+        [(bill["total_amount"], bill["service_tax"], bill["total_amount_with_tax"]) for bill in bills]
+    )
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--bills', type=int, default=500000)
+    args = parser.parse_args()
+    random.seed(8)
+
+    bills = make_bills(args.bills)
+    items = sum(len(bill["items"]) for bill in bills)
+    print(f"{args.bills} bills, {items} items")
+
+    drifted, floats = timed(float_totals, bills)
+    print(f"float totals per bill: {floats:.2f}s, {drifted} bills not matching the exact totals")
+
+    if pricing_engine.load_numpy():
+        wrong, vectorized = timed(check, bills)
+        print(f"integer sen, numpy:    {vectorized:.2f}s, {len(wrong)} bills not matching")
+    pricing_engine.numpy = None
+    wrong, python = timed(check, bills)
+    print(f"integer sen, Python:   {python:.2f}s, {len(wrong)} bills not matching")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+# Compares per-operation write latency of the old save_parcels_to_file
+# (json.dump of the whole dataset) with appending to the parcels journal.
+#
+#   python benchmarks/bench_persistence.py
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from parcel_system.journal import JournaledFile
+
+SIZES = [10000, 100000, 1000000]
+JOURNAL_OPS = 200
+
+
+def make_parcel(i):
+    return {
+        "consignment_number": f'{10000000 + i}',
+        "parcel_number": f'P{10000000 + i}',
+        "customer_id": i % 1000 + 1,
+        "destination": "Zone A",
+        "weight": 2.5,
+        "sender_name": "Sender",
+        "sender_address": "Address",
+        "sender_telephone": "0123456789",
+        "price": "RM16.00",
+        "date": "2023-12-25"
+    }
+
+
+def time_rewrite(path, parcels, ops):
+    start = time.perf_counter()
+    for _ in range(ops):
+        data = {"parcels": parcels, "current_consignment_number": 0, "current_parcel_number": 0}
+        with open(path, 'w') as file:
+            json.dump(data, file)
+    return (time.perf_counter() - start) / ops
+
+
+def time_journal(path, count, ops):
+    journal = JournaledFile(path, "parcels", "parcel_number", compact_every=10 ** 9)
+    start = time.perf_counter()
+    for i in range(ops):
+        parcel = make_parcel(count + i)
+        journal.append({parcel["parcel_number"]: parcel}, {"current_parcel_number": count + i + 1})
+    return (time.perf_counter() - start) / ops
+
+
+def main():
+    print(f"{'parcels':>10} {'full rewrite (ms)':>18} {'journal append (ms)':>20}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in SIZES:
+            parcels = [make_parcel(i) for i in range(size)]
+            rewrite = time_rewrite(os.path.join(directory, 'rewrite.json'), parcels, 3 if size < 1000000 else 1)
+            append = time_journal(os.path.join(directory, f'journal_{size}.json'), size, JOURNAL_OPS)
+            print(f"{size:>10} {rewrite * 1e3:18.2f} {append * 1e3:20.3f}")
+    print("Journal appends are fsync'd; the full rewrite is not, as in the old code.")
+
+
+if __name__ == '__main__':
+    main()
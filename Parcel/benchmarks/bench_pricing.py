@@ -0,0 +1,84 @@
+# Compares quoting with the old check_price (row scan plus string price per
+# parcel) against PricingEngine.quote_many over the same table as a tariff,
+# then check_price with its quote cache against check_price without it
+# (finding today's engine, quoting and formatting every time), for the
+# repeated zone/weight checks of the menus.
+#
+#   python benchmarks/bench_pricing.py
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from parcel_system import pricing
+from parcel_system.pricing_engine import format_price, load_numpy
+from parcel_system.tariff import tariff_from_table
+
+table_price = [
+    ['Zone A', 'RM8.00', 'RM16.00', 'RM18.00'],
+    ['Zone B', 'RM9.00', 'RM18.00', 'RM20.00'],
+    ['Zone C', 'RM10.00', 'RM20.00', 'RM22.00'],
+    ['Zone D', 'RM11.00', 'RM22.00', 'RM24.00'],
+    ['Zone E', 'RM12.00', 'RM24.00', 'RM26.00']
+]
+
+SIZES = [10000, 100000, 1000000]
+CHECKS = 200000
+
+
+def old_check_price(destination, weight):
+    for row in table_price:
+        if row[0] == destination:
+            if weight < 1:
+                return row[1]
+            elif 1 <= weight <= 3:
+                return row[2]
+            else:
+                return row[3]
+    return None
+
+
+def main():
+    random.seed(1)
+    zones = [row[0] for row in table_price]
+    engine = tariff_from_table(table_price).latest().engine()
+    print(f"numpy: {'yes' if load_numpy() else 'no (pure Python fallback)'}")
+    print(f"{'parcels':>10} {'old scan (s)':>14} {'quote_many (s)':>15}")
+    for size in SIZES:
+        destinations = [random.choice(zones) for _ in range(size)]
+        weights = [random.uniform(0.1, 10) for _ in range(size)]
+
+        start = time.perf_counter()
+        old = [float(old_check_price(d, w).replace('RM', '')) for d, w in zip(destinations, weights)]
+        old_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        new = engine.quote_many(destinations, weights)
+        new_time = time.perf_counter() - start
+
+        assert [round(price * 100) for price in old] == list(new)
+        print(f"{size:>10} {old_time:14.3f} {new_time:15.3f}")
+
+    # Menu checks repeat a few weights per zone
+    pricing.pricing_loaded = True
+    pricing.tariff = tariff_from_table(table_price)
+    pricing.invalidate_pricing()
+    checks = [(random.choice(zones), random.choice([0.5, 1, 2, 2.5, 3, 5, 7.5])) for _ in range(CHECKS)]
+    print(f"{'checks':>10} {'uncached (s)':>14} {'check_price (s)':>15} {'hit rate':>9}")
+
+    start = time.perf_counter()
+    uncached = [format_price(pricing.get_pricing_engine().quote(d, w)) for d, w in checks]
+    uncached_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cached = [pricing.check_price(d, w) for d, w in checks]
+    cached_time = time.perf_counter() - start
+
+    assert cached == uncached
+    print(f"{CHECKS:>10} {uncached_time:14.3f} {cached_time:15.3f} {pricing.quote_cache_stats()['hit_rate']:>9.1%}")
+
+
+if __name__ == '__main__':
+    main()
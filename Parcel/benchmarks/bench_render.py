@@ -0,0 +1,95 @@
+# Printing the parcel list: tabulate (which collects every row and measures
+# every cell before printing anything) against the streamed TableWriter,
+# plus the CSV and JSON-Lines exports. Output goes to /dev/null; reports the
+# time to the first row, the total time and the peak memory of each.
+#
+#   python benchmarks/bench_render.py [--parcels 50000]
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from parcel_system.parcels import PARCEL_COLUMNS, PARCEL_FIELDS, parcel_row
+from parcel_system.render import TableWriter, write_csv, write_jsonl
+from parcel_system.store import ParcelStore
+
+
+class FirstWrite:
+    # A /dev/null file that remembers when the first row was written
+    def __init__(self, file, start):
+        self.file = file
+        self.start = start
+        self.first = None
+        self.writes = 0
+
+    def write(self, text):
+        # The header and its rules are the first three writes
+        self.writes += 1
+        if self.first is None and self.writes > 3:
+            self.first = time.perf_counter() - self.start
+        return self.file.write(text)
+
+
+def make_store(size):
+    store = ParcelStore()
+    for i in range(size):
+        number = 10000000 + i
+        store.add_parcel({
+            "consignment_number": f'{number}', "parcel_number": f'P{number}', "customer_id": i % 1000 + 1,
+            "destination": "Zone A", "weight": 2.5, "sender_name": f"Sender {i}", "sender_address": "Address",
+            "sender_telephone": "0123456789", "price": "RM16.00", "date": f"2023-12-{i % 28 + 1:02d}"
+        })
+    return store
+
+
+def run_tabulate(store, out):
+    from tabulate import tabulate
+    rows = [parcel_row(parcel) for parcel in store.parcels.values()]
+    out.write(tabulate(rows, headers=[column.header for column in PARCEL_COLUMNS], tablefmt="grid"))
+    out.first = time.perf_counter() - out.start
+
+
+def run_writer(store, out):
+    TableWriter(PARCEL_COLUMNS, out).write(map(parcel_row, store.parcels.values()))
+
+
+def run_csv(store, out):
+    write_csv(store.parcels.values(), PARCEL_FIELDS, out)
+
+
+def run_jsonl(store, out):
+    write_jsonl(store.parcels.values(), out)
+
+
+def measure(run, store):
+    # Timed without tracemalloc, which slows tabulate down many times over;
+    # the peak memory comes from a second, traced run
+    with open(os.devnull, 'w') as devnull:
+        out = FirstWrite(devnull, time.perf_counter())
+        run(store, out)
+        seconds = time.perf_counter() - out.start
+        tracemalloc.start()
+        run(store, FirstWrite(devnull, time.perf_counter()))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return out.first, seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--parcels', type=int, default=50000)
+    args = parser.parse_args()
+
+    store = make_store(args.parcels)
+    print(f"{args.parcels:,} parcels")
+    print(f"{'':<14}{'first row':>12}{'total':>10}{'peak memory':>14}")
+    for name, run in [("tabulate", run_tabulate), ("TableWriter", run_writer), ("CSV export", run_csv), ("JSONL export", run_jsonl)]:
+        first, seconds, peak = measure(run, store)
+        print(f"{name:<14}{first * 1000:>10.1f}ms{seconds:>9.2f}s{peak / 2 ** 20:>11.1f}MiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+# Customer search (parcel_system/search.py) against scanning every customer,
+# as picking one out of view_customers amounts to. Times building the index
+# at the first search, then prefix, telephone and misspelt-name searches.
+#
+#   python benchmarks/bench_search.py [--customers 200000]
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from parcel_system.search import CustomerSearch, normalize_name
+from parcel_system.store import ParcelStore
+
+FIRST = ["Ahmad", "Siti", "Tan", "Lim", "Wong", "Nur", "Muhammad", "Lee", "Raj", "Kumar", "Aisyah", "Chong", "Farah", "Hafiz"]
+LAST = ["Abdullah", "Ibrahim", "Tan", "Lim", "Ng", "Ong", "Ismail", "Yusof", "Chan", "Subramaniam", "Rahman", "Goh", "Teo"]
+QUERIES = 200
+
+
+def make_store(count):
+    random.seed(2)
+    store = ParcelStore()
+    for customer_id in range(1, count + 1):
+        name = f"{random.choice(FIRST)} {random.choice(LAST)} {random.choice(FIRST)}{customer_id % 997}"
+        store.add_customer({"id": customer_id, "name": name, "address": "Jalan 1", "telephone": f"01{random.randrange(10 ** 8):08d}"})
+    return store
+
+
+def misspell(name):
+    position = random.randrange(len(name))
+    return name[:position] + name[position + 1:]
+
+
+def timed(function, queries):
+    start = time.perf_counter()
+    for query in queries:
+        function(query)
+    return (time.perf_counter() - start) / len(queries) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--customers', type=int, default=200000)
+    args = parser.parse_args()
+
+    store = make_store(args.customers)
+    search = CustomerSearch(store)
+    store.listeners.append(search)
+    customers = list(store.customers.values())
+
+    start = time.perf_counter()
+    search.search("x")
+    print(f"{args.customers} customers, index built in {time.perf_counter() - start:.2f}s")
+
+    picked = random.sample(customers, QUERIES)
+    name_prefixes = [customer["name"][:8] for customer in picked]
+    telephone_prefixes = [customer["telephone"][:7] for customer in picked]
+    misspelt = [misspell(customer["name"]) for customer in picked]
+
+    def scan(query):
+        query = normalize_name(query)
+        return [customer for customer in customers if normalize_name(customer["name"]).startswith(query)][:10]
+
+    found = sum(customer["id"] in [match for match, _ in search.search(query)] for customer, query in zip(picked, misspelt))
+    print(f"{'search':>22} {'index (ms)':>11} {'scan (ms)':>10}")
+    print(f"{'name prefix':>22} {timed(search.search, name_prefixes):11.3f} {timed(scan, name_prefixes[:20]):10.1f}")
+    print(f"{'telephone prefix':>22} {timed(search.search, telephone_prefixes):11.3f}")
+    print(f"{'misspelt full name':>22} {timed(search.search, misspelt):11.3f}")
+    print(f"misspelt names found in the top 10: {found}/{QUERIES}")
+
+    start = time.perf_counter()
+    for customer in picked:
+        store.update_customer(customer["id"], telephone="0" + customer["telephone"])
+    print(f"index kept up to date in {(time.perf_counter() - start) / QUERIES * 1e3:.3f}ms per changed customer")
+
+
+if __name__ == '__main__':
+    main()
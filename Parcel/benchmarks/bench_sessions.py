@@ -0,0 +1,75 @@
+# The session layer (parcel_system/sessions.py): opening sessions, finding
+# a request's session by token, and expiring idle ones with the heap,
+# against scanning every session for expired ones as a list would need.
+#
+#   python benchmarks/bench_sessions.py [--sessions 100000]
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from parcel_system.sessions import SessionManager
+
+LOOKUPS = 200000
+
+
+class Clock:
+    # Time that moves only when told to
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sessions', type=int, default=100000)
+    args = parser.parse_args()
+    random.seed(5)
+
+    clock = Clock()
+    manager = SessionManager(idle_seconds=1800, clock=clock)
+    start = time.perf_counter()
+    tokens = []
+    for i in range(args.sessions):
+        clock.now = i * 0.01
+        tokens.append(manager.open({"username": f"op{i}", "role": "operator"}, client="bench").token)
+    opened = time.perf_counter() - start
+
+    # Requests over the next few minutes use some of them
+    clock.now += 500
+    picked = [random.choice(tokens) for _ in range(LOOKUPS)]
+    start = time.perf_counter()
+    for token in picked:
+        manager.get(token)
+    looked_up = (time.perf_counter() - start) / LOOKUPS * 1e6
+
+    # Half an hour after the last login, the sessions not used since they
+    # opened are due. Lookups go on, each expiring a few of them.
+    clock.now += 1300
+    due = len(manager)
+    start = time.perf_counter()
+    for token in picked:
+        manager.get(token)
+    during = (time.perf_counter() - start) / LOOKUPS * 1e6
+    due -= len(manager)
+
+    # Scanning every session for expired ones instead, as each request
+    # would have to without the heap
+    sessions = list(manager.sessions.values())
+    start = time.perf_counter()
+    [session for session in sessions if session.expires_at <= clock.now]
+    scanned = (time.perf_counter() - start) * 1e3
+
+    print(f"{args.sessions} sessions opened in {opened:.2f}s")
+    print(f"lookup by token: {looked_up:.2f}us")
+    print(f"lookup by token while {due} idle sessions expire: {during:.2f}us, {len(manager)} sessions left")
+    print(f"one scan for expired sessions: {scanned:.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+# Start-up cost against dataset size: importing the package, getting to the
+# login prompt (users file only, as main() does now) and loading every data
+# file up front (what importing All cODE.py used to do). Each step runs in a
+# fresh interpreter, so the times include Python's own start-up.
+#
+#   python benchmarks/bench_startup.py
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+PARCEL_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+SIZES = [0, 10000, 100000, 500000]
+RUNS = 3
+
+STEPS = {
+    "import": "import parcel_system.cli",
+    "login prompt": "from parcel_system.system import load_system\nsystem = load_system()\nsystem['auth']",
+    "eager load": "from parcel_system.system import load_system\nsystem = load_system()\nsystem['auth']\nsystem['store']",
+}
+
+
+def write_dataset(directory, size):
+    parcels, bills = [], []
+    for i in range(size):
+        number = 10000000 + i
+        parcel = {
+            "consignment_number": f'{number}', "parcel_number": f'P{number}', "customer_id": i % 1000 + 1,
+            "destination": "Zone A", "weight": 2.5, "sender_name": "Sender", "sender_address": "Address",
+            "sender_telephone": "0123456789", "price": "RM16.00", "date": "2023-12-25"
+        }
+        parcels.append(parcel)
+        bills.append({
+            "consignment_number": parcel["consignment_number"], "date": "25/12/2023", "customer_name": "Customer",
+            "customer_address": "Address", "customer_telephone": "0123456789",
+            "items": [{"parcel_number": parcel["parcel_number"], "price": 16.0}],
+            "total_amount": 16.0, "service_tax": 1.28, "total_amount_with_tax": 17.28
+        })
+    customers = [{"id": i, "name": "Customer", "address": "Address", "telephone": "0123456789"} for i in range(1, 1001)]
+    files = {
+        "users.json": [{"username": "admin", "password": "admin", "role": "administrator"}],
+        "customers.json": {"customers": customers, "current_customer_id": 1001},
+        "parcels.json": {"parcels": parcels, "current_consignment_number": 10000000 + size, "current_parcel_number": 10000000 + size},
+        "bills.json": {"bills": bills},
+    }
+    for name, data in files.items():
+        with open(os.path.join(directory, name), 'w') as file:
+            json.dump(data, file)
+
+
+def time_step(directory, code):
+    env = dict(os.environ, PYTHONPATH=PARCEL_DIR)
+    best = None
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], cwd=directory, env=env, check=True)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    print(f"{'parcels':>10}" + ''.join(f" {name + ' (ms)':>18}" for name in STEPS))
+    with tempfile.TemporaryDirectory() as directory:
+        for size in SIZES:
+            write_dataset(directory, size)
+            times = [time_step(directory, code) for code in STEPS.values()]
+            print(f"{size:>10}" + ''.join(f" {seconds * 1e3:18.1f}" for seconds in times))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+# Load test for server.py: starts the server on a copy of the data files,
+# then runs many concurrent clients, each logged in with its own session,
+# that quote, book parcels and fetch bills, and reports p50/p99 latency per
+# request type.
+#
+#   python benchmarks/load_test.py [--clients 32] [--requests 200] [--username op --password 123]
+import argparse
+import asyncio
+import glob
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+PARCEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, PARCEL_DIR)
+
+ZONES = ['Zone A', 'Zone B', 'Zone C', 'Zone D', 'Zone E']
+
+
+async def request(reader, writer, method, path, body=None, token=None):
+    data = json.dumps(body).encode() if body is not None else b''
+    authorization = f"Authorization: Bearer {token}\r\n" if token else ''
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n{authorization}Content-Length: {len(data)}\r\n\r\n".encode()
+        + data
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode().partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def client(port, requests, customer_id, credentials, latencies, errors):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    status, session = await request(reader, writer, 'POST', '/sessions', credentials)
+    if status != 201:
+        errors.append(('login', status))
+        writer.close()
+        return
+    token = session["token"]
+    consignments = []
+    for _ in range(requests):
+        choice = random.random()
+        zone, weight = random.choice(ZONES), round(random.uniform(0.2, 8), 2)
+        start = time.perf_counter()
+        if choice < 0.5 or (choice >= 0.8 and not consignments):
+            kind = 'quote'
+            status, _ = await request(reader, writer, 'GET', f"/price?destination={zone.replace(' ', '%20')}&weight={weight}", token=token)
+        elif choice < 0.8:
+            kind = 'book'
+            status, parcel = await request(reader, writer, 'POST', '/parcels', {
+                "customer_id": customer_id, "destination": zone, "weight": weight,
+                "sender_name": "Load Test", "sender_address": "Bench", "sender_telephone": "000"
+            }, token)
+            if status == 201:
+                consignments.append(parcel["consignment_number"])
+        else:
+            kind = 'bill'
+            status, _ = await request(reader, writer, 'GET', f"/bills/{random.choice(consignments)}", token=token)
+        latencies.setdefault(kind, []).append(time.perf_counter() - start)
+        if status >= 400:
+            errors.append((kind, status))
+    writer.close()
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def run_clients(port, clients, requests, customer_id, credentials):
+    latencies, errors = {}, []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, requests, customer_id, credentials, latencies, errors) for _ in range(clients)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--username', default='op', help="an operator in the copied users file")
+    parser.add_argument('--password', default='123')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for path in glob.glob(os.path.join(PARCEL_DIR, '*.json')):
+            shutil.copy(path, directory)
+        os.chdir(directory)
+
+        from parcel_system.server import ParcelServer
+        from parcel_system.service import ParcelService
+
+        service = ParcelService()
+        customer_id = service.add_customer("Load Test", "Bench", "000")["id"]
+        server = ParcelServer(service, port=0)
+        ready = threading.Event()
+        threading.Thread(target=lambda: asyncio.run(server.serve(ready.set)), daemon=True).start()
+        ready.wait()
+
+        latencies, errors, seconds = asyncio.run(run_clients(
+            server.port, args.clients, args.requests, customer_id, {"username": args.username, "password": args.password}
+        ))
+        # Bills whatever is still queued before the files are checked
+        service.close()
+        bills = len(service.system["store"].bills)
+        consignments = len({parcel["consignment_number"] for parcel in service.system["store"].parcels.values()})
+
+    total = sum(len(values) for values in latencies.values())
+    print(f"{args.clients} clients, {total} requests in {seconds:.2f}s ({total / seconds:,.0f} req/s), {len(errors)} errors")
+    print(f"{len(service.system['sessions'])} sessions open, {bills} bills for {consignments} consignments")
+    print(f"{'request':>8} {'count':>7} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+    for kind, values in sorted(latencies.items()):
+        print(f"{kind:>8} {len(values):>7} {percentile(values, 0.5) * 1e3:9.2f} {percentile(values, 0.99) * 1e3:9.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+# Multi-terminal stress test: many processes book parcels (and add
+# customers) against the same data files at once, with a small compaction
+# threshold so compactions race with appends. A reader process keeps
+# syncing meanwhile. Afterwards every booked parcel, bill and customer must
+# be on file exactly once.
+#
+#   python benchmarks/stress_concurrent.py [--processes 16] [--parcels 200]
+import argparse
+import multiprocessing
+import os
+import queue
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+PARCEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, PARCEL_DIR)
+
+from parcel_system.customers import add_customer, save_customers_to_file
+from parcel_system.parcels import add_parcel, save_parcels_to_file
+from parcel_system.billing import save_bills_to_file
+from parcel_system.storage import get_storage
+from parcel_system.sync import sync_system
+from parcel_system.system import load_system
+
+ZONES = ['Zone A', 'Zone B', 'Zone C', 'Zone D', 'Zone E']
+
+
+def open_system(compact_every):
+    system = load_system()
+    system["store"]
+    for name in ("customers", "parcels", "bills"):
+        get_storage(name).compact_every = compact_every
+    return system
+
+
+def writer(directory, worker, parcels, compact_every, results):
+    os.chdir(directory)
+    random.seed(worker)
+    system = open_system(compact_every)
+    customer_id = add_customer(system, f"Terminal {worker}", "Bench", str(worker))
+    save_customers_to_file(system)
+
+    booked = []
+    consignment_number = None
+    for i in range(parcels):
+        # Every few parcels start a new consignment, as the clerks do
+        if i % 4 == 0:
+            consignment_number = None
+        consignment_number, parcel_number = add_parcel(
+            system, customer_id, random.choice(ZONES), round(random.uniform(0.2, 8), 2),
+            f"Sender {worker}", "Bench", str(worker), consignment_number
+        )
+        booked.append((parcel_number, consignment_number))
+        save_parcels_to_file(system)
+        save_bills_to_file(system)
+    results.put((worker, customer_id, booked))
+
+
+def reader(directory, stop, errors):
+    # Never locks; the number of parcels it sees must only ever grow
+    os.chdir(directory)
+    system = open_system(10 ** 9)
+    seen = 0
+    while not stop.is_set():
+        try:
+            sync_system(system)
+        except Exception as error:
+            errors.put(f"reader: {error!r}")
+            return
+        count = len(system["store"].parcels)
+        if count < seen:
+            errors.put(f"reader saw {count} parcels after {seen}")
+            return
+        seen = count
+        time.sleep(0.001)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--processes', type=int, default=16)
+    parser.add_argument('--parcels', type=int, default=200)
+    parser.add_argument('--compact-every', type=int, default=300)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name in ('users.json', 'pricing.json'):
+            shutil.copy(os.path.join(PARCEL_DIR, name), directory)
+
+        results, errors, stop = multiprocessing.Queue(), multiprocessing.Queue(), multiprocessing.Event()
+        watcher = multiprocessing.Process(target=reader, args=(directory, stop, errors))
+        watcher.start()
+        workers = [
+            multiprocessing.Process(target=writer, args=(directory, worker, args.parcels, args.compact_every, results))
+            for worker in range(args.processes)
+        ]
+        start = time.perf_counter()
+        for process in workers:
+            process.start()
+        booked = []
+        while len(booked) < len(workers):
+            try:
+                booked.append(results.get(timeout=1))
+            except queue.Empty:
+                if not any(process.is_alive() for process in workers) and results.empty():
+                    break
+        for process in workers:
+            process.join()
+        seconds = time.perf_counter() - start
+        stop.set()
+        watcher.join()
+
+        os.chdir(directory)
+        system = load_system()
+        store = system["store"]
+        problems = []
+        while not errors.empty():
+            problems.append(errors.get())
+        for process in workers:
+            if process.exitcode:
+                problems.append(f"writer exited with {process.exitcode}")
+
+        expected_parcels = {}
+        customer_ids = set()
+        for worker, customer_id, parcels in booked:
+            if customer_id in customer_ids:
+                problems.append(f"customer ID {customer_id} handed out twice")
+            customer_ids.add(customer_id)
+            if store.get_customer(customer_id) is None or store.get_customer(customer_id)["name"] != f"Terminal {worker}":
+                problems.append(f"customer {customer_id} of terminal {worker} lost")
+            for parcel_number, consignment_number in parcels:
+                if parcel_number in expected_parcels:
+                    problems.append(f"parcel number {parcel_number} handed out twice")
+                expected_parcels[parcel_number] = consignment_number
+
+        for parcel_number, consignment_number in expected_parcels.items():
+            parcel = store.get_parcel(parcel_number)
+            if parcel is None or parcel["consignment_number"] != consignment_number:
+                problems.append(f"parcel {parcel_number} lost")
+        for consignment_number in set(expected_parcels.values()):
+            bill = store.get_bill(consignment_number)
+            expected = sorted(number for number, consignment in expected_parcels.items() if consignment == consignment_number)
+            if bill is None or sorted(item["parcel_number"] for item in bill["items"]) != expected:
+                problems.append(f"bill {consignment_number} does not match its parcels")
+        os.chdir(PARCEL_DIR)
+
+    total = len(expected_parcels)
+    print(f"{args.processes} processes booked {total} parcels in {seconds:.2f}s ({total / seconds:,.0f} parcels/s)")
+    print(f"On file: {len(store.parcels)} parcels, {len(store.bills)} bills, {len(store.customers)} customers")
+    for problem in problems[:20]:
+        print(f"  {problem}")
+    print("FAILED" if problems else "OK: no parcels, bills or customers lost")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == '__main__':
+    main()
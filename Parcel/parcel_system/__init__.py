@@ -0,0 +1,23 @@
+# Parcel intake and billing system.
+#
+#   users      logins, roles and the users file
+#   directory  users by stable ID, per-role sets and the role capabilities table
+#   sessions   token-keyed login sessions with idle expiry and an audit trail
+#   pricing    the pricing table and quotes
+#   tariff     effective-dated zone rates with weight bands and surcharges
+#   customers  customer records
+#   search     customer search by name and telephone
+#   parcels    parcels, consignments and bulk import
+#   billing    bills and billing reports
+#   money      integer-sen money and the service tax policy
+#   invoicing  month-end invoices per customer, rendered on a process pool
+#   dedupe     duplicate-customer detection and merging
+#   system     the system dict, loading each data file on first use
+#   cli        the interactive menus and the list/export commands (main)
+#
+# Importing the package reads no data files and does not import tabulate.
+
+
+def main(argv=None):
+    from .cli import main
+    main(argv)
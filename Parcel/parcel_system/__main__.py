@@ -0,0 +1,4 @@
+# python -m parcel_system
+from .cli import main
+
+main()
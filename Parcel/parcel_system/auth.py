@@ -0,0 +1,136 @@
+import hashlib
+import hmac
+import secrets
+import sys
+import time
+from functools import lru_cache
+
+from .journal import JournaledFile
+
+# PBKDF2-SHA256 rounds for new hashes; raise it as hardware gets faster.
+# Stored hashes keep their own count, so changing this never locks anyone out.
+HASH_ITERATIONS = 600000
+
+# How long a successful login is remembered for quick re-authentication
+CREDENTIAL_CACHE_SECONDS = 15 * 60
+
+HASH_PREFIX = 'pbkdf2_sha256'
+
+
+def hash_password(password, iterations=HASH_ITERATIONS):
+    # Returns "pbkdf2_sha256$<iterations>$<salt hex>$<hash hex>"
+    salt = secrets.token_bytes(16)
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations)
+    return f'{HASH_PREFIX}${iterations}${salt.hex()}${digest.hex()}'
+
+
+def is_hashed(stored):
+    return isinstance(stored, str) and stored.startswith(HASH_PREFIX + '$')
+
+
+def verify_password(password, stored):
+    if not is_hashed(stored):
+        # Plaintext record from before hashing was introduced
+        return hmac.compare_digest(str(stored).encode(), password.encode())
+    _, iterations, salt, expected = stored.split('$')
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode(), bytes.fromhex(salt), int(iterations))
+    return hmac.compare_digest(digest.hex(), expected)
+
+
+@lru_cache(maxsize=4)
+def _dummy_hash(iterations=HASH_ITERATIONS):
+    # Checked for unknown usernames so they take as long as real ones
+    return hash_password('', iterations)
+
+
+def check_password(password, stored, iterations=HASH_ITERATIONS):
+    # stored is None for an unknown username: the password is still checked,
+    # against a dummy hash of the same cost as the users' (iterations), so
+    # the reply takes as long as for a real user
+    if stored is None:
+        verify_password(password, _dummy_hash(iterations))
+        return False
+    return verify_password(password, stored)
+
+
+class CredentialCache:
+    # Remembers recent successful logins as a keyed digest (never the
+    # password itself), so re-entering the same password within the window
+    # skips the slow key derivation
+    def __init__(self, seconds=CREDENTIAL_CACHE_SECONDS):
+        self.seconds = seconds
+        self._key = secrets.token_bytes(32)
+        self._entries = {}  # username -> (digest, expires at)
+
+    def _digest(self, username, password):
+        return hmac.new(self._key, f'{username}\0{password}'.encode(), hashlib.sha256).digest()
+
+    def check(self, username, password):
+        entry = self._entries.get(username)
+        if entry is None:
+            return False
+        digest, expires_at = entry
+        if time.monotonic() > expires_at:
+            # Logins run on many threads at once; another may have dropped it
+            self._entries.pop(username, None)
+            return False
+        return hmac.compare_digest(digest, self._digest(username, password))
+
+    def remember(self, username, password):
+        self._entries[username] = (self._digest(username, password), time.monotonic() + self.seconds)
+
+    def forget(self, username):
+        self._entries.pop(username, None)
+
+
+class UserRegistry:
+    # Users keyed by username. The records are the same dicts as in
+    # system["users"]; their "password" field holds a hash (or, for old
+    # records, plaintext until the user next logs in).
+    def __init__(self, users=(), iterations=HASH_ITERATIONS, cache_seconds=CREDENTIAL_CACHE_SECONDS):
+        self.iterations = iterations
+        self.cache = CredentialCache(cache_seconds)
+        self.by_username = {user["username"]: user for user in users}
+
+    def add(self, user):
+        self.by_username[user["username"]] = user
+        self.cache.forget(user["username"])
+
+    def remove(self, username):
+        self.by_username.pop(username, None)
+        self.cache.forget(username)
+
+    def authenticate(self, username, password):
+        # Returns (user, upgraded). upgraded is True when a plaintext record
+        # was replaced by a hash and needs saving.
+        user = self.by_username.get(username)
+        if user is not None and self.cache.check(username, password):
+            return user, False
+        if not check_password(password, None if user is None else user["password"], self.iterations):
+            return None, False
+
+        upgraded = False
+        if not is_hashed(user["password"]):
+            user["password"] = hash_password(password, self.iterations)
+            upgraded = True
+        self.cache.remember(username, password)
+        return user, upgraded
+
+
+def migrate_plaintext_passwords(users, iterations=HASH_ITERATIONS):
+    # Hashes every plaintext password in place; returns how many changed
+    count = 0
+    for user in users:
+        if not is_hashed(user["password"]):
+            user["password"] = hash_password(user["password"], iterations)
+            count += 1
+    return count
+
+
+if __name__ == '__main__':
+    # One-shot migration of a users file: python -m parcel_system.auth [users.json]
+    users_file = JournaledFile(sys.argv[1] if len(sys.argv) > 1 else 'users.json', None, "username")
+    users = users_file.load()
+    migrated = migrate_plaintext_passwords(users)
+    users_file.compact(users)
+    print(f"Hashed {migrated} plaintext passwords.")
@@ -0,0 +1,307 @@
+import time
+from datetime import datetime
+from itertools import islice
+
+from .money import mismatched_totals, money_fields, ringgit, to_sen
+from .pricing import get_pricing_engine
+from .pricing_engine import parse_price
+from .render import Column, TableWriter, paginate, print_table
+from .reports import BillingReport, REPORT_PAGE_SIZE
+from .storage import get_storage
+from .sync import merge_remote
+
+# Bills re-totalled per pass by check_bills
+CHECK_CHUNK = 100000
+
+# Bill management functions
+
+def generate_bill(system, consignment_number):
+    # Rebuilds the consignment's bill from its parcels, replacing the old one
+    parcels = system["store"].parcels_in_consignment(consignment_number)
+    system["store"].add_bill(build_bill(system, consignment_number, parcels))
+    print("Bill generated successfully!")
+
+def build_bill(system, consignment_number, parcels):
+    bill = new_bill(system, consignment_number, parcels[0]["customer_id"] if parcels else None)
+    total_sen = 0
+    for parcel in parcels:
+        bill["items"].append(bill_item(parcel))
+        total_sen += parse_price(parcel["price"])
+    set_bill_total(bill, total_sen)
+    return bill
+
+def new_bill(system, consignment_number, customer_id):
+    # All parcels in a consignment belong to the same customer
+    customer = system["store"].get_customer(customer_id) or {}
+    return {
+        "consignment_number": consignment_number,
+        "date": datetime.now().strftime("%d/%m/%Y"),
+        "customer_name": customer.get("name"),
+        "customer_address": customer.get("address"),
+        "customer_telephone": customer.get("telephone"),
+        "items": [],
+        "total_amount": 0,
+        "service_tax": 0,
+        "total_amount_with_tax": 0
+    }
+
+def bill_item(parcel):
+    return {
+        "parcel_number": parcel["parcel_number"],
+        "receiver_name": parcel["sender_name"],  # Assuming sender_name is the receiver's name
+        "receiver_address": parcel["sender_address"],  # Assuming sender_address is the receiver's address
+        "receiver_telephone": parcel["sender_telephone"],  # Assuming sender_telephone is the receiver's telephone
+        "destination": parcel["destination"],
+        "weight": parcel["weight"],
+        "price": ringgit(parse_price(parcel["price"]))
+    }
+
+def reprice_bill(bill):
+    # A copy of the bill with its items priced by the tariff in force on the
+    # bill's date (see tariff.py): one bisect for the date, then one quote
+    # per item. Items with no price on that date keep a price of None and
+    # are left out of the totals.
+    engine = get_pricing_engine(bill["date"])
+    repriced = dict(bill, items=[])
+    total_sen = 0
+    for item in bill["items"]:
+        price = engine.quote(item["destination"], item["weight"])
+        repriced["items"].append(dict(item, price=None if price is None else ringgit(price)))
+        total_sen += price or 0
+    set_bill_total(repriced, total_sen)
+    return repriced
+
+def set_bill_total(bill, total_sen):
+    # Sets the bill's total, service tax and total with tax (see money.py)
+    bill.update(money_fields(total_sen))
+
+def add_to_bill(system, parcel):
+    # Adds one parcel to its consignment's bill, adjusting the totals in O(1)
+    # instead of rebuilding the bill from every parcel
+    add_parcels_to_bill(system, [parcel])
+
+def add_parcels_to_bill(system, parcels):
+    # Adds parcels of one consignment to its bill with a single update of
+    # the totals and the store. Prices are read before the bill is touched,
+    # so a parcel that cannot be billed leaves the bill as it was.
+    store = system["store"]
+    first = parcels[0]
+    items = [bill_item(parcel) for parcel in parcels]
+    added_sen = sum(parse_price(parcel["price"]) for parcel in parcels)
+    bill = store.get_bill(first["consignment_number"])
+    if bill is None:
+        bill = new_bill(system, first["consignment_number"], first["customer_id"])
+    bill["items"].extend(items)
+    set_bill_total(bill, to_sen(bill["total_amount"]) + added_sen)
+    store.add_bill(bill)
+
+def remove_from_bill(system, parcel):
+    store = system["store"]
+    bill = store.get_bill(parcel["consignment_number"])
+    if bill is None:
+        return
+    bill["items"] = [item for item in bill["items"] if item["parcel_number"] != parcel["parcel_number"]]
+    if not bill["items"]:
+        store.delete_bill(parcel["consignment_number"])
+        return
+    set_bill_total(bill, to_sen(bill["total_amount"]) - parse_price(parcel["price"]))
+    store.add_bill(bill)
+
+# Fixed column widths for the streamed tables (see render.TableWriter)
+ITEM_COLUMNS = [
+    Column("Parcel Number", 13), Column("Receiver Name", 20), Column("Receiver Address", 28),
+    Column("Receiver Telephone", 18), Column("Destination", 12), Column("Weight", 8, '>'), Column("Price", 10, '>')
+]
+CUSTOMER_BILL_COLUMNS = [Column("Consignment Number", 18)] + ITEM_COLUMNS[:5] + [Column("Weight (KG)", 11, '>'), Column("Price (RM)", 10, '>')]
+DATE_COLUMNS = [
+    Column("Consignment Number", 18), Column("Parcel Number", 13), Column("Destination", 12),
+    Column("Weight", 8, '>'), Column("Price", 10, '>')
+]
+
+# Bill fields written by the CSV export (the JSON-Lines export keeps the items)
+BILL_FIELDS = [
+    "consignment_number", "date", "customer_name", "customer_address", "customer_telephone",
+    "total_amount", "service_tax", "total_amount_with_tax"
+]
+BILL_COLUMNS = [
+    Column("Consignment Number", 18), Column("Date", 10), Column("Customer Name", 24), Column("Customer Address", 28),
+    Column("Customer Telephone", 18), Column("Total Amount", 12, '>'), Column("Service Tax", 11, '>'),
+    Column("Total with Tax", 14, '>')
+]
+
+def bill_row(bill):
+    return [
+        bill["consignment_number"],
+        bill["date"],
+        bill["customer_name"],
+        bill["customer_address"],
+        bill["customer_telephone"],
+        f"{bill['total_amount']:.2f}",
+        f"{bill['service_tax']:.2f}",
+        f"{bill['total_amount_with_tax']:.2f}"
+    ]
+
+def item_row(parcel):
+    return [
+        parcel["parcel_number"],
+        parcel["sender_name"],  # Display sender_name as receiver_name
+        parcel["sender_address"],  # Display sender_address as receiver_address
+        parcel["sender_telephone"],  # Display sender_telephone as receiver_telephone
+        parcel["destination"],
+        parcel["weight"],
+        parcel["price"]
+    ]
+
+def iter_bills(system, since=None):
+    # All bills, or the bills of consignments with parcels dated `since` or
+    # later (found through the parcels' date index)
+    store = system["store"]
+    if not since:
+        return iter(store.bills.values())
+    return _bills_since(store, since)
+
+def _bills_since(store, since):
+    seen = set()
+    for parcel in store.iter_parcels_since(since):
+        consignment_number = parcel["consignment_number"]
+        if consignment_number not in seen:
+            seen.add(consignment_number)
+            bill = store.get_bill(consignment_number)
+            if bill is not None:
+                yield bill
+
+def view_bills(system, since=None, page=None, offset=0, limit=None):
+    if not system["store"].bills:
+        print("No bills available.")
+    else:
+        bills = paginate(iter_bills(system, since), page, offset, limit)
+        TableWriter(BILL_COLUMNS).write(map(bill_row, bills))
+
+def view_bill(system, consignment_number):
+    parcels = system["store"].parcels_in_consignment(consignment_number)
+    TableWriter(ITEM_COLUMNS).write(map(item_row, parcels))
+
+    # Display total amount, service tax, and total amount with tax
+    totals = money_fields(sum(parse_price(parcel["price"]) for parcel in parcels))
+    print(f"Total Amount: RM{totals['total_amount']:.2f}")
+    print(f"Service Tax (8%): RM{totals['service_tax']:.2f}")
+    print(f"Total Amount with Tax: RM{totals['total_amount_with_tax']:.2f}")
+
+def view_bills_by_customer(system, customer_id):
+    rows = (
+        [parcel["consignment_number"]] + item_row(parcel)[:-1] + [ringgit(parse_price(parcel["price"]))]  # Convert the price to a number
+        for parcel in system["store"].parcels_for_customer(customer_id)
+    )
+    TableWriter(CUSTOMER_BILL_COLUMNS).write(rows)
+
+    # Totals come from the revenue rollups instead of being added up again
+    totals = system["rollups"].for_customer(customer_id)
+    print(f"Total Amount: RM{totals['total_amount']:.2f}")
+    print(f"Service Tax (8%): RM{totals['service_tax']:.2f}")
+    print(f"Total Amount with Tax: RM{totals['total_amount_with_tax']:.2f}")
+
+def view_revenue_summary(system):
+    rollups = system["rollups"]
+    headers = ["Destination", "Parcels", "Weight (KG)", "Total Amount", "Service Tax", "Total with Tax"]
+    zone_data = [[
+        zone,
+        totals["parcels"],
+        totals["weight"],
+        f"RM{totals['total_amount']:.2f}",
+        f"RM{totals['service_tax']:.2f}",
+        f"RM{totals['total_amount_with_tax']:.2f}"
+    ] for zone, totals in rollups.zones().items()]
+    print_table(zone_data, headers)
+    overall = rollups.total()
+    print(f"All zones: {overall['parcels']} parcels, RM{overall['total_amount_with_tax']:.2f} with tax")
+    today = datetime.now().strftime("%Y-%m-%d")
+    print(f"Today ({today}): RM{rollups.for_day(today)['total_amount_with_tax']:.2f} with tax")
+
+def view_bills_by_date(system, start_date, end_date, page_size=REPORT_PAGE_SIZE):
+    # Streamed from the date index (on disk with SQLite, see sqlite_store.py)
+    report = BillingReport(system["store"].iter_parcels_between(start_date, end_date))
+    table = TableWriter(DATE_COLUMNS)
+
+    # Print one page at a time instead of one table for the whole range
+    for page_number, page in enumerate(report.pages(page_size), 1):
+        print(f"Page {page_number}")
+        table.write([
+            parcel["consignment_number"],
+            parcel["parcel_number"],
+            parcel["destination"],
+            parcel["weight"],
+            parcel["price"]
+        ] for parcel in page)
+        if len(page) == page_size and input("Press Enter for the next page or 'q' to skip to the totals: ").lower() == 'q':
+            break
+
+    summary = report.summary()
+    print_table([[zone, f"RM{amount:.2f}"] for zone, amount in summary["zones"].items()], ["Destination", "Subtotal"])
+    print(f"Parcels: {summary['parcels']}")
+    print(f"Total Amount: RM{summary['total_amount']:.2f}")
+    print(f"Service Tax (8%): RM{summary['service_tax']:.2f}")
+    print(f"Total Amount with Tax: RM{summary['total_amount_with_tax']:.2f}")
+
+def check_bills(system, fix=False):
+    # Re-totals every stored bill from its items' prices and lists the bills
+    # whose stored totals differ, including float drift left by older
+    # versions (2.4000000000000004). Bills are read CHECK_CHUNK at a time.
+    # With fix, sets those totals right and saves the bills. Returns
+    # [(bill, total in sen from its items), ...] for the bills that differ.
+    bills = iter(system["store"].bills.values())
+    started = time.perf_counter()
+    checked, wrong = 0, []
+    while True:
+        chunk = list(islice(bills, CHECK_CHUNK))
+        if not chunk:
+            break
+        checked += len(chunk)
+        wrong.extend((chunk[index], total_sen) for index, total_sen in mismatched_totals(
+            [item["price"] for bill in chunk for item in bill["items"]],
+            [len(bill["items"]) for bill in chunk],
+            [(bill.get("total_amount"), bill.get("service_tax"), bill.get("total_amount_with_tax")) for bill in chunk]
+        ))
+    print(f"Checked {checked} bills in {time.perf_counter() - started:.2f}s.")
+    if not wrong:
+        print("All bill totals match their items.")
+        return wrong
+    print(f"{len(wrong)} bills have totals that do not match their items:")
+    for bill, total_sen in wrong:
+        right = money_fields(total_sen)
+        print(f"  {bill['consignment_number']}: stored {bill.get('total_amount')} + {bill.get('service_tax')} = "
+              f"{bill.get('total_amount_with_tax')}, items give {right['total_amount']:.2f} + "
+              f"{right['service_tax']:.2f} = {right['total_amount_with_tax']:.2f}")
+    if fix:
+        for bill, total_sen in wrong:
+            set_bill_total(bill, total_sen)
+            system["store"].add_bill(bill)
+        save_bills_to_file(system)
+        print(f"Fixed {len(wrong)} bills.")
+    return wrong
+
+def load_bills_from_file(system):
+    # The binary snapshot when there is one (see load_parcels_from_file)
+    storage = get_storage("bills")
+    store = system["store"]
+    try:
+        loaded = storage.load_binary()
+        if store.database:
+            storage.load_meta()
+        elif loaded:
+            snapshot, records, meta = loaded
+            store.load_bills(snapshot.bills())
+            store.merge("bills", records)
+        else:
+            data = storage.load()
+            store.load_bills({bill["consignment_number"]: bill for bill in data["bills"]})
+        store.take_changes("bills")
+    except FileNotFoundError:
+        pass
+
+def save_bills_to_file(system, compact=False):
+    storage = get_storage("bills")
+    changes = system["store"].take_changes("bills")
+    if compact:
+        storage.compact({"bills": list(system["store"].bills.values())})
+    else:
+        merge_remote(system, "bills", storage.append(changes), written=changes)
@@ -0,0 +1,178 @@
+import atexit
+import json
+import queue
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+
+from .billing import add_parcels_to_bill, remove_from_bill, save_bills_to_file
+
+# Parcels booked but not billed yet; booking waits when this many are
+# queued, so billing falling behind slows bookings instead of using up memory
+MAX_PENDING = 10000
+
+# Parcels billed together, with one save of the bills file
+BATCH_SIZE = 500
+
+# How long the worker waits for more parcels before billing a short batch
+LINGER_SECONDS = 0.02
+
+# Saving a batch's bills is tried this many times, SAVE_RETRY_SECONDS
+# apart, before its parcels are given up on
+SAVE_ATTEMPTS = 3
+SAVE_RETRY_SECONDS = 0.5
+
+# Parcels that could not be billed, one JSON line each with the error. They
+# are saved as parcels; billing.generate_bill rebuilds their bills.
+DEAD_LETTER_FILE = 'unbilled.jsonl'
+
+STOP = None
+
+
+class BillingPipeline:
+    # Bills booked parcels on a worker thread, off the booking path:
+    #   submit   queues a booked parcel (blocking while MAX_PENDING are queued)
+    #   worker   takes up to BATCH_SIZE parcels, groups them by consignment,
+    #            updates each bill once and saves the bills file once
+    #   wait     waits until one consignment's queued parcels are billed
+    #   flush    waits until everything submitted is billed and saved
+    #   close    flushes and stops the worker; also run at interpreter exit
+    # Bills change only while holding lock, the same lock the caller holds
+    # when reading or saving the store. A consignment that cannot be billed,
+    # or a batch whose bills cannot be saved after SAVE_ATTEMPTS (its items
+    # are then taken off the bills again), is written to dead_letter and
+    # reported on standard error; the worker goes on.
+    def __init__(self, system, lock, max_pending=MAX_PENDING, batch_size=BATCH_SIZE, linger=LINGER_SECONDS,
+                 dead_letter=DEAD_LETTER_FILE):
+        self.system = system
+        self.lock = lock
+        self.batch_size = batch_size
+        self.linger = linger
+        self.dead_letter = dead_letter
+        self.queue = queue.Queue(max_pending)
+        self.gate = threading.Lock()  # nothing is queued after STOP
+        self.done = threading.Condition()
+        self.pending = {}  # consignment number -> parcels queued for it
+        self.closed = False
+        self.billed = 0
+        self.batches = 0
+        self.failed = 0
+        self.thread = threading.Thread(target=self._run, name="billing", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def submit(self, parcel):
+        # Never call while holding lock: a full queue waits for the worker,
+        # which needs the lock to drain it
+        with self.gate:
+            if self.closed:
+                raise RuntimeError("The billing pipeline is closed")
+            with self.done:
+                consignment_number = parcel["consignment_number"]
+                self.pending[consignment_number] = self.pending.get(consignment_number, 0) + 1
+            self.queue.put(parcel)
+
+    def wait(self, consignment_number):
+        with self.done:
+            self.done.wait_for(lambda: consignment_number not in self.pending)
+
+    def flush(self):
+        self.queue.join()
+
+    def close(self):
+        with self.gate:
+            if self.closed:
+                return
+            self.closed = True
+            self.queue.put(STOP)
+        self.thread.join()
+        atexit.unregister(self.close)
+
+    def stats(self):
+        return {"pending": self.queue.qsize(), "billed": self.billed, "batches": self.batches, "failed": self.failed}
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = []
+            parcel = self.queue.get()
+            deadline = time.monotonic() + self.linger
+            while True:
+                if parcel is STOP:
+                    stopping = True
+                else:
+                    batch.append(parcel)
+                if stopping or len(batch) >= self.batch_size:
+                    break
+                try:
+                    parcel = self.queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if batch:
+                self._bill(batch)
+                with self.done:
+                    for parcel in batch:
+                        consignment_number = parcel["consignment_number"]
+                        self.pending[consignment_number] -= 1
+                        if not self.pending[consignment_number]:
+                            del self.pending[consignment_number]
+                    self.done.notify_all()
+            # One task_done per item taken, STOP included
+            for _ in range(len(batch) + stopping):
+                self.queue.task_done()
+
+    def _bill(self, batch):
+        consignments = {}
+        for parcel in batch:
+            consignments.setdefault(parcel["consignment_number"], []).append(parcel)
+        store = self.system["store"]
+        billed = []
+        with self.lock:
+            for consignment_number, parcels in consignments.items():
+                try:
+                    add_parcels_to_bill(self.system, parcels)
+                    billed.append(consignment_number)
+                except Exception as error:
+                    self._give_up(parcels, error, traceback.format_exc())
+        for attempt in range(1, SAVE_ATTEMPTS + 1):
+            try:
+                with self.lock:
+                    save_bills_to_file(self.system)
+                break
+            except Exception as error:
+                detail = traceback.format_exc()
+                with self.lock:
+                    if attempt < SAVE_ATTEMPTS:
+                        # The bills stay changed in the store, for the next try
+                        for consignment_number in billed:
+                            store.mark_changed("bills", consignment_number, store.get_bill(consignment_number))
+                    else:
+                        # Take the batch's items off its bills again, so no
+                        # later save bills the parcels given up on here
+                        for consignment_number in billed:
+                            for parcel in consignments[consignment_number]:
+                                remove_from_bill(self.system, parcel)
+                if attempt == SAVE_ATTEMPTS:
+                    self._give_up([parcel for number in billed for parcel in consignments[number]], error, detail)
+                    return
+                time.sleep(SAVE_RETRY_SECONDS)
+        self.billed += sum(len(consignments[number]) for number in billed)
+        self.batches += 1
+
+    def _give_up(self, parcels, error, detail):
+        # detail is the error's formatted traceback
+        self.failed += len(parcels)
+        numbers = sorted({parcel["consignment_number"] for parcel in parcels})
+        print(f"Billing failed for consignments {', '.join(numbers)}: {error!r}. "
+              f"Their parcels were written to {self.dead_letter}.", file=sys.stderr)
+        try:
+            with open(self.dead_letter, 'a') as file:
+                for parcel in parcels:
+                    file.write(json.dumps({
+                        "time": datetime.now().isoformat(timespec="seconds"), "error": detail,
+                        "parcel": dict(parcel.items())
+                    }) + '\n')
+        except OSError as write_error:
+            print(f"Could not write {self.dead_letter}: {write_error}", file=sys.stderr)
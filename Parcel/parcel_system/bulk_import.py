@@ -0,0 +1,96 @@
+import csv
+import json
+import math
+import time
+from datetime import datetime
+from itertools import islice
+
+from .columns import normal_date
+
+# Rows are validated and priced this many at a time
+BATCH_SIZE = 10000
+
+MANIFEST_FIELDS = ["customer_id", "destination", "weight", "sender_name", "sender_address", "sender_telephone"]
+
+
+def iter_manifest(path):
+    # Streams (line number, row) pairs from a CSV file with a header line or
+    # from a JSON-Lines file (.jsonl / .ndjson), one row at a time
+    if path.lower().endswith(('.jsonl', '.ndjson')):
+        with open(path, 'r') as file:
+            for line_number, line in enumerate(file, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_number, json.loads(line)
+                except ValueError:
+                    yield line_number, None
+    else:
+        with open(path, 'r', newline='') as file:
+            for line_number, row in enumerate(csv.DictReader(file), 2):
+                yield line_number, row
+
+
+def iter_batches(rows, size=BATCH_SIZE):
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def validate_row(row, customers, zones):
+    # Returns (cleaned row, None) or (None, reason for rejecting it)
+    if not isinstance(row, dict):
+        return None, "not a valid row"
+    missing = [field for field in MANIFEST_FIELDS if row.get(field) in (None, '')]
+    if missing:
+        return None, f"missing {', '.join(missing)}"
+    try:
+        customer_id = int(row["customer_id"])
+        weight = float(row["weight"])
+    except (TypeError, ValueError):
+        return None, "customer_id and weight must be numbers"
+    if not math.isfinite(weight):
+        return None, "customer_id and weight must be numbers"
+    if customer_id not in customers:
+        return None, f"unknown customer {customer_id}"
+    if not isinstance(row["destination"], str) or row["destination"] not in zones:
+        return None, f"unknown destination {row['destination']}"
+    if not weight > 0:
+        return None, "weight must be above 0"
+
+    # Checked (and written YYYY-MM-DD) the way the store's date index reads
+    # it, so a date that gets in here can always be indexed
+    date = row.get("date") or datetime.now().strftime("%Y-%m-%d")
+    try:
+        date = normal_date(date)
+    except ValueError:
+        return None, f"bad date {date}"
+
+    cleaned = {field: str(row[field]) for field in MANIFEST_FIELDS[3:]}
+    cleaned.update(customer_id=customer_id, destination=row["destination"], weight=weight, date=date)
+    return cleaned, None
+
+
+class ImportReport:
+    def __init__(self):
+        self.accepted = 0
+        self.rejects = []  # (line number, reason)
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+
+    def reject(self, line_number, reason):
+        self.rejects.append((line_number, reason))
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self.started
+
+    def print_summary(self, max_rejects=20):
+        total = self.accepted + len(self.rejects)
+        rate = total / self.seconds if self.seconds else 0
+        print(f"Imported {self.accepted} of {total} rows in {self.seconds:.2f}s ({rate:,.0f} rows/s).")
+        for line_number, reason in self.rejects[:max_rejects]:
+            print(f"  line {line_number}: {reason}")
+        if len(self.rejects) > max_rejects:
+            print(f"  ... and {len(self.rejects) - max_rejects} more rejected rows")
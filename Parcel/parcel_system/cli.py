@@ -0,0 +1,475 @@
+import argparse
+import sys
+
+from .billing import (
+    BILL_FIELDS, check_bills, iter_bills, save_bills_to_file, view_bill, view_bills, view_bills_by_customer, view_bills_by_date,
+    view_revenue_summary
+)
+from .customers import (
+    CUSTOMER_FIELDS, add_customer, delete_customer, iter_customers, modify_customer, save_customers_to_file,
+    view_customer_search, view_customers
+)
+from .parcels import (
+    PARCEL_FIELDS, bulk_import, create_consignment, delete_parcel_within_consignment, iter_parcels, reset_system,
+    save_parcels_to_file, view_parcels
+)
+from .dedupe import dedupe_customers
+from .invoicing import invoice_month
+from .render import write_csv, write_jsonl
+from .pricing import (
+    check_price, delete_price, modify_price, print_pricing_table, save_pricing_to_file, set_zone_rate, zone_rate
+)
+from .tariff import parse_day, sen_to_price
+from .sync import sync_system
+from . import storage
+from .system import load_system
+from .directory import can
+from .users import (
+    add_user, assign_admin_role, delete_users, get_users_by_role, login, logout, remove_admin_role, save_users_to_file
+)
+
+
+# Record types for `list` and `export`: name -> (CSV fields, iterator taking since)
+RECORDS = {
+    "parcels": (PARCEL_FIELDS, iter_parcels),
+    "customers": (CUSTOMER_FIELDS, lambda system, since: iter_customers(system)),
+    "bills": (BILL_FIELDS, iter_bills),
+}
+VIEWS = {
+    "parcels": view_parcels,
+    "customers": lambda system, since, page, offset, limit: view_customers(system, page, offset, limit),
+    "bills": view_bills,
+}
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="parcel_system", description="Without a command, starts the interactive menus.")
+    parser.add_argument("--number-blocks", type=int, default=storage.NUMBER_BLOCK_SIZE, metavar="SIZE",
+                        help="take numbers in blocks of SIZE instead of one at a time")
+    commands = parser.add_subparsers(dest="command")
+
+    list_parser = commands.add_parser("list", help="print a table of records, a page at a time")
+    list_parser.add_argument("records", choices=RECORDS)
+    list_parser.add_argument("--page", type=int, help="1-based page of --limit rows")
+    list_parser.add_argument("--offset", type=int, default=0, help="rows to skip")
+    list_parser.add_argument("--limit", type=int, help="rows to print")
+
+    export_parser = commands.add_parser("export", help="write records as CSV or JSON Lines")
+    export_parser.add_argument("records", choices=RECORDS)
+    export_parser.add_argument("--format", choices=("csv", "jsonl"), default="csv")
+    export_parser.add_argument("--output", help="file to write (default: standard output)")
+
+    # Customers have no date, so --since only narrows parcels and bills
+    for command in (list_parser, export_parser):
+        command.add_argument("--since", help="only parcels (or bills with parcels) dated YYYY-MM-DD or later")
+
+    search_parser = commands.add_parser("search", help="find customers by name (typos allowed) or telephone prefix")
+    search_parser.add_argument("query")
+    search_parser.add_argument("--limit", type=int, default=10, help="matches to print")
+
+    dedupe_parser = commands.add_parser("dedupe", help="find customers entered more than once, and merge them with --apply")
+    dedupe_parser.add_argument("--apply", action="store_true", help="merge each duplicate into the lowest customer ID and save")
+    dedupe_parser.add_argument("--show", type=int, default=10, help="groups of duplicates to print")
+
+    invoice_parser = commands.add_parser("invoice", help="write one invoice per customer for a month's parcels")
+    invoice_parser.add_argument("month", help="YYYY-MM")
+    invoice_parser.add_argument("--out", help="directory for the invoice files (default: invoices/YYYY-MM)")
+    invoice_parser.add_argument("--workers", type=int, help="processes rendering invoices (default: one per core)")
+
+    check_parser = commands.add_parser("check-bills", help="re-total every stored bill from its items")
+    check_parser.add_argument("--fix", action="store_true", help="set the totals that do not match right and save")
+    return parser.parse_args(argv)
+
+
+def run_command(args):
+    system = load_system()
+    if args.command == "search":
+        view_customer_search(system, args.query, args.limit)
+        return
+    if args.command == "dedupe":
+        dedupe_customers(system, args.apply, args.show)
+        return
+    if args.command == "invoice":
+        invoice_month(system, args.month, args.out, args.workers)
+        return
+    if args.command == "check-bills":
+        check_bills(system, args.fix)
+        return
+    if args.command == "list":
+        VIEWS[args.records](system, args.since, args.page, args.offset, args.limit)
+        return
+
+    fields, iterate = RECORDS[args.records]
+    out = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        if args.format == "csv":
+            count = write_csv(iterate(system, args.since), fields, out)
+        else:
+            count = write_jsonl(iterate(system, args.since), out)
+    finally:
+        if args.output:
+            out.close()
+    if args.output:
+        print(f"Exported {count} {args.records} to {args.output}")
+
+
+def print_users(users):
+    for user in users:
+        print(f"{user['id']}. {user['username']} (Role: {user['role']})")
+
+
+def read_user_ids():
+    # One or more user IDs, as listed by print_users
+    answer = input("Enter the user IDs (separated by spaces): ")
+    try:
+        return [int(user_id) for user_id in answer.replace(',', ' ').split()]
+    except ValueError:
+        print("Invalid input. Please enter user IDs.")
+        return []
+
+
+def read_band(rate):
+    # A band of the zone's rate, as its index; raises ValueError
+    for number, (label, price) in enumerate(zip(rate.labels(), rate.prices), 1):
+        print(f"{number}. {label}: {sen_to_price(price) or 'no price'}")
+    answer = input("Enter the band number (Enter for the heaviest): ").strip()
+    band = int(answer) - 1 if answer else len(rate.prices) - 1
+    if not 0 <= band < len(rate.prices):
+        raise ValueError(f"no band {answer}")
+    return band
+
+
+def read_effective_date():
+    # The day a price change takes effect, or None for today; raises ValueError
+    answer = input("Enter the date the change takes effect (YYYY-MM-DD, Enter for today): ").strip()
+    return parse_day(answer) if answer else None
+
+
+def read_zone_rate():
+    # The arguments of pricing.set_zone_rate after the destination, e.g.
+    #   limits:    below 1, up to 3
+    #   prices:    RM8.00, RM16.00, RM18.00
+    #   surcharge: 30, RM1.00
+    # Raises ValueError.
+    answer = input("Enter the band limits in kg, lightest first, e.g. 'below 1, up to 3' (Enter for one band): ")
+    limits = []
+    for limit in filter(None, (part.strip().lower() for part in answer.split(','))):
+        kind, _, kg = limit.rpartition(' ')
+        kind = kind.replace(' ', '_')
+        if kind not in ("below", "up_to"):
+            raise ValueError(f"not a band limit: {limit!r}")
+        limits.append((kind, float(kg)))
+    prices = [price.strip() for price in input(f"Enter the {len(limits) + 1} band prices, lightest first, separated by commas: ").split(',')]
+    answer = input("Enter the surcharge as 'kg, price per kg above it', e.g. '30, RM1.00' (Enter for none): ").strip()
+    surcharge = None
+    if answer:
+        above, _, per_kg = answer.partition(',')
+        surcharge = (float(above), per_kg.strip())
+    return limits, prices, surcharge, read_effective_date()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    storage.NUMBER_BLOCK_SIZE = args.number_blocks
+    if args.command:
+        run_command(args)
+        return
+
+    # Interactive menus for operators and administrators. The data files are
+    # read when a menu option first needs them, not before the login prompt.
+    system = load_system()
+
+    while True:
+        username = input("Enter your username (or type 'exit' to quit): ")
+        if username.lower() == 'exit':
+            # Save customers before exiting
+            if system.is_loaded("store"):
+                save_customers_to_file(system)
+            break
+
+        password = input("Enter your password: ")
+
+        session = login(system, username, password, terminal="cli")
+        if session:
+            if system["current_user"]["role"] == 'administrator':
+                print("Welcome, Administrator:", system["current_user"]["username"])
+            else:
+                print("Welcome, Operator:", system["current_user"]["username"])
+
+            while True:
+                if system["sessions"].get(session.token) is None:
+                    print("Your session has expired. Please log in again.")
+                    break
+                # Show what other terminals saved since the last menu
+                sync_system(system)
+
+                if can(system["current_user"], "book_parcels"):
+                    print("What would you like to do?")
+                    print("1. Add customer details")
+                    print("2. Modify customer address and telephone number")
+                    print("3. View list of customers")
+                    print("4. Check price of a parcel")
+                    print("5. Generate list of parcels received")
+                    print("6. View bill from a consignment number")
+                    print("7. View bills by customer")
+                    print("8. View bills by date range")
+                    print("9. Delete a parcel")
+                    print("10. Create Consignment")
+                    print("11. Bulk import parcels from a manifest file")
+                    print("12. Search customers by name or telephone")
+                    print("13. Logout")
+
+                    operator_choice = input("Enter the option number: ")
+
+                    if operator_choice == '1':
+                        name = input("Enter customer name: ")
+                        address = input("Enter customer address: ")
+                        telephone = input("Enter customer telephone: ")
+                        add_customer(system, name, address, telephone)
+
+                    elif operator_choice == '2':
+                        view_customers(system)
+                        customer_id = int(input("Enter the customer ID to modify: "))
+                        if system["store"].get_customer(customer_id) is None:
+                            print("Customer not found.")
+                        else:
+                            address = input("Enter new address: ")
+                            telephone = input("Enter new telephone number: ")
+                            modify_customer(system, customer_id, address, telephone)
+
+                    elif operator_choice == '3':
+                        view_customers(system)
+
+                    elif operator_choice == '4':
+                        destination = input("Enter destination: ")
+                        weight = float(input("Enter weight of the parcel: "))
+                        price = check_price(destination, weight)
+                        if price is not None:
+                            print(f"The price for the parcel is: {price}")
+                        else:
+                            print("Invalid destination or weight for pricing. Cannot calculate price.")
+
+                    elif operator_choice == '5':
+                        view_parcels(system)
+
+                    elif operator_choice == '6':
+                        consignment_number = input("Enter consignment number: ").strip()
+                        #checks wheter or not the consignment number that inputted by the user exists within the system or not
+                        if system["store"].has_consignment(consignment_number):
+                            view_bill(system, consignment_number)
+                        else:
+                            print("Consignment number not found.")
+
+                    elif operator_choice == '7':
+                        customer_id = int(input("Enter customer ID: "))
+                        #checks whether or not the customers id that inputted by the user exists within the system or not
+                        if system["store"].get_customer(customer_id) is None:
+                            print("Customer not found.")
+                        else:
+                            view_bills_by_customer(system, customer_id)
+
+                    elif operator_choice == '8':
+                        start_date = input("Enter start date (YYYY-MM-DD): ")
+                        end_date = input("Enter end date (YYYY-MM-DD): ")
+                        #states that the date is invalid since the start date is greater than the end date
+                        try:
+                            bills_found = system["store"].count_between(start_date, end_date)
+                        except ValueError:
+                            print("Invalid date. Please use YYYY-MM-DD.")
+                            continue
+                        if start_date > end_date:
+                            print("Invalid date range.")
+                        #checks whether or not the date that inputted by the user exists within the system +or not
+                        elif not bills_found:
+                            print("No bills found within the date range.")
+                        else:
+                            view_bills_by_date(system, start_date, end_date)
+
+                    elif operator_choice == '9':
+                        consignment_number = input("Enter consignment number: ").strip()
+                        if system["store"].has_consignment(consignment_number):
+                            delete_parcel_within_consignment(system, consignment_number)
+                        else:
+                            print("Consignment number not found.")
+
+                    elif operator_choice == '10':
+                        create_consignment(system)
+                        save_parcels_to_file(system)
+                        save_bills_to_file(system)
+
+                    elif operator_choice == '11':
+                        path = input("Enter the manifest file (.csv or .jsonl): ")
+                        try:
+                            bulk_import(system, path).print_summary()
+                        except FileNotFoundError:
+                            print("File not found.")
+
+                    elif operator_choice == '12':
+                        query = input("Enter a name or telephone number: ")
+                        view_customer_search(system, query)
+
+                    elif operator_choice == '13':
+                        # Save data before logging out (nothing to save if it was never loaded)
+                        if system.is_loaded("store"):
+                            save_customers_to_file(system)
+                            save_parcels_to_file(system)
+                            save_bills_to_file(system)
+                        break
+
+                    else:
+                        print("Invalid choice")
+
+                elif can(system["current_user"], "manage_users"):
+                    print("What would you like to do?")
+                    print("1. Add user")
+                    print("2. Assign administrator role")
+                    print("3. Remove administrator role")
+                    print("4. Delete user")
+                    print("5. List of users")
+                    print("6. Show Pricing Table")
+                    print("7. Modify Pricing")
+                    print("8. Delete Pricing")
+                    print("9. Check Pricing")
+                    print("10. Reset Parcels And Bills")
+                    print("11. Delete Customer")
+                    print("12. Revenue summary")
+                    print("13. Set Weight Bands And Surcharge")
+                    print("14. Logout")
+                    option = input("Enter the option number: ")
+
+                    if option == '1':
+                        new_username = input("Enter the username for the new user: ")
+                        new_password = input("Enter the password for the new user: ")
+                        new_role = input("Enter the role for the new user (default: operator): ")
+                        if add_user(system, new_username, new_password, new_role.strip()):
+                            print("User added successfully!")
+                            save_users_to_file(system)
+
+                    elif option == '2':
+                        users = get_users_by_role(system, 'operator')
+                        if len(users) == 0:
+                            print("No operators available to assign as administrators.")
+                        else:
+                            print("Choose users to assign as administrators:")
+                            print_users(users)
+                            if assign_admin_role(system, read_user_ids()):
+                                save_users_to_file(system)
+
+                    elif option == '3':
+                        users = get_users_by_role(system, 'administrator')
+                        if len(users) == 0:
+                            print("No administrators available to remove the role.")
+                        else:
+                            print("Choose users to remove administrator role:")
+                            print_users(users)
+                            if remove_admin_role(system, read_user_ids()):
+                                save_users_to_file(system)
+
+                    elif option == '4':
+                        if len(system["users"]) == 0:
+                            print("No users available to delete.")
+                        else:
+                            print("Choose users to delete:")
+                            print_users(system["users"].users())
+                            if delete_users(system, read_user_ids()):
+                                save_users_to_file(system)
+
+                    elif option == '5':
+                        filter_option = input("Filter users by role (admin/operator/all): ")
+                        if filter_option.lower() == 'admin':
+                            print("List of administrators:")
+                            print_users(get_users_by_role(system, 'administrator'))
+                        elif filter_option.lower() == 'operator':
+                            print("List of operators:")
+                            print_users(get_users_by_role(system, 'operator'))
+                        elif filter_option.lower() == 'all':
+                            if len(system["users"]) == 0:
+                                print("No users available.")
+                            else:
+                                print("List of all users:")
+                                print_users(system["users"].users())
+                        else:
+                            print("Invalid filter option!")
+
+                    elif option == '6':
+                        print("Current Pricing Table:")
+                        print_pricing_table(['Destination', 'Weight below 1kg', 'Weight in between 1kg to 3kg', 'Weight above 3kg'])
+
+                    elif option == '7':
+                        modify_destination = input("\nEnter the destination to modify a price for: ")
+                        rate = zone_rate(modify_destination)
+                        if rate is None:
+                            print(f"{modify_destination} has no prices.")
+                        else:
+                            try:
+                                band = read_band(rate)
+                                new_price = input(f"Enter the new price for {modify_destination} ({rate.labels()[band]}): ")
+                                if modify_price(modify_destination, new_price, band, read_effective_date()):
+                                    save_pricing_to_file()
+                                    print("Price modified successfully!")
+                                else:
+                                    print(f"{modify_destination} has no prices on that date.")
+                            except ValueError:
+                                print("Invalid band, price or date. The price was not changed.")
+
+                    elif option == '8':
+                        price_to_remove = input("\nEnter the destination to delete a price for: ")
+                        rate = zone_rate(price_to_remove)
+                        if rate is None:
+                            print(f"{price_to_remove} has no prices.")
+                        else:
+                            try:
+                                if delete_price(price_to_remove, read_band(rate), read_effective_date()):
+                                    save_pricing_to_file()
+                                    print("Price deleted successfully!")
+                                else:
+                                    print(f"{price_to_remove} has no prices on that date.")
+                            except ValueError:
+                                print("Invalid band or date. The price was not deleted.")
+
+                    elif option == '9':
+                        destination_to_check = input("\nEnter the destination to check the price: ")
+                        weight_to_check = float(input("Enter the weight of the parcel: "))
+                        price = check_price(destination_to_check, weight_to_check)
+                        if price:
+                            print(
+                                f"The price for the parcel to {destination_to_check} weighing {weight_to_check}kg is: {price}")
+                        else:
+                            print("Invalid destination or weight for pricing.")
+
+                    elif option == '10':
+                        reset_system(system)
+
+                    elif option == '11':
+                        view_customers(system)
+                        try:
+                            customer_id_to_delete = int(input("Enter the customer ID to delete: "))
+                            delete_customer(system, customer_id_to_delete)
+                        except ValueError:
+                            print("Invalid input. Please enter a valid customer ID.")
+
+                    elif option == '12':
+                        view_revenue_summary(system)
+
+                    elif option == '13':
+                        rate_destination = input("\nEnter the destination to set weight bands for: ")
+                        try:
+                            set_zone_rate(rate_destination, *read_zone_rate())
+                            save_pricing_to_file()
+                            print("Weight bands set successfully!")
+                        except ValueError as error:
+                            print(f"Invalid weight bands: {error}. Nothing was changed.")
+
+                    elif option == '14':
+                        print("Logging out...")
+                        break
+
+                    else:
+                        print("Invalid option!")
+
+                else:
+                    print("There is no menu for your role.")
+                    break
+            logout(system, session)
+        else:
+            print("Invalid username or password. Please try again.")
@@ -0,0 +1,535 @@
+from array import array
+from collections.abc import Mapping, MutableMapping
+from datetime import date
+from functools import lru_cache
+
+from .pricing_engine import format_price, parse_price
+
+# Marks a field the record does not have
+ABSENT = object()
+
+
+@lru_cache(maxsize=65536)
+def date_ordinal(text):
+    # "YYYY-MM-DD" -> day number; cached since many parcels share a date
+    return date.fromisoformat(text).toordinal()
+
+
+@lru_cache(maxsize=65536)
+def ordinal_date(ordinal):
+    return date.fromordinal(ordinal).isoformat()
+
+
+def normal_date(text):
+    # A parcel date as the date index reads it (date_ordinal), written
+    # YYYY-MM-DD. Raises ValueError for text that is not a date, so what
+    # is checked here is what the index takes.
+    if not isinstance(text, str):
+        raise ValueError(f"not a date: {text!r}")
+    return ordinal_date(date_ordinal(text))
+
+
+def parse_parcel_number(text):
+    # 'P10000001' -> 10000001
+    return int(text[1:]) if text[:1] == 'P' else None
+
+
+def format_parcel_number(number):
+    return f'P{number}'
+
+
+def same(decoded, value):
+    # The round trip gave back the value, with its type (2 is not 2.0)
+    return decoded == value and type(decoded) is type(value)
+
+
+def growable(data):
+    # Columns loaded from a snapshot are memoryviews over the mapped file
+    # (see snapshot.py); one is copied into an array the first time it has
+    # to grow
+    if isinstance(data, array):
+        return data
+    grown = array(data.format)
+    grown.frombytes(data.cast('B'))
+    return grown
+
+
+class TypedColumn:
+    # Values packed into an array (8 bytes a weight instead of a 24-byte
+    # float object, a day number instead of a date string, ...). encode and
+    # decode convert to and from the packed form; set returns False for a
+    # value that does not survive the round trip, and the table keeps that
+    # one as it is instead.
+    def __init__(self, typecode, encode, decode):
+        self.data = array(typecode)
+        self.encode = encode
+        self.decode = decode
+        self.limit = 1 << (8 * self.data.itemsize - 1) if typecode in 'bhilq' else None
+
+    def pack(self, value):
+        # The packed form of value, or None when the column cannot hold it
+        try:
+            packed = self.encode(value)
+            if packed is None or not same(self.decode(packed), value):
+                return None
+        except (TypeError, ValueError, OverflowError):
+            return None
+        if self.limit and not -self.limit <= packed < self.limit:
+            return None
+        return packed
+
+    def append(self):
+        self.data = growable(self.data)
+        self.data.append(0)
+
+    def get(self, row):
+        return self.decode(self.data[row])
+
+    def take(self, rows):
+        # get for many rows at once
+        return list(map(self.decode, map(self.data.__getitem__, rows)))
+
+    def set(self, row, value):
+        packed = self.pack(value)
+        if packed is None:
+            return False
+        self.data[row] = packed
+        return True
+
+    def extend(self, values):
+        # Appends a value for each of many new rows; returns the indexes in
+        # values of the ones the column cannot hold
+        packed = list(map(self.pack, values))
+        failed = [position for position, item in enumerate(packed) if item is None]
+        for position in failed:
+            packed[position] = 0
+        self.data = growable(self.data)
+        self.data.extend(packed)
+        return failed
+
+    def release(self, row):
+        pass
+
+
+class StringTable:
+    # The distinct values of a table's encoded columns, each kept once and
+    # referred to by index; index 0 is None. The strings of a snapshot stay
+    # in the mapped file and are decoded the first time they are used.
+    # Values added after loading a snapshot are not checked against its
+    # strings (that would mean decoding them all), so a value may then be
+    # stored twice; the next snapshot stores it once again.
+    def __init__(self, offsets=None, data=None):
+        self.offsets = offsets  # snapshot strings: n + 1 offsets into data
+        self.data = data
+        self.mapped = len(offsets) - 1 if offsets is not None else 1
+        self.decoded = {}
+        self.values = []  # values added since, from index mapped on
+        self.codes = {None: 0}  # value -> index, for the added values
+
+    def __len__(self):
+        return self.mapped + len(self.values)
+
+    def __getitem__(self, code):
+        if code >= self.mapped:
+            return self.values[code - self.mapped]
+        if code == 0:
+            return None
+        value = self.decoded.get(code)
+        if value is None:
+            value = self.decoded[code] = str(self.data[self.offsets[code]:self.offsets[code + 1]], 'utf-8', 'surrogatepass')
+        return value
+
+    def code(self, value):
+        # Raises TypeError for a value that is not a string (or None)
+        if value is not None and type(value) is not str:
+            raise TypeError(f"not a string: {value!r}")
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self)
+            self.values.append(value)
+        return code
+
+
+class EncodedColumn:
+    # Dictionary encoding for values that repeat (zones, senders): rows hold
+    # the value's index in the table's StringTable. Values are never dropped
+    # from the string table.
+    def __init__(self, strings):
+        self.strings = strings
+        self.data = array('I')
+
+    def append(self):
+        self.data = growable(self.data)
+        self.data.append(0)
+
+    def get(self, row):
+        return self.strings[self.data[row]]
+
+    def take(self, rows):
+        return list(map(self.strings.__getitem__, map(self.data.__getitem__, rows)))
+
+    def set(self, row, value):
+        try:
+            self.data[row] = self.strings.code(value)
+        except TypeError:
+            return False
+        return True
+
+    def extend(self, values):
+        code = self.strings.code
+        codes, failed = [], []
+        for position, value in enumerate(values):
+            try:
+                if value is ABSENT:
+                    raise TypeError
+                codes.append(code(value))
+            except TypeError:
+                failed.append(position)
+                codes.append(0)
+        self.data = growable(self.data)
+        self.data.extend(codes)
+        return failed
+
+    def release(self, row):
+        pass
+
+
+class ParcelRow(MutableMapping):
+    # A parcel read and written in place in the table, so code written for
+    # parcel dicts (parcel["price"], parcel.update(...), dict(parcel)) works
+    # unchanged. A row is only valid while its parcel is in the table.
+    __slots__ = ("table", "row")
+
+    def __init__(self, table, row):
+        self.table = table
+        self.row = row
+
+    def __getitem__(self, field):
+        table = self.table
+        if self.row in table.overrides:
+            overrides = table.overrides[self.row]
+            if field in overrides:
+                value = overrides[field]
+                if value is ABSENT:
+                    raise KeyError(field)
+                return value
+        return table.columns[field].get(self.row)
+
+    def __setitem__(self, field, value):
+        self.table.set(self.row, field, value)
+
+    def __delitem__(self, field):
+        self[field]
+        self.table.set(self.row, field, ABSENT)
+
+    def __iter__(self):
+        return iter(self.table.record(self.row))
+
+    def __len__(self):
+        return len(self.table.record(self.row))
+
+    def items(self):
+        # A snapshot rather than a live view: reads the row once instead of
+        # field by field (dict(row.items()), ==, JSON encoding)
+        return self.table.record(self.row).items()
+
+    def __repr__(self):
+        return repr(self.table.record(self.row))
+
+
+class ParcelTable(Mapping):
+    # The parcels as columns instead of one dict each: parcel number ->
+    # ParcelRow. Values a column cannot hold (an unparseable price, a
+    # missing field, a field added later) are kept per row in overrides.
+    # Rows of deleted parcels are reused.
+    def __init__(self, strings=None):
+        self.strings = StringTable() if strings is None else strings
+        self.columns = {
+            "consignment_number": TypedColumn('q', int, str),  # '10000000' (other strings go to overrides)
+            "parcel_number": TypedColumn('q', parse_parcel_number, format_parcel_number),
+            "customer_id": TypedColumn('q', int, int),
+            "destination": EncodedColumn(self.strings),
+            "weight": TypedColumn('d', float, float),
+            "sender_name": EncodedColumn(self.strings),
+            "sender_address": EncodedColumn(self.strings),
+            "sender_telephone": EncodedColumn(self.strings),
+            "price": TypedColumn('q', parse_price, format_price),
+            "date": TypedColumn('i', date_ordinal, ordinal_date),
+        }
+        self._positions = {}  # parcel number -> row; None until built (see positions)
+        self.find = None  # parcel number -> row or None, while there are no positions
+        self.overrides = {}  # row -> {field: value}
+        self.free = []
+        self.size = 0
+
+    @property
+    def positions(self):
+        # A table opened from a snapshot looks parcels up with the snapshot's
+        # sorted index (find) and only builds positions when it is first
+        # changed or listed
+        if self._positions is None:
+            self.index_positions()
+            self.find = None
+        return self._positions
+
+    def _row(self, parcel_number):
+        if self._positions is None:
+            return self.find(parcel_number)
+        return self._positions.get(parcel_number)
+
+    def __getitem__(self, parcel_number):
+        row = self._row(parcel_number)
+        if row is None:
+            raise KeyError(parcel_number)
+        return ParcelRow(self, row)
+
+    def __iter__(self):
+        return iter(self.positions)
+
+    def __len__(self):
+        return self.size - len(self.free)
+
+    def __contains__(self, parcel_number):
+        return self._row(parcel_number) is not None
+
+    def row(self, position):
+        return ParcelRow(self, position)
+
+    @classmethod
+    def from_records(cls, records):
+        # A table of a whole list of parcel dicts, filled a column at a time
+        # (much faster than adding them one by one)
+        table = cls()
+        overrides = table.overrides
+        for field, column in table.columns.items():
+            values = [record.get(field, ABSENT) for record in records]
+            for position in column.extend(values):
+                overrides.setdefault(position, {})[field] = values[position]
+        fields = table.columns.keys()
+        for position, record in enumerate(records):
+            if record.keys() != fields:
+                for field in record.keys() - fields:
+                    overrides.setdefault(position, {})[field] = record[field]
+        table.size = len(records)
+        table.index_positions()
+        return table
+
+    def index_positions(self):
+        # Builds positions from the parcel number column, for a table filled
+        # in bulk; a repeated parcel number keeps its last row
+        numbers = map(format_parcel_number, self.columns["parcel_number"].data)
+        if any("parcel_number" in overrides for overrides in self.overrides.values()):
+            numbers = list(numbers)
+            for position, overrides in self.overrides.items():
+                numbers[position] = overrides.get("parcel_number", numbers[position])
+        positions = dict(zip(numbers, range(self.size)))
+        positions.pop(ABSENT, None)
+        if len(positions) < self.size:
+            self.free = sorted(set(range(self.size)).difference(positions.values()), reverse=True)
+        self._positions = positions
+
+    def live_rows(self):
+        if not self.free:
+            return range(self.size)
+        return sorted(self.positions.values())
+
+    def values_of(self, field, rows):
+        # The field's value on each of rows (ABSENT where it is missing)
+        values = self.columns[field].take(rows)
+        if self.overrides:
+            for index, row in enumerate(rows):
+                overrides = self.overrides.get(row)
+                if overrides and field in overrides:
+                    values[index] = overrides[field]
+        return values
+
+    def packed_of(self, field, rows):
+        # Like values_of, but in the column's packed form (a price in sen, a
+        # date as a day number) with no decoding; None where the row keeps
+        # its value in overrides
+        values = list(map(self.columns[field].data.__getitem__, rows))
+        if self.overrides:
+            for index, row in enumerate(rows):
+                overrides = self.overrides.get(row)
+                if overrides and field in overrides:
+                    values[index] = None
+        return values
+
+    def numbers(self, field, prefix=''):
+        # The numbers used in a numbered column (parcel numbers without the
+        # 'P', consignment numbers) as a set, read straight from the packed
+        # column. Rows of deleted parcels still count, as their numbers were
+        # handed out.
+        numbers = set(self.columns[field].data)
+        numbers.discard(0)
+        for overrides in self.overrides.values():
+            value = str(overrides.get(field, ''))
+            if value.startswith(prefix) and value[len(prefix):].isdigit():
+                numbers.add(int(value[len(prefix):]))
+        return numbers
+
+    def add(self, parcel):
+        # Stores a parcel dict, replacing the parcel with the same number;
+        # returns its row
+        parcel_number = parcel["parcel_number"]
+        position = self.positions.get(parcel_number)
+        if position is None:
+            if self.free:
+                position = self.free.pop()
+            else:
+                position = self.size
+                self.size += 1
+                for column in self.columns.values():
+                    column.append()
+            self.positions[parcel_number] = position
+        self.overrides.pop(position, None)
+        overrides = {}
+        for field, column in self.columns.items():
+            value = parcel.get(field, ABSENT)
+            if value is ABSENT or not column.set(position, value):
+                overrides[field] = value
+        for field in parcel.keys() - self.columns.keys():
+            overrides[field] = parcel[field]
+        if overrides:
+            self.overrides[position] = overrides
+        return position
+
+    def record(self, position):
+        # The row as a new dict
+        overrides = self.overrides.get(position)
+        if not overrides:
+            return {field: column.get(position) for field, column in self.columns.items()}
+        # Overridden fields are not read from their columns, which may hold
+        # a placeholder there
+        parcel = {field: overrides[field] if field in overrides else column.get(position) for field, column in self.columns.items()}
+        for field, value in overrides.items():
+            if value is ABSENT:
+                parcel.pop(field, None)
+            else:
+                parcel[field] = value
+        return parcel
+
+    def set(self, position, field, value):
+        column = self.columns.get(field)
+        overrides = self.overrides.get(position)
+        if value is not ABSENT and column is not None and column.set(position, value):
+            if overrides and field in overrides:
+                del overrides[field]
+                if not overrides:
+                    del self.overrides[position]
+        else:
+            self.overrides.setdefault(position, {})[field] = value
+
+    def remove(self, parcel_number):
+        # Returns the parcel as a dict, since its row is reused
+        position = self.positions.pop(parcel_number)
+        parcel = self.record(position)
+        self.overrides.pop(position, None)
+        for column in self.columns.values():
+            column.release(position)
+        self.free.append(position)
+        return parcel
+
+    def clear(self):
+        self.__init__()
+
+
+class RowChains:
+    # key -> the table rows with that key, in the order they were added.
+    # Each key's rows form a circular doubly linked list through two arrays,
+    # so a key costs one dict entry instead of a dict of its own.
+    def __init__(self):
+        self._heads = {}
+        self.load_heads = None
+        self.find_head = None
+        self.next = array('i')
+        self.previous = array('i')
+
+    @property
+    def heads(self):
+        # Chains opened from a snapshot look heads up with find_head (a
+        # bisect in the snapshot) and only read them all into the dict when
+        # they first change
+        if self._heads is None:
+            self._heads = self.load_heads()
+            self.load_heads = self.find_head = None
+        return self._heads
+
+    def _head(self, key):
+        if self._heads is None:
+            return self.find_head(key)
+        return self._heads.get(key)
+
+    def __contains__(self, key):
+        return self._head(key) is not None
+
+    @classmethod
+    def mapped(cls, following, preceding, load_heads, find_head):
+        chains = cls()
+        chains.next, chains.previous = following, preceding
+        chains._heads, chains.load_heads, chains.find_head = None, load_heads, find_head
+        return chains
+
+    @classmethod
+    def build(cls, rows, keys):
+        # The chains of many rows at once: keys[i] is the key of rows[i]
+        chains = cls()
+        size = max(rows, default=-1) + 1
+        following = chains.next = array('i', [0]) * size
+        preceding = chains.previous = array('i', [0]) * size
+        heads, tails = chains._heads, {}
+        for row, key in zip(rows, keys):
+            head = heads.get(key)
+            if head is None:
+                heads[key] = tails[key] = following[row] = preceding[row] = row
+                continue
+            tail = tails[key]
+            following[tail] = row
+            preceding[row] = tail
+            following[row] = head
+            preceding[head] = row
+            tails[key] = row
+        return chains
+
+    def add(self, key, row):
+        if len(self.next) <= row:
+            self.next, self.previous = growable(self.next), growable(self.previous)
+        while len(self.next) <= row:
+            self.next.append(-1)
+            self.previous.append(-1)
+        head = self.heads.get(key)
+        if head is None:
+            self.heads[key] = self.next[row] = self.previous[row] = row
+            return
+        tail = self.previous[head]
+        self.next[tail] = row
+        self.previous[row] = tail
+        self.next[row] = head
+        self.previous[head] = row
+
+    def remove(self, key, row):
+        head = self.heads.get(key)
+        if head is None:
+            return
+        if self.next[row] == row:
+            del self.heads[key]
+            return
+        following, preceding = self.next[row], self.previous[row]
+        self.next[preceding] = following
+        self.previous[following] = preceding
+        if head == row:
+            self.heads[key] = following
+
+    def rows(self, key):
+        head = self._head(key)
+        if head is None:
+            return []
+        rows = [head]
+        row = self.next[head]
+        while row != head:
+            rows.append(row)
+            row = self.next[row]
+        return rows
+
+    def clear(self):
+        self.__init__()
@@ -0,0 +1,97 @@
+from .numbering import NumberAllocator, reserve_block
+from .render import Column, TableWriter, paginate
+from .search import DEFAULT_LIMIT
+from .storage import COUNTERS_FILE, get_storage
+from .sync import merge_remote
+
+# Customer management functions
+
+def initialize_customers():
+    return {"customers": [], "current_customer_id": 1}
+
+def add_customer(system, name, address, telephone):
+    # Assign the next available customer ID
+    customer_id = next_customer_id(system)
+    customer = {"id": customer_id, "name": name, "address": address, "telephone": telephone}
+    system["store"].add_customer(customer)
+
+    return customer_id
+
+def next_customer_id(system):
+    # When the data files are loaded, IDs come from COUNTERS_FILE (see
+    # reserve_customer_blocks) so two terminals never hand out the same one.
+    # The store is loaded first, since loading it sets up the allocator.
+    store = system["store"]
+    allocator = system.get("customer_allocator")
+    if allocator is None:
+        return store.next_customer_id()
+    return allocator.allocate()
+
+def reserve_customer_blocks(system, size):
+    store = system["store"]
+    allocator = NumberAllocator(store.next_customer_id(), store.customers)
+    allocator.use_blocks(lambda count: reserve_block(COUNTERS_FILE, "customer", count, allocator.next_number), size)
+    system["customer_allocator"] = allocator
+
+def modify_customer(system, customer_id, address, telephone):
+    if system["store"].update_customer(customer_id, address=address, telephone=telephone):
+        print("Customer details modified successfully!")
+    else:
+        print("Customer not found.")
+
+CUSTOMER_FIELDS = ["id", "name", "address", "telephone"]
+CUSTOMER_COLUMNS = [Column("Customer ID", 11, '>'), Column("Name", 24), Column("Address", 36), Column("Telephone", 14)]
+
+def customer_row(customer):
+    return [customer["id"], customer["name"], customer["address"], customer["telephone"]]
+
+def iter_customers(system):
+    return iter(system["store"].customers.values())
+
+def view_customers(system, page=None, offset=0, limit=None):
+    if not system["store"].customers:
+        print("No customers available.")
+    else:
+        # Rows are printed as they are read instead of collected first
+        customers = paginate(iter_customers(system), page, offset, limit)
+        TableWriter(CUSTOMER_COLUMNS).write(map(customer_row, customers))
+
+def search_customers(system, query, limit=DEFAULT_LIMIT):
+    # The customers best matching a name or telephone (see search.py)
+    store = system["store"]
+    return [store.get_customer(customer_id) for customer_id, _ in system["customer_search"].search(query, limit)]
+
+def view_customer_search(system, query, limit=DEFAULT_LIMIT):
+    customers = search_customers(system, query, limit)
+    if not customers:
+        print("No matching customers.")
+    else:
+        TableWriter(CUSTOMER_COLUMNS).write(map(customer_row, customers))
+
+def load_customers_from_file(system):
+    try:
+        data = get_storage("customers").load()
+        for customer in data["customers"]:
+            system["store"].add_customer(customer)
+        system["store"].take_changes("customers")
+        system["current_customer_id"] = data["current_customer_id"]
+    except FileNotFoundError:
+        pass
+
+def save_customers_to_file(system, compact=False):
+    storage = get_storage("customers")
+    changes = system["store"].take_changes("customers")
+    meta = {"current_customer_id": system["current_customer_id"]}
+    if compact:
+        data = {"customers": list(system["store"].customers.values()), **meta}
+        storage.compact(data)
+    else:
+        merge_remote(system, "customers", storage.append(changes, meta), written=changes)
+
+def delete_customer(system, customer_id):
+    if system["store"].delete_customer(customer_id):
+        print("Customer deleted successfully!")
+        # Save changes to the file
+        save_customers_to_file(system)
+    else:
+        print("Customer not found.")
@@ -0,0 +1,160 @@
+import time
+from collections import defaultdict
+from itertools import islice
+
+from .billing import save_bills_to_file
+from .customers import save_customers_to_file
+from .parcels import save_parcels_to_file
+from .render import print_table
+from .search import normalize_name, normalize_telephone, trigrams
+
+# Telephones are compared on their last digits, so "+60 12-345 6789" and
+# "012-345 6789" are the same number; shorter ones are not compared at all
+TELEPHONE_DIGITS = 9
+MIN_TELEPHONE_DIGITS = 7
+
+# Two names sharing a telephone are the same sender when this share of
+# their trigrams match (Dice coefficient), e.g. "Tan Ah Kow" / "Tan Ah Kaw"
+NAME_SIMILARITY = 0.6
+
+# A telephone with more different names than this (a shop or office line)
+# only merges customers whose names match exactly, so no block is compared
+# pair by pair at more than this squared
+MAX_BLOCK = 50
+
+
+def telephone_key(telephone):
+    digits = normalize_telephone(telephone)
+    return digits[-TELEPHONE_DIGITS:] if len(digits) >= MIN_TELEPHONE_DIGITS else None
+
+
+def name_key(name):
+    # Word order does not matter: "Ah Kow Tan" is "Tan Ah Kow"
+    return ' '.join(sorted(normalize_name(name).split()))
+
+
+def name_similarity(first, second):
+    first, second = trigrams(first), trigrams(second)
+    return 2 * len(first & second) / (len(first) + len(second))
+
+
+class Clusters:
+    # Union-find over customer IDs; the lowest ID of a cluster is its root,
+    # so it is also the customer the others merge into
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, customer_id):
+        parent = self.parent
+        root = customer_id
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while customer_id != root:
+            following = parent[customer_id]
+            parent[customer_id] = root
+            customer_id = following
+        return root
+
+    def union(self, first, second):
+        first, second = self.find(first), self.find(second)
+        if first != second:
+            if second < first:
+                first, second = second, first
+            self.parent[second] = first
+
+    def mapping(self):
+        # duplicate ID -> the ID it merges into
+        return {customer_id: self.find(customer_id) for customer_id in list(self.parent)}
+
+
+def find_duplicates(customers):
+    # Returns {duplicate customer ID: customer ID to keep} for an iterable
+    # of customers. Instead of comparing every pair, customers are put in
+    # blocks that duplicates share, and only compared within a block:
+    #   telephone  names in the same block that are alike (NAME_SIMILARITY)
+    #   name       same name (in any word order) and same address
+    # Both blocks are one pass over the customers plus one over each block.
+    by_telephone = defaultdict(lambda: defaultdict(list))  # telephone -> name -> ids
+    by_name_and_address = defaultdict(list)
+    for customer in customers:
+        customer_id = customer["id"]
+        name = name_key(customer.get("name"))
+        if not name:
+            continue
+        telephone = telephone_key(customer.get("telephone"))
+        if telephone:
+            by_telephone[telephone][name].append(customer_id)
+        address = normalize_name(customer.get("address"))
+        if address:
+            by_name_and_address[name, address].append(customer_id)
+
+    clusters = Clusters()
+    for names in by_telephone.values():
+        for ids in names.values():
+            for customer_id in ids[1:]:
+                clusters.union(ids[0], customer_id)
+        if 1 < len(names) <= MAX_BLOCK:
+            keys = list(names)
+            for i, first in enumerate(keys):
+                for second in keys[i + 1:]:
+                    if name_similarity(first, second) >= NAME_SIMILARITY:
+                        clusters.union(names[first][0], names[second][0])
+    for ids in by_name_and_address.values():
+        for customer_id in ids[1:]:
+            clusters.union(ids[0], customer_id)
+    return {duplicate: keep for duplicate, keep in clusters.mapping().items() if duplicate != keep}
+
+
+def merge_customers(system, mapping):
+    # Folds each duplicate into the customer it maps to: its parcels move
+    # over (store.reassign_customers, one pass over just their parcels), the
+    # bills of those consignments take the kept customer's details, and the
+    # duplicate is deleted. Returns the number of parcels moved.
+    store = system["store"]
+    moved = store.reassign_customers(mapping)
+
+    consignments = {parcel["consignment_number"]: parcel["customer_id"] for parcel in moved}
+    for consignment_number, customer_id in consignments.items():
+        bill = store.get_bill(consignment_number)
+        customer = store.get_customer(customer_id)
+        if bill is not None and customer is not None:
+            bill.update(
+                customer_name=customer.get("name"), customer_address=customer.get("address"),
+                customer_telephone=customer.get("telephone")
+            )
+            store.add_bill(bill)
+
+    for duplicate in mapping:
+        store.delete_customer(duplicate)
+    return len(moved)
+
+
+def dedupe_customers(system, apply=False, show=10):
+    # The batch job behind `python -m parcel_system dedupe`: lists the
+    # duplicates found and, with apply, merges them and saves every file
+    store = system["store"]
+    started = time.perf_counter()
+    mapping = find_duplicates(store.customers.values())
+    found = time.perf_counter() - started
+
+    groups = defaultdict(list)
+    for duplicate, keep in mapping.items():
+        groups[keep].append(duplicate)
+    print(f"Found {len(mapping)} duplicates of {len(groups)} customers among {len(store.customers)} in {found:.2f}s.")
+    rows = []
+    for keep, duplicates in islice(sorted(groups.items()), show):
+        for customer_id in [keep] + sorted(duplicates):
+            customer = store.get_customer(customer_id)
+            rows.append([keep, customer_id, customer.get("name"), customer.get("address"), customer.get("telephone")])
+    if rows:
+        print_table(rows, headers=["Keep", "Customer ID", "Name", "Address", "Telephone"])
+    if not apply or not mapping:
+        return mapping
+
+    started = time.perf_counter()
+    moved = merge_customers(system, mapping)
+    save_customers_to_file(system)
+    save_parcels_to_file(system)
+    save_bills_to_file(system)
+    print(f"Merged {len(mapping)} customers and moved {moved} parcels in {time.perf_counter() - started:.2f}s.")
+    return mapping
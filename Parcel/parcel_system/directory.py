@@ -0,0 +1,119 @@
+from collections import defaultdict
+
+# What each role may do. Menus and commands ask can(user, capability)
+# instead of comparing role names, so a new role is one more line here.
+ROLE_CAPABILITIES = {
+    "administrator": frozenset({
+        "manage_users", "manage_pricing", "view_pricing", "reset_records", "view_customers", "delete_customers",
+        "view_revenue"
+    }),
+    "operator": frozenset({
+        "manage_customers", "view_customers", "view_pricing", "book_parcels", "delete_parcels", "import_parcels",
+        "view_bills"
+    }),
+}
+DEFAULT_ROLE = "operator"
+NO_CAPABILITIES = frozenset()
+
+
+def can(user, capability):
+    return user is not None and capability in ROLE_CAPABILITIES.get(user.get("role"), NO_CAPABILITIES)
+
+
+class UserDirectory:
+    # The users, by a user ID that stays the same however the users are
+    # listed or filtered:
+    #   by_id      user ID -> user record (the same dicts auth.UserRegistry holds)
+    #   ids        username -> user ID
+    #   by_role    role -> set of user IDs
+    # Records written before there were IDs get one when loaded, in file
+    # order, so every terminal reading the same file numbers them alike.
+    def __init__(self):
+        self.by_id = {}
+        self.ids = {}
+        self.by_role = defaultdict(set)
+        self.next_id = 1
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def __contains__(self, username):
+        return username in self.ids
+
+    def load(self, users):
+        # Adds the users of a file; those holding an ID go first, so the
+        # ones without take IDs after them. Returns the users given a new ID.
+        users = list(users)
+        renumbered = []
+        for user in [user for user in users if _has_id(user)] + [user for user in users if not _has_id(user)]:
+            renumbered.extend(self.add(user))
+        return renumbered
+
+    def add(self, user):
+        # Adds or replaces (by username) a user. Returns the users whose ID
+        # changed, which need saving: a new user, or one of two users that
+        # terminals saved with the same ID at once. Of those two, the later
+        # username is renumbered, so both terminals pick the same one.
+        username = user["username"]
+        self.remove(username)
+        renumbered = []
+        holder = self.by_id.get(user.get("id")) if _has_id(user) else None
+        if not _has_id(user) or (holder is not None and holder["username"] < username):
+            user["id"] = self.next_id
+            renumbered.append(user)
+        elif holder is not None:
+            self._drop(holder)
+            holder["id"] = self.next_id
+            self._index(holder)
+            renumbered.append(holder)
+        self._index(user)
+        return renumbered
+
+    def remove(self, username):
+        user_id = self.ids.get(username)
+        if user_id is None:
+            return None
+        user = self.by_id[user_id]
+        self._drop(user)
+        return user
+
+    def _index(self, user):
+        user_id = user["id"]
+        self.by_id[user_id] = user
+        self.ids[user["username"]] = user_id
+        self.by_role[user.get("role")].add(user_id)
+        self.next_id = max(self.next_id, user_id + 1)
+
+    def _drop(self, user):
+        user_id = user["id"]
+        del self.by_id[user_id]
+        del self.ids[user["username"]]
+        self.by_role[user.get("role")].discard(user_id)
+
+    def get(self, user_id):
+        return self.by_id.get(user_id)
+
+    def find(self, username):
+        user_id = self.ids.get(username)
+        return None if user_id is None else self.by_id[user_id]
+
+    def set_role(self, user_id, role):
+        # True when the user's role changed
+        user = self.by_id[user_id]
+        if user.get("role") == role:
+            return False
+        self.by_role[user.get("role")].discard(user_id)
+        user["role"] = role
+        self.by_role[role].add(user_id)
+        return True
+
+    def in_role(self, role):
+        return [self.by_id[user_id] for user_id in sorted(self.by_role.get(role, ()))]
+
+    def users(self):
+        return [self.by_id[user_id] for user_id in sorted(self.by_id)]
+
+
+def _has_id(user):
+    user_id = user.get("id")
+    return isinstance(user_id, int) and user_id > 0
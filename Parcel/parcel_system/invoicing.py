@@ -0,0 +1,128 @@
+import calendar
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from .render import Column, TableWriter, write_csv
+from .money import money_fields, ringgit, to_sen
+
+# Invoice lines per task sent to a worker process; enough that sending a
+# task costs little next to rendering it, few enough to spread the work
+TASK_PARCELS = 20000
+
+INVOICE_COLUMNS = [
+    Column("Date", 10), Column("Consignment Number", 18), Column("Parcel Number", 13), Column("Destination", 12),
+    Column("Weight (KG)", 11, '>'), Column("Price (RM)", 10, '>')
+]
+
+# The per-customer totals written next to the invoices
+SUMMARY_FILE = "summary.csv"
+SUMMARY_FIELDS = [
+    "customer_id", "name", "parcels", "total_amount", "service_tax", "total_amount_with_tax", "file"
+]
+
+LINE_FIELDS = ["date", "consignment_number", "parcel_number", "destination", "weight", "price"]
+
+
+def month_range(month):
+    # "2023-12" -> ("2023-12-01", "2023-12-31")
+    year, number = (int(part) for part in month.split('-'))
+    last = calendar.monthrange(year, number)[1]
+    return f'{year:04d}-{number:02d}-01', f'{year:04d}-{number:02d}-{last:02d}'
+
+
+def partition_month(store, month):
+    # The month's parcels grouped by customer in one pass over the date
+    # range, read a column at a time (store.columns_between): [(customer,
+    # [line, ...]), ...] with a line per parcel, (date, consignment, parcel
+    # number, destination, weight, price in sen), in date order
+    customer_ids, *columns = store.columns_between(*month_range(month), ["customer_id"] + LINE_FIELDS)
+    if None in columns[-1]:
+        # A price that is not valid counts 0
+        columns[-1] = [price or 0 for price in columns[-1]]
+
+    lines = defaultdict(list)
+    for customer_id, line in zip(customer_ids, zip(*columns)):
+        lines[customer_id].append(line)
+    lines.pop(None, None)
+    invoices = []
+    for customer_id in sorted(lines):
+        customer = store.get_customer(customer_id) or {"id": customer_id}
+        invoices.append(({field: customer.get(field) for field in ("id", "name", "address", "telephone")}, lines[customer_id]))
+    return invoices
+
+
+def tasks(invoices, size=TASK_PARCELS):
+    # Consecutive invoices making up about size lines each
+    task, lines = [], 0
+    for invoice in invoices:
+        task.append(invoice)
+        lines += len(invoice[1])
+        if lines >= size:
+            yield task
+            task, lines = [], 0
+    if task:
+        yield task
+
+
+def render_invoices(directory, month, invoices):
+    # Writes one file per customer; runs in a worker process. Returns a
+    # summary record per invoice.
+    summaries = []
+    for customer, lines in invoices:
+        name = f'invoice-{month}-{customer["id"]}.txt'
+        totals = money_fields(sum(line[-1] for line in lines))
+        with open(os.path.join(directory, name), 'w') as out:
+            out.write(f"Invoice for {month}\n")
+            out.write(f"Customer ID: {customer['id']}\n")
+            out.write(f"Name: {customer.get('name') or ''}\n")
+            out.write(f"Address: {customer.get('address') or ''}\n")
+            out.write(f"Telephone: {customer.get('telephone') or ''}\n")
+            TableWriter(INVOICE_COLUMNS, out).write(
+                line[:4] + (line[4], f'{ringgit(line[5]):.2f}') for line in lines
+            )
+            out.write(f"Total Amount: RM{totals['total_amount']:.2f}\n")
+            out.write(f"Service Tax (8%): RM{totals['service_tax']:.2f}\n")
+            out.write(f"Total Amount with Tax: RM{totals['total_amount_with_tax']:.2f}\n")
+        summaries.append({
+            "customer_id": customer["id"], "name": customer.get("name"), "parcels": len(lines), **totals, "file": name
+        })
+    return summaries
+
+
+def write_invoices(store, month, directory, workers=None):
+    # One invoice file per customer with parcels in month, plus SUMMARY_FILE.
+    # The invoices are rendered by a pool of worker processes (one per
+    # core by default); workers=1 renders them in this process. Returns the
+    # summary records.
+    os.makedirs(directory, exist_ok=True)
+    invoices = partition_month(store, month)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        results = [render_invoices(directory, month, task) for task in tasks(invoices)]
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            futures = [executor.submit(render_invoices, directory, month, task) for task in tasks(invoices)]
+            results = [future.result() for future in futures]
+    summaries = [summary for result in results for summary in result]
+    with open(os.path.join(directory, SUMMARY_FILE), 'w', newline='') as out:
+        write_csv(summaries, SUMMARY_FIELDS, out)
+    return summaries
+
+
+def invoice_month(system, month, directory=None, workers=None):
+    # The batch job behind `python -m parcel_system invoice YYYY-MM`
+    try:
+        month_range(month)
+    except ValueError:
+        print("Invalid month. Please use YYYY-MM.")
+        return None
+    directory = directory or os.path.join("invoices", month)
+    started = time.perf_counter()
+    summaries = write_invoices(system["store"], month, directory, workers)
+    parcels = sum(summary["parcels"] for summary in summaries)
+    total = ringgit(sum(to_sen(summary["total_amount_with_tax"]) for summary in summaries))
+    print(f"Wrote {len(summaries)} invoices for {month} ({parcels} parcels, RM{total:.2f} with tax) "
+          f"to {directory} in {time.perf_counter() - started:.2f}s.")
+    return summaries
@@ -0,0 +1,306 @@
+import json
+import os
+import time
+from collections import namedtuple
+from collections.abc import Mapping
+
+from .locking import LOCK_TIMEOUT, file_lock
+from .snapshot import open_snapshot, write_snapshot
+
+# Rewrite the snapshot once the journal holds this many entries
+COMPACT_EVERY = 5000
+
+# Changes other processes saved since this one last read a file. records
+# maps key -> record (None when deleted); complete means records is the
+# whole file, so any key missing from it has been deleted.
+RemoteChanges = namedtuple("RemoteChanges", "records meta complete")
+NO_CHANGES = RemoteChanges({}, {}, False)
+
+
+def encode_record(value):
+    # json default hook: records that are mappings but not dicts (the
+    # parcel table's rows) are written as JSON objects
+    if isinstance(value, Mapping):
+        return dict(value.items())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def write_atomic(path, data):
+    # Write to a temp file and rename it over the old one, so a crash never
+    # leaves a half-written data file behind
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as file:
+        # dumps uses the C encoder; dump streams through the pure-Python one
+        file.write(json.dumps(data, default=encode_record))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+class JournaledFile:
+    # A JSON data file (the snapshot) plus a JSON-Lines journal next to it.
+    # Each change is appended to the journal as one line:
+    #   {"op": "put", "key": ..., "record": {...}}
+    #   {"op": "delete", "key": ...}
+    #   {"op": "meta", "field": ..., "value": ...}
+    # Loading reads the snapshot and replays the journal on top of it.
+    #
+    # Several processes can share the files. <path>.version holds a stamp
+    #   {"version": 7, "generation": 2, "length": 1234}
+    # where version goes up on every save, generation on every compaction
+    # (it is odd while one is being written) and length is how many journal
+    # bytes are committed. Writers hold file_lock(path), catch up on what
+    # others saved since they last read and append after it, so nobody
+    # overwrites anyone else. Readers never lock: they read only committed
+    # bytes and start again if a compaction ran meanwhile.
+    #
+    # list_field names the list of records inside the snapshot, or is None
+    # when the snapshot is the list itself (users.json).
+    #
+    # With binary, compaction also writes <path>.snap, a binary snapshot of
+    # the same data (see snapshot.py) that load_binary opens without parsing.
+    def __init__(self, path, list_field, key_field, compact_every=COMPACT_EVERY, binary=False):
+        self.path = path
+        self.journal_path = path + '.journal'
+        self.version_path = path + '.version'
+        self.snapshot_path = path + '.snap'
+        self.binary = binary
+        self.list_field = list_field
+        self.key_field = key_field
+        self.compact_every = compact_every
+        self.entries = 0
+        self.meta = {}  # meta values already in the journal or snapshot
+        self.stamp = None  # the version stamp this process has read up to
+
+    def read_stamp(self):
+        try:
+            with open(self.version_path, 'r') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            # Files from before version stamps: the whole journal counts
+            try:
+                length = os.path.getsize(self.journal_path)
+            except FileNotFoundError:
+                length = 0
+            return {"version": 0, "generation": 0, "length": length}
+
+    def load(self):
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while True:
+            stamp = self.read_stamp()
+            if stamp["generation"] % 2 == 0:
+                data, entries, offset = self._read_data(stamp["length"])
+                if self.read_stamp()["generation"] == stamp["generation"]:
+                    break
+            elif time.monotonic() > deadline:
+                # A compaction that never finished because its writer died
+                with file_lock(self.path):
+                    stamp = self._recover(self.read_stamp())
+                    data, entries, offset = self._read_data(stamp["length"])
+                break
+            time.sleep(0.005)
+
+        self.stamp = dict(stamp, length=offset)
+        self.entries = entries
+        self._remember_meta(data)
+        return data
+
+    def refresh(self):
+        # Lock-free check for what other processes saved since this one last
+        # read the file; costs one small read when nothing changed
+        stamp = self.read_stamp()
+        if self.stamp is not None and (stamp["version"], stamp["generation"]) == (self.stamp["version"], self.stamp["generation"]):
+            return NO_CHANGES
+
+        if self.stamp is not None and stamp["generation"] == self.stamp["generation"]:
+            entries, offset = self._read_journal(self.stamp["length"], stamp["length"])
+            if self.read_stamp()["generation"] == stamp["generation"]:
+                records, meta = self._changes(entries)
+                self.stamp = dict(stamp, length=offset)
+                self.entries += len(entries)
+                self.meta.update(meta)
+                return RemoteChanges(records, meta, False)
+
+        # Compacted since this process last read it (or never read): take
+        # the whole file
+        try:
+            data = self.load()
+        except FileNotFoundError:
+            return NO_CHANGES
+        records = data[self.list_field] if self.list_field else data
+        return RemoteChanges({record[self.key_field]: record for record in records}, dict(self.meta), True)
+
+    def load_binary(self):
+        # Opens the binary snapshot instead of parsing the JSON. Returns
+        # (snapshot.Snapshot, records, meta), where records and meta are the
+        # journal entries written after the snapshot (key -> record or None,
+        # field -> value) for the caller to apply on top; or None when there
+        # is no snapshot of the file as it is now, and load() must be used.
+        if not self.binary:
+            return None
+        stamp = self.read_stamp()
+        if stamp["generation"] % 2:
+            return None
+        snapshot = open_snapshot(self.snapshot_path, self.list_field)
+        if snapshot is None or snapshot.generation != stamp["generation"] or snapshot.journal_offset > stamp["length"]:
+            return None
+        entries, offset = self._read_journal(snapshot.journal_offset, stamp["length"])
+        if self.read_stamp()["generation"] != stamp["generation"]:
+            return None
+        records, meta = self._changes(entries)
+        self.stamp = dict(stamp, length=offset)
+        self.entries = snapshot.journal_entries + len(entries)
+        self.meta = {**snapshot.data, **meta}
+        return snapshot, records, meta
+
+    def write_binary(self):
+        # Writes the binary snapshot of the file as it is now (for files
+        # written before there were binary snapshots). Returns the data.
+        with file_lock(self.path):
+            stamp = self._recover(self.read_stamp())
+            data, entries, offset = self._read_data(stamp["length"])
+            write_snapshot(self.snapshot_path, self.list_field, data, stamp["generation"], offset, entries)
+        return data
+
+    def _changes(self, entries):
+        # Journal entries as (key -> record or None, field -> value)
+        records, meta = {}, {}
+        for entry in entries:
+            if entry["op"] == "put":
+                records[entry["key"]] = entry["record"]
+            elif entry["op"] == "delete":
+                records[entry["key"]] = None
+            elif entry["op"] == "meta":
+                meta[entry["field"]] = entry["value"]
+        return records, meta
+
+    def _read_data(self, length):
+        # The snapshot with the first `length` bytes of the journal replayed
+        # on it. Returns (data, journal entries, journal bytes used).
+        try:
+            with open(self.path, 'r') as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            if not os.path.exists(self.journal_path):
+                raise
+            data = {self.list_field: []} if self.list_field else []
+
+        records = data[self.list_field] if self.list_field else data
+        by_key = {record[self.key_field]: record for record in records}
+        entries, offset = self._read_journal(0, length)
+
+        for entry in entries:
+            if entry["op"] == "put":
+                by_key[entry["key"]] = entry["record"]
+            elif entry["op"] == "delete":
+                by_key.pop(entry["key"], None)
+            elif entry["op"] == "meta":
+                data[entry["field"]] = entry["value"]
+
+        records = list(by_key.values())
+        if self.list_field:
+            data[self.list_field] = records
+            return data, len(entries), offset
+        return records, len(entries), offset
+
+    def _read_journal(self, start, end):
+        # Entries between two byte offsets of the journal, and the offset
+        # after the last complete one. A crash during an append can leave a
+        # partial last line; it is skipped here and cut off by the next writer.
+        try:
+            with open(self.journal_path, 'rb') as file:
+                file.seek(start)
+                data = file.read(max(0, end - start))
+        except FileNotFoundError:
+            return [], start
+
+        entries, offset = [], start
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b'\n'):
+                break
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                break
+            offset += len(line)
+        return entries, offset
+
+    def _remember_meta(self, data):
+        if self.list_field:
+            self.meta = {field: value for field, value in data.items() if field != self.list_field}
+
+    def append(self, changes, meta=None):
+        # changes maps key -> record, or key -> None for a deleted record.
+        # Returns what other processes saved since this one last read the
+        # file (RemoteChanges), for the caller to merge; records both
+        # changed end up as this process wrote them. Meta fields are
+        # counters, so a lower value than the one on file is not written.
+        with file_lock(self.path):
+            self._recover(self.read_stamp())
+            remote = self.refresh()
+
+            lines = []
+            for key, record in changes.items():
+                if record is None:
+                    lines.append(json.dumps({"op": "delete", "key": key}))
+                else:
+                    lines.append(json.dumps({"op": "put", "key": key, "record": record}, default=encode_record))
+            for field, value in (meta or {}).items():
+                known = self.meta.get(field)
+                if known is None or value > known:
+                    lines.append(json.dumps({"op": "meta", "field": field, "value": value}))
+                    self.meta[field] = value
+
+            if lines:
+                if self.stamp is None:
+                    self.stamp = self.read_stamp()
+                data = ('\n'.join(lines) + '\n').encode()
+                length = self.stamp["length"]
+                with open(self.journal_path, 'ab') as file:
+                    # Drop anything past the committed length (a writer that
+                    # died part way) before adding to it
+                    file.truncate(length)
+                    file.write(data)
+                    file.flush()
+                    os.fsync(file.fileno())
+                self.stamp = {
+                    "version": self.stamp["version"] + 1,
+                    "generation": self.stamp["generation"],
+                    "length": length + len(data)
+                }
+                write_atomic(self.version_path, self.stamp)
+                self.entries += len(lines)
+
+            if self.entries >= self.compact_every:
+                # Compact what is on disk, which includes every process's saves
+                self._write_snapshot(self._read_data(self.stamp["length"])[0], self.stamp)
+        return remote
+
+    def compact(self, data):
+        # Replace the whole file with data, e.g. after a reset
+        with file_lock(self.path):
+            self._write_snapshot(data, self.read_stamp())
+
+    def _recover(self, stamp):
+        # Finishes a compaction whose writer died part way. The snapshot was
+        # either replaced or not, and the journal replays the same on both.
+        if stamp["generation"] % 2 == 0:
+            return stamp
+        data = self._read_data(os.path.getsize(self.journal_path) if os.path.exists(self.journal_path) else 0)[0]
+        return self._write_snapshot(data, stamp)
+
+    def _write_snapshot(self, data, stamp):
+        # Write the full data as the new snapshot, then start an empty journal.
+        # Must hold the lock. The odd generation tells readers to wait.
+        generation = stamp["generation"] | 1
+        write_atomic(self.version_path, {"version": stamp["version"] + 1, "generation": generation, "length": stamp["length"]})
+        write_atomic(self.path, data)
+        if self.binary:
+            write_snapshot(self.snapshot_path, self.list_field, data, generation + 1)
+        with open(self.journal_path, 'w'):
+            pass
+        self.stamp = {"version": stamp["version"] + 2, "generation": generation + 1, "length": 0}
+        write_atomic(self.version_path, self.stamp)
+        self.entries = 0
+        self._remember_meta(data)
+        return self.stamp
@@ -0,0 +1,50 @@
+import os
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to creating the lock file exclusively
+    fcntl = None
+
+# Seconds to wait for another process to release a lock
+LOCK_TIMEOUT = 10.0
+
+
+@contextmanager
+def file_lock(path, timeout=LOCK_TIMEOUT):
+    # Exclusive advisory lock shared by every process using `path`, held on
+    # path + '.lock'. With flock the OS drops the lock if its holder dies,
+    # so a crashed terminal never leaves the others stuck. Not re-entrant:
+    # never take the same lock twice in one process.
+    lock_path = path + '.lock'
+    deadline = time.monotonic() + timeout
+    if fcntl is None:
+        while True:
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Could not lock {path}")
+                time.sleep(0.01)
+        try:
+            yield
+        finally:
+            os.close(fd)
+            os.remove(lock_path)
+        return
+
+    with open(lock_path, 'a') as file:
+        while True:
+            try:
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Could not lock {path}")
+                time.sleep(0.002)
+        try:
+            yield
+        finally:
+            fcntl.flock(file.fileno(), fcntl.LOCK_UN)
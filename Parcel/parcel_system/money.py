@@ -0,0 +1,66 @@
+from .pricing_engine import load_numpy
+
+# Money is added up as integer sen. Ringgit amounts (floats) are only made
+# for display and for the stored bills, as sen / 100, which is the nearest
+# float to the exact amount and is written as such (2.4, not the
+# 2.4000000000000004 that 30.0 * 0.08 gives).
+
+# Charged on a total (a bill, an invoice, a report), not per parcel
+SERVICE_TAX_PERCENT = 8
+
+
+def service_tax(total_sen):
+    # The tax on a total in sen, rounded half up to the sen. Works on an
+    # int or on a numpy array of them.
+    return (total_sen * SERVICE_TAX_PERCENT + 50) // 100
+
+
+def ringgit(sen):
+    return sen / 100
+
+
+def to_sen(amount):
+    # A ringgit amount from a bill (18.0) -> 1800; None counts as 0
+    return 0 if amount is None else round(amount * 100)
+
+
+def money_fields(total_sen):
+    # The total fields of a bill or a report for a total in sen
+    tax_sen = service_tax(total_sen)
+    return {
+        "total_amount": ringgit(total_sen),
+        "service_tax": ringgit(tax_sen),
+        "total_amount_with_tax": ringgit(total_sen + tax_sen)
+    }
+
+
+def mismatched_totals(amounts, lengths, stored):
+    # Totals many ringgit amounts in groups and compares them with stored
+    # totals: group i is the next lengths[i] amounts and stored[i] its
+    # (total amount, service tax, total with tax). Returns [(i, total in
+    # sen), ...] for the groups whose stored totals are not exactly what
+    # their amounts give. With numpy the sums are one cumulative integer
+    # sum over all amounts instead of a Python loop per group.
+    numpy = load_numpy()
+    if numpy is None:
+        wrong, start = [], 0
+        for index, (length, totals) in enumerate(zip(lengths, stored)):
+            total_sen = sum(map(to_sen, amounts[start:start + length]))
+            start += length
+            fields = money_fields(total_sen)
+            if list(totals) != [fields["total_amount"], fields["service_tax"], fields["total_amount_with_tax"]]:
+                wrong.append((index, total_sen))
+        return wrong
+
+    # None (an amount or a total that is missing) becomes NaN: a missing
+    # amount counts 0 and a missing total never matches
+    sen = numpy.nan_to_num(numpy.rint(numpy.asarray(amounts, dtype=numpy.float64) * 100)).astype(numpy.int64)
+    lengths = numpy.asarray(lengths, dtype=numpy.int64)
+    ends = numpy.cumsum(lengths)
+    running = numpy.concatenate(([0], numpy.cumsum(sen)))
+    totals = running[ends] - running[ends - lengths]
+    taxes = service_tax(totals)
+    expected = numpy.stack([totals, taxes, totals + taxes], axis=1) / 100
+    stored = numpy.asarray(stored, dtype=numpy.float64).reshape(-1, 3)
+    wrong = numpy.flatnonzero((stored != expected).any(axis=1))
+    return [(int(index), int(totals[index])) for index in wrong]
@@ -0,0 +1,102 @@
+import json
+import os
+
+from .locking import file_lock
+
+# Consignment and parcel numbers start here, same as the original counters
+FIRST_NUMBER = 10000000
+
+# Default size of a block handed out to an intake process
+DEFAULT_BLOCK_SIZE = 1000
+
+
+class NumberAllocator:
+    # Hands out increasing numbers in O(1). The counter never goes back to
+    # FIRST_NUMBER, and every issued number is kept in a set so numbers that
+    # were loaded from file (or added by hand) are skipped without a scan.
+    def __init__(self, next_number=FIRST_NUMBER, issued=None):
+        self.next_number = next_number
+        self.issued = set(issued or ())
+        self._block = iter(())
+        self._block_source = None
+
+    def mark_issued(self, number):
+        self.issued.add(number)
+        if number >= self.next_number:
+            self.next_number = number + 1
+
+    def use_blocks(self, block_source, size=1):
+        # Take numbers from reserved ranges instead of the local counter, so
+        # several processes never hand out the same one. block_source(size)
+        # is called for a fresh range (see reserve_block) whenever one runs
+        # out; with size 1 each number is claimed as it is handed out.
+        self._block_source = block_source
+        self._block_size = size
+        self._block = iter(())
+
+    def reserve(self, count):
+        # Makes sure the next `count` numbers are already reserved, so a
+        # batch (an import) takes them in one range instead of one at a time
+        if self._block_source is None:
+            return
+        numbers = list(self._block)
+        if len(numbers) < count:
+            numbers.extend(self._block_source(count - len(numbers)))
+        self._block = iter(numbers)
+
+    def allocate(self):
+        while self._block_source is not None:
+            for number in self._block:
+                if number not in self.issued:
+                    self.mark_issued(number)
+                    return number
+            self._block = iter(self._block_source(self._block_size))
+
+        number = self.next_number
+        while number in self.issued:
+            number += 1
+        self.next_number = number + 1
+        self.issued.add(number)
+        return number
+
+
+def allocator_from_records(records, field, next_number=FIRST_NUMBER, prefix=''):
+    # Builds an allocator from stored records in one pass, e.g. parcels with
+    # "parcel_number": "P10000001"
+    issued = set()
+    for record in records:
+        value = str(record[field])
+        if value.startswith(prefix) and value[len(prefix):].isdigit():
+            issued.add(int(value[len(prefix):]))
+    return allocator_from_numbers(issued, next_number)
+
+
+def allocator_from_numbers(issued, next_number=FIRST_NUMBER):
+    # Builds an allocator from a set of numbers already in use
+    if issued:
+        next_number = max(next_number, max(issued) + 1)
+    allocator = NumberAllocator(next_number)
+    allocator.issued = issued
+    return allocator
+
+
+def reserve_block(counter_file, name, size=DEFAULT_BLOCK_SIZE, floor=FIRST_NUMBER):
+    # Reserves `size` numbers for the counter `name` stored in counter_file
+    # and returns them as a range. The shared file only holds the next free
+    # number per counter, so many intake processes can take ranges at once.
+    with file_lock(counter_file):
+        try:
+            with open(counter_file, 'r') as file:
+                counters = json.load(file)
+        except FileNotFoundError:
+            counters = {}
+
+        start = max(counters.get(name, floor), floor)
+        counters[name] = start + size
+
+        tmp_file = counter_file + '.tmp'
+        with open(tmp_file, 'w') as file:
+            json.dump(counters, file)
+        os.replace(tmp_file, counter_file)
+
+    return range(start, start + size)
@@ -0,0 +1,306 @@
+from datetime import datetime
+
+from .billing import add_to_bill, remove_from_bill, save_bills_to_file, view_bill
+from .bulk_import import ImportReport, iter_batches, iter_manifest, validate_row
+from .customers import reserve_customer_blocks, view_customers
+from .columns import ParcelTable
+from .numbering import FIRST_NUMBER, allocator_from_numbers, reserve_block
+from .pricing import check_price, get_pricing_engine, quote_many
+from .pricing_engine import NO_PRICE, format_price
+from .render import Column, TableWriter, paginate
+from .storage import COUNTERS_FILE, get_storage, number_block_size
+from .sync import merge_remote
+
+# Parcel handling functions
+
+def initialize_parcels():
+    return {"parcels": [], "current_consignment_number": FIRST_NUMBER, "current_parcel_number": FIRST_NUMBER}
+
+def add_parcel(system, customer_id, destination, weight, sender_name, sender_address, sender_telephone,
+               consignment_number=None, bill=True):
+    # Starts a new consignment unless consignment_number is given. With
+    # bill=False the caller bills the parcel, e.g. through a BillingPipeline.
+    price = check_price(destination, weight)
+    if price is not None:
+        if consignment_number is None:
+            consignment_number = generate_unique_consignment_number(system)
+        parcel_number = generate_unique_parcel_number(system)
+        parcel = {
+            "consignment_number": consignment_number,
+            "parcel_number": parcel_number,
+            "customer_id": customer_id,
+            "destination": destination,
+            "weight": weight,
+            "sender_name": sender_name,
+            "sender_address": sender_address,
+            "sender_telephone": sender_telephone,
+            "price": price,
+            "date": datetime.now().strftime("%Y-%m-%d")
+        }
+        system["store"].add_parcel(parcel)
+
+        # Update the bill for the consignment
+        if bill:
+            add_to_bill(system, parcel)
+
+        return consignment_number, parcel_number
+    else:
+        print("Invalid destination or weight for pricing. Cannot add parcel.")
+        return None
+
+def bulk_import(system, path):
+    # Imports a manifest file (CSV or JSON-Lines, see bulk_import.py) of
+    # parcels. Rows are streamed and priced in batches, and everything is
+    # saved in one go at the end. Returns an ImportReport.
+    report = ImportReport()
+    store = system["store"]
+    engine = get_pricing_engine()
+
+    for batch in iter_batches(iter_manifest(path)):
+        valid = []
+        for line_number, row in batch:
+            cleaned, reason = validate_row(row, store.customers, engine.zones)
+            if reason:
+                report.reject(line_number, reason)
+            else:
+                valid.append((line_number, cleaned))
+
+        # Each row is priced with the tariff in force on its date
+        prices = quote_many(
+            [row["destination"] for _, row in valid], [row["weight"] for _, row in valid], [row["date"] for _, row in valid]
+        )
+        reserve_numbers(system, int(sum(price != NO_PRICE for price in prices)))
+        for (line_number, row), price in zip(valid, prices):
+            if price == NO_PRICE:
+                report.reject(line_number, f"no price for {row['destination']} at {row['weight']}kg")
+                continue
+            consignment_number = generate_unique_consignment_number(system)
+            parcel = {
+                "consignment_number": consignment_number,
+                "parcel_number": generate_unique_parcel_number(system),
+                "customer_id": row["customer_id"],
+                "destination": row["destination"],
+                "weight": row["weight"],
+                "sender_name": row["sender_name"],
+                "sender_address": row["sender_address"],
+                "sender_telephone": row["sender_telephone"],
+                "price": format_price(int(price)),
+                "date": row["date"]
+            }
+            store.add_parcel(parcel)
+            add_to_bill(system, parcel)
+            report.accepted += 1
+
+    # One save for the whole manifest
+    save_parcels_to_file(system)
+    save_bills_to_file(system)
+    report.finish()
+    return report
+
+PARCEL_FIELDS = [
+    "consignment_number", "parcel_number", "customer_id", "destination", "weight",
+    "sender_name", "sender_address", "sender_telephone", "price", "date"
+]
+PARCEL_COLUMNS = [
+    Column("Consignment Number", 18), Column("Parcel Number", 13), Column("Customer ID", 11, '>'),
+    Column("Destination", 12), Column("Weight", 8, '>'), Column("Sender Name", 20), Column("Sender Address", 28),
+    Column("Sender Telephone", 16), Column("Price", 10, '>'), Column("Date", 10)
+]
+
+def parcel_row(parcel):
+    return [parcel[field] for field in PARCEL_FIELDS]
+
+def iter_parcels(system, since=None):
+    # All parcels, or those dated `since` or later (in date order, from the
+    # store's date index)
+    store = system["store"]
+    if since:
+        return store.iter_parcels_since(since)
+    return iter(store.parcels.values())
+
+def view_parcels(system, since=None, page=None, offset=0, limit=None):
+    if not system["store"].parcels:
+        print("No parcels available.")
+    else:
+        # Rows are printed as they are read instead of collected first
+        parcels = paginate(iter_parcels(system, since), page, offset, limit)
+        TableWriter(PARCEL_COLUMNS).write(map(parcel_row, parcels))
+
+def load_parcels_from_file(system):
+    # Opens the binary snapshot when there is one for the file as it is now
+    # (see snapshot.py) and applies the journal saved after it; else reads
+    # the JSON. Either way the parcels go into the store as one table. With
+    # SQLite they stay in the database and only the counters are read.
+    storage = get_storage("parcels")
+    store = system["store"]
+    try:
+        loaded = storage.load_binary()
+        if store.database:
+            data = storage.load_meta()
+        elif loaded:
+            snapshot, records, meta = loaded
+            store.load_parcels(*snapshot.parcels())
+            store.merge("parcels", records)
+            data = {**snapshot.data, **meta}
+        else:
+            data = storage.load()
+            store.load_parcels(ParcelTable.from_records(data["parcels"]))
+        store.take_changes("parcels")
+        system["current_consignment_number"] = data["current_consignment_number"]
+        system["current_parcel_number"] = data["current_parcel_number"]
+        system.pop("parcel_allocator", None)
+        system.pop("consignment_allocator", None)
+    except FileNotFoundError:
+        pass
+
+def save_parcels_to_file(system, compact=False):
+    storage = get_storage("parcels")
+    changes = system["store"].take_changes("parcels")
+    meta = {
+        "current_consignment_number": system["current_consignment_number"],
+        "current_parcel_number": system["current_parcel_number"]
+    }
+    if compact:
+        data = {"parcels": list(system["store"].parcels.values()), **meta}
+        storage.compact(data)
+    else:
+        merge_remote(system, "parcels", storage.append(changes, meta), written=changes)
+
+# Number allocators are built once from the loaded parcels (straight from
+# the table's number columns) and then hand out numbers without scanning
+# every parcel again. The store is loaded first, since loading it may set
+# the allocators up with reserved blocks (reserve_number_blocks).
+def get_parcel_allocator(system):
+    store = system["store"]
+    if "parcel_allocator" not in system:
+        numbers = store.parcels.numbers("parcel_number", prefix='P')
+        system["parcel_allocator"] = allocator_from_numbers(numbers, system["current_parcel_number"])
+    return system["parcel_allocator"]
+
+def get_consignment_allocator(system):
+    store = system["store"]
+    if "consignment_allocator" not in system:
+        numbers = store.parcels.numbers("consignment_number")
+        system["consignment_allocator"] = allocator_from_numbers(numbers, system["current_consignment_number"])
+    return system["consignment_allocator"]
+
+def reserve_number_blocks(system, size):
+    # Several intake processes can share the data files, so each one takes
+    # its numbers (and customer IDs) from COUNTERS_FILE, under its lock: in
+    # ranges of `size`, or one at a time with size 1
+    reserve_customer_blocks(system, size)
+    parcel_allocator = get_parcel_allocator(system)
+    consignment_allocator = get_consignment_allocator(system)
+    parcel_allocator.use_blocks(
+        lambda count: reserve_block(COUNTERS_FILE, "parcel", count, parcel_allocator.next_number), size
+    )
+    consignment_allocator.use_blocks(
+        lambda count: reserve_block(COUNTERS_FILE, "consignment", count, consignment_allocator.next_number), size
+    )
+
+def reserve_numbers(system, count):
+    # Reserves parcel and consignment numbers for `count` parcels at once
+    get_parcel_allocator(system).reserve(count)
+    get_consignment_allocator(system).reserve(count)
+
+def generate_unique_parcel_number(system):
+    allocator = get_parcel_allocator(system)
+    parcel_number = allocator.allocate()
+    system["current_parcel_number"] = max(system["current_parcel_number"], parcel_number + 1)
+    return f'P{parcel_number}'
+
+def generate_unique_consignment_number(system):
+    allocator = get_consignment_allocator(system)
+    consignment_number = allocator.allocate()
+    system["current_consignment_number"] = max(system["current_consignment_number"], consignment_number + 1)
+    return f'{consignment_number}'  # Use f-string for correct formatting
+
+def create_consignment(system):
+    view_customers(system)
+
+    try:
+        customer_id = int(input("Enter the customer ID for consignment: "))
+        customer = system["store"].get_customer(customer_id)
+
+        if customer:
+            consignment_number = None
+            while True:
+                destination = input("Enter destination: ")
+                weight = float(input("Enter weight of the parcel: "))
+                sender_name = input("Enter sender's name: ")
+                sender_address = input("Enter sender's address: ")
+                sender_telephone = input("Enter sender's telephone: ")
+
+                result = add_parcel(system, customer_id, destination, weight, sender_name, sender_address, sender_telephone, consignment_number)
+
+                if result:
+                    consignment_number, parcel_number = result
+                    print(f"Parcel {parcel_number} added to consignment {consignment_number}.")
+                elif consignment_number is None:
+                    print("Failed to create consignment.")
+                    return
+
+                if input("Add another parcel to this consignment? (yes/no): ").lower() != 'yes':
+                    break
+
+            bill = system["store"].get_bill(consignment_number)
+            print(f"Consignment created successfully! Number: {consignment_number}, Parcels: {len(bill['items'])}, Total with tax: RM{bill['total_amount_with_tax']:.2f}")
+        else:
+            print("Customer not found.")
+    except ValueError:
+        print("Invalid input. Please enter a valid customer ID.")
+
+def delete_parcel_within_consignment(system, consignment_number):
+    view_bill(system, consignment_number)
+    parcel_number_to_delete = input("Enter the parcel number to delete within this consignment: ")
+
+    parcel = system["store"].get_parcel(parcel_number_to_delete)
+    if parcel and parcel["consignment_number"] == consignment_number:
+        # The deleted parcel comes back as a dict; its row in the table is reused
+        parcel = system["store"].delete_parcel(parcel_number_to_delete)
+        remove_from_bill(system, parcel)
+        print(f"Parcel {parcel_number_to_delete} deleted successfully from the consignment {consignment_number}!")
+        save_parcels_to_file(system)
+        save_bills_to_file(system)
+        return
+
+    print(f"Parcel {parcel_number_to_delete} not found in the consignment {consignment_number}.")
+
+def delete_parcel_from_bill(system, consignment_number, parcel_number):
+    parcel = system["store"].get_parcel(parcel_number)
+    if parcel and parcel["consignment_number"] == consignment_number:
+        parcel = system["store"].delete_parcel(parcel_number)
+        remove_from_bill(system, parcel)
+        print("Parcel deleted successfully from the bill!")
+        return
+    print("Parcel not found in the bill.")
+
+def reset_system(system):
+    confirmation = input("Are you sure you want to reset all parcels and bills? (yes/no): ")
+
+    if confirmation.lower() == 'yes':
+        # Clear parcels and bills data
+        system["store"].clear_parcels_and_bills()
+
+        # Reset current parcel and consignment numbers to default
+        system["current_consignment_number"] = FIRST_NUMBER
+        system["current_parcel_number"] = FIRST_NUMBER
+
+        # Reset current bill number to default
+        system["current_bill_id"] = FIRST_NUMBER
+
+        # Rebuild the number allocators from the empty lists, taking their
+        # numbers from COUNTERS_FILE as at start-up (other terminals may
+        # still hold numbers from before the reset, so the shared counters
+        # are not wound back)
+        system.pop("parcel_allocator", None)
+        system.pop("consignment_allocator", None)
+        reserve_number_blocks(system, number_block_size())
+
+        # Save changes to files, rewriting them in full
+        save_parcels_to_file(system, compact=True)
+        save_bills_to_file(system, compact=True)
+
+        print("Parcels, bills, and counters reset successfully!")
+    else:
+        print("Reset operation canceled.")
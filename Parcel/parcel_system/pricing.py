@@ -0,0 +1,197 @@
+import json
+from datetime import date
+
+from .pricing_engine import NO_PRICE, QuoteCache, ZoneRate, format_price
+from .render import print_table
+from .storage import PRICING_FILE, get_database
+from .tariff import (
+    FIRST_DAY, TariffVersion, price_to_sen, sen_to_price, tariff_from_json, tariff_from_table, tariff_to_json
+)
+
+# Pricing functions
+
+# Used until PRICING_FILE is read, and when there is none
+table_price = [
+    ['Zone A', 'RM8.00', 'RM16.00', 'RM18.00'],
+    ['Zone B', 'RM9.00', 'RM18.00', 'RM20.00'],
+    ['Zone C', 'RM10.00', 'RM20.00', 'RM22.00'],
+    ['Zone D', 'RM11.00', 'RM22.00', 'RM24.00'],
+    ['Zone E', 'RM12.00', 'RM24.00', 'RM26.00']
+]
+
+# The effective-dated zone rates (see tariff.py). Each version compiles
+# its own PricingEngine on first use.
+tariff = tariff_from_table(table_price)
+EMPTY_TARIFF = TariffVersion(FIRST_DAY, [])
+
+# check_price's quotes for today (see QuoteCache)
+quote_cache = QuoteCache()
+
+# PRICING_FILE is read the first time a price is needed
+pricing_loaded = False
+
+def get_tariff():
+    if not pricing_loaded:
+        load_pricing_from_file()
+    return tariff
+
+def get_pricing_engine(day=None):
+    # The engine for the tariff in force on day (default today); one with
+    # no zones before the first tariff
+    version = get_tariff().in_force(day or date.today())
+    if version is None:
+        return EMPTY_TARIFF.engine()
+    return version.engine()
+
+def invalidate_pricing():
+    # Called whenever the whole tariff changes
+    with quote_cache.lock:
+        for version in tariff.versions:
+            version._engine = None
+        quote_cache.clear()
+
+def _set_band(destination, band, sen, effective):
+    # Sets one band of the zone's rate in a version starting on effective
+    # (default today). The price changes first and the zone's cached quotes
+    # go after, both under the cache's lock (see QuoteCache). Returns False
+    # when the zone is not priced then.
+    if destination not in get_pricing_engine(effective).zones:
+        return False
+    with quote_cache.lock:
+        tariff.edit(effective or date.today()).zones[destination].prices[band] = sen
+        quote_cache.forget_zone(destination)
+    return True
+
+def modify_price(destination, new_price, band=-1, effective=None):
+    # Changes one band's price (by default the heaviest) from effective on.
+    # Raises ValueError for a price that is not one, '' included: a band's
+    # price is only removed by delete_price.
+    sen = price_to_sen(new_price)
+    if sen == NO_PRICE:
+        raise ValueError("no new price given")
+    return _set_band(destination, band, sen, effective)
+
+def delete_price(destination, band=-1, effective=None):
+    return _set_band(destination, band, NO_PRICE, effective)
+
+def zone_rate(destination, day=None):
+    # The zone's rate in force on day (default today), or None
+    version = get_tariff().in_force(day or date.today())
+    return version.zones.get(destination) if version else None
+
+def set_zone_rate(destination, limits, prices, surcharge=None, effective=None):
+    # Replaces (or adds) a zone's weight bands from effective on. limits is
+    # [("below" or "up_to", kg), ...], prices one more than limits (price
+    # strings, '' for none) and surcharge (above kg, price per started kg).
+    # Raises ValueError for a price that is not one or limits out of order.
+    if surcharge:
+        per_kg = price_to_sen(surcharge[1])
+        if per_kg == NO_PRICE:
+            raise ValueError(f"bad surcharge {surcharge[1]!r}")
+        surcharge = (float(surcharge[0]), per_kg)
+    rate = ZoneRate(destination, [(kind, float(kg)) for kind, kg in limits], [price_to_sen(price) for price in prices], surcharge)
+    current = get_tariff()
+    with quote_cache.lock:
+        current.edit(effective or date.today()).zones[destination] = rate
+        quote_cache.forget_zone(destination)
+
+def check_price(destination, weight, day=None):
+    # Today's quotes come from quote_cache; a quote for another day is
+    # worked out each time
+    if day is not None:
+        price = get_pricing_engine(day).quote(destination, weight)
+        return None if price is None else format_price(price)
+
+    if quote_cache.expired():
+        today = date.today()
+        generation = quote_cache.generation
+        engine = get_pricing_engine(today)
+        if not quote_cache.start_day(today, engine, generation):
+            # Prices changed meanwhile; quoted without the cache this time
+            price = engine.quote(destination, weight)
+            return None if price is None else format_price(price)
+    return quote_cache.quote(destination, weight)
+
+def quote_cache_stats():
+    # Hit/miss counters of check_price's cache
+    return quote_cache.stats()
+
+def quote_many(destinations, weights, dates=None):
+    # Prices in sen for many parcels in one call (see PricingEngine.quote_many).
+    # With dates (one per parcel), each parcel is priced with the tariff in
+    # force on its date: the parcels are grouped by tariff version, found
+    # with a bisect per distinct date, and each group is quoted in one go.
+    if dates is None:
+        return get_pricing_engine().quote_many(destinations, weights)
+
+    current = get_tariff()
+    positions = {}
+    groups = {}
+    for index, day in enumerate(dates):
+        if day not in positions:
+            positions[day] = current.position(day)
+        groups.setdefault(positions[day], []).append(index)
+    if len(groups) == 1:
+        position = next(iter(groups))
+        return _engine_at(position).quote_many(destinations, weights)
+
+    prices = [NO_PRICE] * len(dates)
+    for position, indexes in groups.items():
+        quoted = _engine_at(position).quote_many([destinations[i] for i in indexes], [weights[i] for i in indexes])
+        for index, price in zip(indexes, quoted):
+            prices[index] = int(price)
+    return prices
+
+def _engine_at(position):
+    return tariff.versions[position].engine() if position >= 0 else EMPTY_TARIFF.engine()
+
+def print_pricing_table(headers=None, day=None):
+    # The tariff in force on day (default today). headers replaces the
+    # default headings when every zone has the old three weight bands.
+    version = get_tariff().in_force(day or date.today())
+    rates = list(version.zones.values()) if version else []
+    labels = {tuple(rate.labels()) for rate in rates}
+    if len(labels) > 1:
+        # Zones with their own bands are listed a band per row
+        rows = [[rate.zone, label, sen_to_price(price)]
+                for rate in rates for label, price in zip(rate.labels(), rate.prices)]
+        print_table(rows, headers=["Destination", "Weight", "Price"])
+    else:
+        band_labels = list(labels.pop()) if labels else ["Below 1kg", "1-3kg", "Above 3kg"]
+        if headers is None or len(headers) != len(band_labels) + 1:
+            headers = ["Destination"] + band_labels
+        rows = [[rate.zone] + [sen_to_price(price) for price in rate.prices] for rate in rates]
+        print_table(rows, headers=list(headers))
+
+    surcharges = [rate for rate in rates if rate.surcharge]
+    for rate in surcharges:
+        print(f"{rate.zone}: plus {format_price(rate.surcharge[1])} per kg above {rate.surcharge[0]:g}kg")
+    if version and version.effective != FIRST_DAY:
+        print(f"In force from {version.effective.strftime('%d/%m/%Y')}")
+
+def save_pricing_to_file():
+    database = get_database()
+    data = tariff_to_json(get_tariff())
+    if database:
+        database.save_pricing(data)
+        return
+    with open(PRICING_FILE, 'w') as file:
+        json.dump(data, file)
+
+def load_pricing_from_file():
+    # PRICING_FILE holds the tariff versions, or the old pricing table (a
+    # list of rows), which becomes one version covering every date
+    global pricing_loaded, tariff
+    pricing_loaded = True
+    database = get_database()
+    if database:
+        data = database.load_pricing()
+    else:
+        try:
+            with open(PRICING_FILE, 'r') as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            data = None
+    if data:
+        tariff = tariff_from_json(data)
+        invalidate_pricing()
@@ -0,0 +1,267 @@
+import math
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+# numpy is imported when the first PricingEngine is built rather than at
+# start-up; it stays None if numpy is not installed, and quote_many then
+# falls back to plain Python lists
+numpy = None
+numpy_checked = False
+
+
+def load_numpy():
+    global numpy, numpy_checked
+    if not numpy_checked:
+        numpy_checked = True
+        try:
+            import numpy as module
+            numpy = module
+        except ImportError:
+            pass
+    return numpy
+
+# Marks a zone/band with no price (e.g. after delete_price)
+NO_PRICE = -1
+
+
+@lru_cache(maxsize=1024)
+def parse_price(text):
+    # 'RM18.00' -> 1800 sen. Returns None for '' or anything unparseable.
+    # Cached, since the same few price strings appear on every parcel.
+    text = str(text).strip().upper().replace('RM', '', 1).strip()
+    if not text:
+        return None
+    ringgit, _, sen = text.partition('.')
+    if not ringgit.isdigit() or (sen and not sen.isdigit()):
+        return None
+    return int(ringgit) * 100 + int((sen + '00')[:2])
+
+
+def format_price(sen):
+    return f'RM{sen // 100}.{sen % 100:02d}'
+
+
+# Surcharged weight is charged per started kg; float noise below this
+# (30.1 - 30 is 0.10000000000000142) does not start another one
+SURCHARGE_TOLERANCE = 1e-9
+
+
+class ZoneRate:
+    # The price of one zone: weight bands with a price each, plus an optional
+    # per-kg surcharge above a threshold. Band i covers the weights below
+    # limits[i] ("below", kg) or up to and including it ("up_to", kg); the
+    # last band has no limit. prices holds sen, or NO_PRICE for a band with
+    # no price. surcharge is (above kg, sen per started kg above it) or None.
+    def __init__(self, zone, limits, prices, surcharge=None):
+        if len(prices) != len(limits) + 1:
+            raise ValueError(f"{zone}: {len(limits)} band limits need {len(limits) + 1} prices, not {len(prices)}")
+        # "up to 3kg" is "below the next float after 3.0", so one
+        # bisect_right over bounds gives the band of any weight
+        bounds = [kg if kind == "below" else math.nextafter(kg, math.inf) for kind, kg in limits]
+        if any(low >= high for low, high in zip(bounds, bounds[1:])):
+            raise ValueError(f"{zone}: band limits must go up")
+        self.zone = zone
+        self.limits = [(kind, kg) for kind, kg in limits]
+        self.prices = list(prices)
+        self.surcharge = tuple(surcharge) if surcharge else None
+        self.bounds = bounds
+
+    def copy(self):
+        return ZoneRate(self.zone, self.limits, self.prices, self.surcharge)
+
+    def band(self, weight):
+        return bisect_right(self.bounds, weight)
+
+    def band_key(self, weight):
+        # Weights with the same key have the same price: the band, and the
+        # started kg above the surcharge threshold (0 below it)
+        band = bisect_right(self.bounds, weight)
+        if self.surcharge and weight > self.surcharge[0]:
+            return band, math.ceil(weight - self.surcharge[0] - SURCHARGE_TOLERANCE)
+        return band, 0
+
+    def price(self, weight):
+        # Price in sen, or None when the weight's band has no price
+        price = self.prices[bisect_right(self.bounds, weight)]
+        if price == NO_PRICE:
+            return None
+        if self.surcharge and weight > self.surcharge[0]:
+            price += self.surcharge[1] * math.ceil(weight - self.surcharge[0] - SURCHARGE_TOLERANCE)
+        return price
+
+    def labels(self):
+        # Band headings, e.g. "Below 1kg", "1-3kg", "Above 3kg"
+        labels, low = [], None
+        for kind, kg in self.limits:
+            if low is None:
+                labels.append(f"{'Below' if kind == 'below' else 'Up to'} {kg:g}kg")
+            else:
+                labels.append(f"{low[1]:g}-{kg:g}kg")
+            low = (kind, kg)
+        if low is None:
+            labels.append("Any weight")
+        else:
+            labels.append(f"{'Above' if low[0] == 'up_to' else 'From'} {low[1]:g}kg")
+        return labels
+
+
+class PricingEngine:
+    # The zone rates of one tariff version compiled into a zone -> rate
+    # lookup, so quoting is one dict lookup plus a bisect over the zone's
+    # band limits. When every zone has the same limits, quote_many finds all
+    # the bands with one numpy searchsorted and prices them from a matrix
+    # (zones x bands) of sen.
+    def __init__(self, rates):
+        self.zones = {}
+        self.rates = []
+        for rate in rates:
+            self.zones.setdefault(rate.zone, len(self.rates))
+            self.rates.append(rate)
+        shared = {tuple(rate.bounds) for rate in self.rates}
+        self.bounds = list(shared.pop()) if len(shared) == 1 else None
+        self.matrix = None
+        numpy = load_numpy()
+        if numpy and self.bounds is not None:
+            self.matrix = numpy.array([rate.prices for rate in self.rates], dtype=numpy.int64)
+            self.surcharge_above = numpy.array(
+                [rate.surcharge[0] if rate.surcharge else numpy.inf for rate in self.rates], dtype=numpy.float64)
+            self.surcharge_per_kg = numpy.array(
+                [rate.surcharge[1] if rate.surcharge else 0 for rate in self.rates], dtype=numpy.int64)
+
+    def quote(self, destination, weight):
+        # Price in sen, or None when the zone or its band has no price
+        zone = self.zones.get(destination)
+        if zone is None:
+            return None
+        return self.rates[zone].price(weight)
+
+    def quote_many(self, destinations, weights):
+        # Prices in sen for many parcels at once. Parcels with an unknown
+        # zone or a deleted price get NO_PRICE.
+        if self.matrix is None:
+            return [NO_PRICE if price is None else price
+                    for price in map(self.quote, destinations, weights)]
+
+        weights = numpy.asarray(weights, dtype=numpy.float64)
+        zones = self.zones
+        rows = numpy.fromiter((zones.get(name, -1) for name in destinations), dtype=numpy.int64, count=len(weights))
+        result = numpy.full(len(weights), NO_PRICE, dtype=numpy.int64)
+        known = rows >= 0
+        rows, weights = rows[known], weights[known]
+
+        prices = self.matrix[rows, numpy.searchsorted(self.bounds, weights, side='right')]
+        over = numpy.maximum(weights - self.surcharge_above[rows] - SURCHARGE_TOLERANCE, 0)
+        surcharged = prices + numpy.ceil(over).astype(numpy.int64) * self.surcharge_per_kg[rows]
+        result[known] = numpy.where(prices == NO_PRICE, NO_PRICE, surcharged)
+        return result
+
+
+# Quotes kept by QuoteCache; a few zones times a few bands is far below it
+QUOTE_CACHE_SIZE = 1024
+
+# Marks a key missing from QuoteCache (None is a cached "no price")
+_MISSING = object()
+
+
+class QuoteCache:
+    # A bounded LRU of formatted quotes from one day's PricingEngine, keyed
+    # by (zone, ZoneRate.band_key), so every weight in a band shares an
+    # entry. start_day sets the engine and keeps the entries unless the day
+    # changed; at midnight, or after forget_zone or clear, `expired` tells
+    # the caller to start the day again. Hits take no lock (each
+    # OrderedDict call is atomic), so the service's threads never wait on
+    # it; the counters may miss a few increments under heavy threading.
+    #
+    # Filling an entry, starting the day and forgetting entries hold lock.
+    # Code changing prices holds it too, across the change and forget_zone,
+    # so a quote worked out from the old prices is either cached before
+    # the change and then forgotten, or not cached at all: an entry is
+    # only added from the current engine while the cache has not expired,
+    # and start_day refuses an engine fetched before the last forget_zone
+    # or clear (see generation).
+    def __init__(self, size=QUOTE_CACHE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()
+        self.engine = None
+        self.day = None
+        self.expires = 0.0  # time.time() at which engine must be fetched again
+        self.lock = threading.RLock()
+        self.generation = 0  # goes up with every forget_zone and clear
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def expired(self):
+        return time.time() >= self.expires
+
+    def start_day(self, day, engine, generation=None):
+        # generation is self.generation as read before fetching engine;
+        # returns False (and changes nothing) when prices changed since
+        with self.lock:
+            if generation is not None and generation != self.generation:
+                return False
+            if day != self.day:
+                self.entries.clear()
+                self.day = day
+            self.engine = engine
+            self.expires = datetime.combine(day + timedelta(days=1), datetime.min.time()).timestamp()
+            return True
+
+    def quote(self, destination, weight):
+        # Formatted price, or None when the zone or its band has no price
+        engine = self.engine
+        zone = engine.zones.get(destination)
+        if zone is None:
+            self.misses += 1
+            return None
+        rate = engine.rates[zone]
+        key = (destination, rate.band_key(weight))
+        price = self.entries.get(key, _MISSING)
+        if price is not _MISSING:
+            self.hits += 1
+            try:
+                self.entries.move_to_end(key)
+            except KeyError:
+                pass  # evicted by another thread meanwhile
+            return price
+
+        self.misses += 1
+        with self.lock:
+            price = rate.price(weight)
+            price = None if price is None else format_price(price)
+            if engine is not self.engine or self.expired():
+                # Prices changed since this quote started; not cached
+                return price
+            self.entries[key] = price
+            if len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return price
+
+    def forget_zone(self, zone):
+        # After one zone's rates changed: its entries go and the engine is
+        # fetched again; the other zones' entries stay valid
+        with self.lock:
+            for key in [key for key in list(self.entries) if key[0] == zone]:
+                self.entries.pop(key, None)
+            self.expires = 0.0
+            self.generation += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.day = None
+            self.expires = 0.0
+            self.generation += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+            "entries": len(self.entries), "size": self.size,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
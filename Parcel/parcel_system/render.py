@@ -0,0 +1,88 @@
+import csv
+import json
+import sys
+import textwrap
+from collections import namedtuple
+from itertools import islice
+
+# A table column: header, cell width in characters and alignment ('<' or '>')
+Column = namedtuple("Column", "header width align", defaults=('<',))
+
+
+def print_table(rows, headers):
+    # For small tables (pricing, summaries). tabulate is imported the first
+    # time a table is printed, not at startup.
+    from tabulate import tabulate
+    print(tabulate(rows, headers=headers, tablefmt="grid"))
+
+
+class TableWriter:
+    # Prints rows in the same grid layout as tabulate's "grid" format, one
+    # row at a time as they come from the store. Column widths are fixed
+    # up front instead of measured over every row, so nothing has to be
+    # collected first; longer values wrap onto more lines of the same row.
+    # Exports (write_csv, write_jsonl) always carry the full values.
+    def __init__(self, columns, out=None):
+        self.columns = [Column(column.header, max(column.width, len(column.header)), column.align) for column in columns]
+        self.out = out or sys.stdout
+        self.rule = '+' + '+'.join('-' * (column.width + 2) for column in self.columns) + '+\n'
+        self.header_rule = self.rule.replace('-', '=')
+        # e.g. "| {:<9.9} | {:>8.8} |"; cells are wrapped to fit first
+        self.widths = [column.width for column in self.columns]
+        self.template = '| ' + ' | '.join(f'{{:{column.align}{column.width}.{column.width}}}' for column in self.columns) + ' |\n'
+
+    def write(self, rows):
+        # Writes the header and every row; returns how many rows were written
+        write = self.out.write
+        template = self.template
+        rule = self.rule
+        write(rule)
+        write(template.format(*(column.header for column in self.columns)))
+        write(self.header_rule)
+        count = 0
+        widths = self.widths
+        for row in rows:
+            cells = ['' if value is None else str(value) for value in row]
+            if any(len(cell) > width for cell, width in zip(cells, widths)):
+                for line in self.wrap(cells):
+                    write(template.format(*line))
+            else:
+                write(template.format(*cells))
+            write(rule)
+            count += 1
+        return count
+
+    def wrap(self, cells):
+        # The lines of a row with cells longer than their column: each cell
+        # split at spaces (or mid-word when it has to) to the column width
+        wrapped = [textwrap.wrap(cell, width) if len(cell) > width else [cell]
+                   for cell, width in zip(cells, self.widths)]
+        height = max(map(len, wrapped))
+        return [[lines[i] if i < len(lines) else '' for lines in wrapped] for i in range(height)]
+
+
+def paginate(rows, page=None, offset=0, limit=None):
+    # Slices a stream of rows without building a list: page is 1-based and
+    # counts in pages of `limit` rows; offset skips rows before that
+    if page and limit:
+        offset += (page - 1) * limit
+    return islice(rows, offset, None if limit is None else offset + limit)
+
+
+def write_csv(records, fields, out):
+    # One CSV line per record, straight from the store's dicts
+    writer = csv.writer(out)
+    writer.writerow(fields)
+    count = 0
+    for record in records:
+        writer.writerow([record.get(field) for field in fields])
+        count += 1
+    return count
+
+
+def write_jsonl(records, out):
+    count = 0
+    for record in records:
+        out.write(json.dumps(dict(record.items())) + '\n')
+        count += 1
+    return count
@@ -0,0 +1,51 @@
+from collections import defaultdict
+from itertools import islice
+
+from .money import money_fields, ringgit
+from .pricing_engine import parse_price
+
+# Rows per page when a report is printed
+REPORT_PAGE_SIZE = 50
+
+
+class BillingReport:
+    # Streams the parcels of a report page by page and adds up the totals as
+    # the rows go past, so only one page is held in memory at a time. The
+    # summary is complete once every page has been read.
+    def __init__(self, parcels):
+        self._parcels = iter(parcels)
+        self.count = 0
+        self.weight = 0.0
+        self.total_sen = 0
+        self.zone_totals = defaultdict(int)  # destination -> sen
+
+    def _add(self, parcel):
+        price = parse_price(parcel["price"]) or 0
+        self.count += 1
+        self.weight += parcel["weight"]
+        self.total_sen += price
+        self.zone_totals[parcel["destination"]] += price
+
+    def pages(self, page_size=REPORT_PAGE_SIZE):
+        while True:
+            page = list(islice(self._parcels, page_size))
+            if not page:
+                return
+            for parcel in page:
+                self._add(parcel)
+            yield page
+
+    def rows(self):
+        for page in self.pages():
+            yield from page
+
+    def summary(self):
+        # Reads whatever has not been paged through yet, then returns totals
+        for _ in self.pages():
+            pass
+        return {
+            "parcels": self.count,
+            "weight": self.weight,
+            **money_fields(self.total_sen),
+            "zones": {zone: ringgit(sen) for zone, sen in sorted(self.zone_totals.items())}
+        }
@@ -0,0 +1,126 @@
+from collections import defaultdict
+
+from .money import money_fields
+from .pricing_engine import parse_price
+from .store import date_ordinal
+
+
+class Totals:
+    __slots__ = ("count", "weight", "amount_sen")
+
+    def __init__(self):
+        self.count = 0
+        self.weight = 0.0
+        self.amount_sen = 0
+
+    def add(self, sign, weight, amount_sen):
+        self.count += sign
+        self.weight += sign * weight
+        self.amount_sen += sign * amount_sen
+
+    def as_dict(self):
+        return {
+            "parcels": self.count,
+            "weight": round(self.weight, 3),
+            # Tax on the total, as on a bill, rather than added up per parcel
+            **money_fields(self.amount_sen)
+        }
+
+
+class RevenueRollup:
+    # Revenue counters per day x zone x customer, plus per day, per zone and
+    # per customer, kept up to date by the store's listener events so that
+    # revenue questions are dictionary reads instead of parcel scans.
+    #
+    # When the store loads a whole table at once (parcels_loaded) the
+    # counters are only worked out from it at the first question, so
+    # start-up does not pay for a scan of every parcel.
+    def __init__(self):
+        self.cells = defaultdict(Totals)  # (day ordinal, zone, customer id)
+        self.by_day = defaultdict(Totals)
+        self.by_zone = defaultdict(Totals)
+        self.by_customer = defaultdict(Totals)
+        self.overall = Totals()
+        self.pending = None  # the loaded parcel table, until it is counted
+        self.removed_customers = set()
+
+    def _ensure(self):
+        if self.pending is None:
+            return
+        parcels, self.pending = self.pending, None
+        for parcel in parcels.values():
+            self._apply(parcel, 1)
+        for customer_id in self.removed_customers:
+            self.by_customer.pop(customer_id, None)
+        self.removed_customers.clear()
+
+    def _apply(self, parcel, sign):
+        price = parse_price(parcel["price"]) or 0
+        day = date_ordinal(parcel["date"])
+        keys = (
+            (self.cells, (day, parcel["destination"], parcel["customer_id"])),
+            (self.by_day, day),
+            (self.by_zone, parcel["destination"]),
+            (self.by_customer, parcel["customer_id"]),
+        )
+        for table, key in keys:
+            if sign < 0 and key not in table:
+                # e.g. the customer's counters were dropped by customer_removed
+                continue
+            totals = table[key]
+            totals.add(sign, parcel["weight"], price)
+            if totals.count == 0:
+                del table[key]
+        self.overall.add(sign, parcel["weight"], price)
+
+    # Store listener events
+
+    def parcels_loaded(self, parcels):
+        self.__init__()
+        self.pending = parcels
+
+    # Changes before the loaded table is counted are in the table by then
+
+    def parcel_added(self, parcel):
+        if self.pending is None:
+            self._apply(parcel, 1)
+
+    def parcel_removed(self, parcel):
+        if self.pending is None:
+            self._apply(parcel, -1)
+
+    def customer_removed(self, customer):
+        # A deleted customer no longer appears in per-customer revenue; their
+        # parcels are still in the store, so day and zone totals keep them
+        if self.pending is not None:
+            self.removed_customers.add(customer["id"])
+        self.by_customer.pop(customer["id"], None)
+
+    def cleared(self):
+        self.__init__()
+
+    # Queries
+
+    def for_customer(self, customer_id):
+        self._ensure()
+        return self.by_customer.get(customer_id, Totals()).as_dict()
+
+    def for_zone(self, zone):
+        self._ensure()
+        return self.by_zone.get(zone, Totals()).as_dict()
+
+    def for_day(self, day):
+        self._ensure()
+        return self.by_day.get(date_ordinal(day), Totals()).as_dict()
+
+    def for_cell(self, day, zone, customer_id):
+        self._ensure()
+        return self.cells.get((date_ordinal(day), zone, customer_id), Totals()).as_dict()
+
+    def zones(self):
+        self._ensure()
+        return {zone: totals.as_dict() for zone, totals in sorted(self.by_zone.items())}
+
+    def total(self):
+        self._ensure()
+        return self.overall.as_dict()
@@ -0,0 +1,189 @@
+import heapq
+import re
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+
+# Matches returned by a search unless asked for more
+DEFAULT_LIMIT = 10
+
+# Fuzzy matches must share at least this share of their trigrams (Dice
+# coefficient) with the query
+MIN_SIMILARITY = 0.3
+
+# Joins a key and its customer id in the sorted prefix lists; sorting
+# plain strings is several times faster than sorting (key, id) tuples
+SEPARATOR = '\x00'
+
+# Trigrams in more than this many names say little about a match, so a
+# query made only of such common trigrams looks at the rarest few of them
+COMMON_GRAM = 2000
+
+
+NOT_DIGITS = re.compile(r'\D+')
+
+
+def normalize_name(name):
+    return ' '.join(str(name or '').lower().replace(SEPARATOR, ' ').split())
+
+
+def normalize_telephone(telephone):
+    return NOT_DIGITS.sub('', str(telephone or ''))
+
+
+def trigrams(text):
+    # The name padded with spaces, so short names and word starts count too
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CustomerSearch:
+    # Name and telephone search over the store's customers, kept up to date
+    # by the store's listener events:
+    #   names       sorted "<name from a word onwards>\0<customer id>", so
+    #               a prefix of any word of the name is a bisect and a short walk
+    #   telephones  sorted "<digits of the telephone>\0<customer id>"
+    #   grams       trigram -> customer ids, for names typed with typos
+    # The index is built at the first search, so start-up does not pay for it.
+    def __init__(self, store):
+        self.store = store
+        self.built = False
+        self.names = []
+        self.telephones = []
+        self.grams = defaultdict(set)
+        self.indexed = {}  # customer id -> (normalized name, telephone digits, number of trigrams)
+
+    def _ensure(self):
+        if self.built:
+            return
+        self.built = True
+        names, telephones, grams = [], [], self.grams
+        for customer in self.store.customers.values():
+            customer_id = customer["id"]
+            name, telephone = normalize_name(customer.get("name")), normalize_telephone(customer.get("telephone"))
+            names.extend(f'{key}{SEPARATOR}{customer_id}' for key in _word_starts(name))
+            if telephone:
+                telephones.append(f'{telephone}{SEPARATOR}{customer_id}')
+            name_grams = trigrams(name) if name else ()
+            for gram in name_grams:
+                grams[gram].add(customer_id)
+            self.indexed[customer_id] = (name, telephone, len(name_grams))
+        names.sort()
+        telephones.sort()
+        self.names, self.telephones = names, telephones
+
+    def _add(self, customer):
+        customer_id = customer["id"]
+        name, telephone = normalize_name(customer.get("name")), normalize_telephone(customer.get("telephone"))
+        for key in _word_starts(name):
+            insort(self.names, f'{key}{SEPARATOR}{customer_id}')
+        if telephone:
+            insort(self.telephones, f'{telephone}{SEPARATOR}{customer_id}')
+        name_grams = trigrams(name) if name else ()
+        for gram in name_grams:
+            self.grams[gram].add(customer_id)
+        self.indexed[customer_id] = (name, telephone, len(name_grams))
+
+    def _remove(self, customer_id):
+        # The keys are worked out again from the indexed name and telephone,
+        # since the customer record may already hold new ones
+        indexed = self.indexed.pop(customer_id, None)
+        if indexed is None:
+            return
+        name, telephone, _ = indexed
+        for key in _word_starts(name):
+            _discard(self.names, f'{key}{SEPARATOR}{customer_id}')
+        if telephone:
+            _discard(self.telephones, f'{telephone}{SEPARATOR}{customer_id}')
+        for gram in (trigrams(name) if name else ()):
+            ids = self.grams[gram]
+            ids.discard(customer_id)
+            if not ids:
+                del self.grams[gram]
+
+    # Store listener events
+
+    def customer_added(self, customer):
+        # Also sent when another terminal's copy replaces a customer
+        if self.built:
+            self._remove(customer["id"])
+            self._add(customer)
+
+    def customer_updated(self, customer):
+        self.customer_added(customer)
+
+    def customer_removed(self, customer):
+        if self.built:
+            self._remove(customer["id"])
+
+    # Queries
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        # Up to limit (customer id, score) pairs, best first. A query of
+        # digits matches telephones by prefix; otherwise names starting
+        # with it (at any word) score 1.0 and are followed by names that
+        # look like it, scored by shared trigrams.
+        self._ensure()
+        digits = normalize_telephone(query)
+        name = normalize_name(query)
+        if not name:
+            return []
+        if digits and not any(character.isalpha() for character in name):
+            return [(customer_id, 1.0) for customer_id in _prefixed(self.telephones, digits, limit)]
+
+        found = _prefixed(self.names, name, limit)
+        matches = [(customer_id, 1.0) for customer_id in found]
+        if len(matches) < limit:
+            seen = set(found)
+            matches.extend(item for item in self.similar(name, limit + len(seen)) if item[0] not in seen)
+        return matches[:limit]
+
+    def similar(self, name, limit=DEFAULT_LIMIT):
+        # Names sharing the most trigrams with name (Dice coefficient)
+        self._ensure()
+        query = trigrams(normalize_name(name))
+        postings = sorted((self.grams[gram] for gram in query if gram in self.grams), key=len)
+        if not postings:
+            return []
+        rare = [ids for ids in postings if len(ids) <= COMMON_GRAM] or postings[:3]
+        shared = Counter()
+        for ids in rare:
+            shared.update(ids)
+        # Candidates found through rare trigrams also get credit for the
+        # common ones they share
+        for ids in postings[len(rare):]:
+            shared.update(shared.keys() & ids)
+
+        scored = []
+        for customer_id, count in shared.items():
+            score = 2 * count / (len(query) + self.indexed[customer_id][2])
+            if score >= MIN_SIMILARITY:
+                scored.append((score, -customer_id))
+        return [(-negative_id, round(score, 3)) for score, negative_id in heapq.nlargest(limit, scored)]
+
+
+def _word_starts(name):
+    # "ahmad tan wei" -> "ahmad tan wei", "tan wei", "wei"
+    words = name.split(' ') if name else []
+    return [' '.join(words[i:]) for i in range(len(words))]
+
+
+def _prefixed(keys, prefix, limit):
+    # Customer ids of the sorted "key\0id" strings whose key starts with
+    # prefix, in key order, without repeats
+    found = []
+    position = bisect_left(keys, prefix)
+    while position < len(keys) and len(found) < limit:
+        entry = keys[position]
+        if not entry.startswith(prefix):
+            break
+        customer_id = int(entry.rpartition(SEPARATOR)[2])
+        if customer_id not in found:
+            found.append(customer_id)
+        position += 1
+    return found
+
+
+def _discard(keys, item):
+    position = bisect_left(keys, item)
+    if position < len(keys) and keys[position] == item:
+        del keys[position]
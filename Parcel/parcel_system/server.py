@@ -0,0 +1,187 @@
+import argparse
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from .service import Forbidden, NotFound, ParcelService, Unauthorized
+from .sessions import audit_to_file
+from . import storage
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8080
+
+# Threads running service calls, so a slow save never blocks the event loop
+WORKER_THREADS = 32
+
+# Largest request body accepted, in bytes
+MAX_BODY = 10 * 1024 * 1024
+
+STATUS_TEXT = {
+    200: 'OK', 201: 'Created', 400: 'Bad Request', 401: 'Unauthorized', 403: 'Forbidden', 404: 'Not Found',
+    405: 'Method Not Allowed', 500: 'Internal Server Error'
+}
+
+
+def route(service, method, path, query, body, token=None, client=None):
+    # Maps a request to a service call. Returns (status, capability,
+    # function, args): the request needs a session with the capability, or
+    # just a session when it is '', or none when it is None (logging in).
+    parts = [unquote(part) for part in path.strip('/').split('/') if part]
+    one = lambda name, default=None: query.get(name, [default])[0]
+
+    if parts == ['sessions'] and method == 'POST':
+        return 201, None, service.login, (body['username'], body['password'], client)
+    if parts == ['sessions', 'current'] and method == 'GET':
+        return 200, '', service.session_info, (token, int(one('actions', 20)))
+    if parts == ['sessions', 'current'] and method == 'DELETE':
+        return 200, '', service.logout, (token,)
+    if parts == ['price'] and method == 'GET':
+        return 200, 'view_pricing', service.check_price, (one('destination'), one('weight'))
+    if parts == ['quotes'] and method == 'POST':
+        return 200, 'view_pricing', service.quote_many, (body['destinations'], body['weights'])
+    if parts == ['quotes', 'stats'] and method == 'GET':
+        return 200, 'view_pricing', service.quote_stats, ()
+    if parts == ['customers'] and method == 'GET':
+        return 200, 'view_customers', service.search_customers, (one('q', ''), one('limit', 10))
+    if parts == ['customers'] and method == 'POST':
+        return 201, 'manage_customers', service.add_customer, (body['name'], body['address'], body['telephone'])
+    if len(parts) == 2 and parts[0] == 'customers' and method == 'GET':
+        return 200, 'view_customers', service.get_customer, (parts[1],)
+    if len(parts) == 3 and parts[0] == 'customers' and parts[2] == 'bills' and method == 'GET':
+        return 200, 'view_bills', service.bills_by_customer, (parts[1],)
+    if parts == ['parcels'] and method == 'POST':
+        return 201, 'book_parcels', service.book_parcel, (
+            body['customer_id'], body['destination'], body['weight'], body['sender_name'],
+            body['sender_address'], body['sender_telephone'], body.get('consignment_number')
+        )
+    if len(parts) == 2 and parts[0] == 'bills' and method == 'GET':
+        return 200, 'view_bills', service.get_bill, (parts[1],)
+    if parts == ['bills'] and method == 'GET':
+        return 200, 'view_bills', service.bills_by_date, (
+            one('start'), one('end'), int(one('offset', 0)), int(one('limit', 100))
+        )
+    if parts == ['billing', 'stats'] and method == 'GET':
+        return 200, 'view_bills', service.billing_stats, ()
+    if parts == ['revenue'] and method == 'GET':
+        return 200, 'view_revenue', service.revenue, ()
+    raise NotFound(f"No route for {method} {path}")
+
+
+class ParcelServer:
+    # A small HTTP/1.1 JSON server on asyncio. Connections are kept alive,
+    # and each request's service call runs on the thread pool.
+    def __init__(self, service, host=DEFAULT_HOST, port=DEFAULT_PORT, workers=WORKER_THREADS):
+        self.service = service
+        self.host = host
+        self.port = port
+        self.executor = ThreadPoolExecutor(workers)
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY:
+                    self.write_response(writer, 400, {"error": "Request body too large"}, False)
+                    await writer.drain()
+                    break
+                body = await reader.readexactly(length) if length > 0 else b''
+                status, payload = await self.respond(method, target, body, headers, writer.get_extra_info('peername'))
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                self.write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, method, target, raw_body, headers, peer=None):
+        # Requests other than logging in carry "Authorization: Bearer <token>"
+        # from POST /sessions. Each one is added to its session's audit trail.
+        url = urlsplit(target)
+        scheme, _, token = headers.get('authorization', '').partition(' ')
+        token = token.strip() if scheme.lower() == 'bearer' else None
+        session = None
+        try:
+            body = json.loads(raw_body) if raw_body else {}
+            status, capability, function, args = route(
+                self.service, method, url.path, parse_qs(url.query), body, token, peer[0] if peer else None
+            )
+            loop = asyncio.get_running_loop()
+            if capability is not None:
+                # On the thread pool too: it takes the service lock and may
+                # read the users file
+                session = await loop.run_in_executor(self.executor, self.service.authorize, token, capability)
+            result = await loop.run_in_executor(self.executor, function, *args)
+        except NotFound as error:
+            status, result = 404, {"error": str(error)}
+        except Unauthorized as error:
+            status, result = 401, {"error": str(error)}
+        except Forbidden as error:
+            status, result = 403, {"error": str(error)}
+        except (KeyError, TypeError, ValueError) as error:
+            status, result = 400, {"error": f"Bad request: {error}"}
+        except Exception as error:
+            status, result = 500, {"error": str(error)}
+        if session is not None:
+            session.audit(f"{method} {url.path}", status=status)
+        return status, result
+
+    def write_response(self, writer, status, payload, keep_alive):
+        data = json.dumps(payload).encode()
+        head = (
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode() + data)
+
+    async def serve(self, ready=None):
+        server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        self.port = server.sockets[0].getsockname()[1]
+        if ready:
+            ready()
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the parcel system over HTTP/JSON")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--audit-log', help="append every session's actions to this file as JSON lines")
+    parser.add_argument('--number-blocks', type=int, default=storage.NUMBER_BLOCK_SIZE, metavar='SIZE',
+                        help="take numbers in blocks of SIZE instead of one at a time")
+    args = parser.parse_args()
+    storage.NUMBER_BLOCK_SIZE = args.number_blocks
+
+    service = ParcelService()
+    if args.audit_log:
+        service.system["sessions"].audit = audit_to_file(args.audit_log)
+    server = ParcelServer(service, args.host, args.port)
+    print(f"Serving on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == '__main__':
+    main()
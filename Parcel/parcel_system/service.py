@@ -0,0 +1,204 @@
+import threading
+
+from .billing import save_bills_to_file
+from .billing_pipeline import BillingPipeline
+from .customers import add_customer, save_customers_to_file, search_customers
+from .directory import can
+from .parcels import add_parcel, save_parcels_to_file
+from .pricing import check_price, quote_cache_stats, quote_many
+from .reports import BillingReport
+from .sync import sync_system
+from .system import load_system
+from .users import open_session
+
+
+class NotFound(LookupError):
+    pass
+
+
+class Unauthorized(PermissionError):
+    # No session, or it expired
+    pass
+
+
+class Forbidden(PermissionError):
+    # The session's role lacks the capability
+    pass
+
+
+class ParcelService:
+    # The parcel system without the menus, for use from other code and from
+    # server.py. Every call that reads or changes the store holds the lock,
+    # so many threads can use one service at once. Quotes only read the
+    # compiled pricing engine and do not wait for the lock. Reads first pick
+    # up what other processes saved to the data files.
+    #
+    # Booked parcels are billed by a BillingPipeline on its own thread, so
+    # booking does not wait for bills to be updated and saved; calls that
+    # read a bill first wait for its parcels booked so far to be billed.
+    # With billing=False every booking bills and saves its bill itself.
+    def __init__(self, system=None, billing=True):
+        self.system = system if system is not None else load_system()
+        self.lock = threading.RLock()
+        self.billing = BillingPipeline(self.system, self.lock) if billing else None
+
+    def close(self):
+        # Bills everything booked and stops the billing thread
+        if self.billing is not None:
+            self.billing.close()
+
+    def _billed(self, consignment_number):
+        if self.billing is not None:
+            self.billing.wait(consignment_number)
+
+    def billing_stats(self):
+        # Parcels waiting to be billed, and parcels and batches billed
+        return self.billing.stats() if self.billing is not None else {"pending": 0}
+
+    # Sessions: many people can be logged in to one service at once, each
+    # with their own token (see sessions.SessionManager)
+
+    def login(self, username, password, client=None):
+        # Slow on purpose (password hashing), so the password is checked
+        # without holding the lock; other calls go on meanwhile
+        session = open_session(self.system, username, password, self.lock, client=client)
+        if session is None:
+            raise Unauthorized("Invalid username or password")
+        return self._describe(session)
+
+    def logout(self, token):
+        session = self.system["sessions"].close(token)
+        if session is None:
+            raise Unauthorized("Log in first")
+        return {"logged_out": session.username}
+
+    def authorize(self, token, capability=''):
+        # The token's session, or Unauthorized. With a capability, the user
+        # (as the directory has them now, so role changes count at once)
+        # must have it, or Forbidden is raised. Holds the lock, since the
+        # first call reads the users file.
+        with self.lock:
+            session = self.system["sessions"].get(token) if token else None
+            if session is None:
+                raise Unauthorized("Log in first")
+            user = self.system["users"].find(session.username)
+            if user is None:
+                self.system["sessions"].close(token)
+                raise Unauthorized(f"User {session.username} no longer exists")
+            if capability and not can(user, capability):
+                raise Forbidden(f"{session.username} may not {capability.replace('_', ' ')}")
+            session.user = user
+            return session
+
+    def session_info(self, token, actions=20):
+        # Who the session is, with its last actions
+        session = self.authorize(token)
+        return dict(self._describe(session), actions=list(session.actions)[-actions:] if actions > 0 else [])
+
+    def _describe(self, session):
+        return {
+            "token": session.token, "username": session.username, "role": session.user.get("role"),
+            "idle_seconds": self.system["sessions"].idle_seconds
+        }
+
+    # Pricing
+
+    def check_price(self, destination, weight):
+        price = check_price(destination, float(weight))
+        if price is None:
+            raise NotFound(f"No price for {destination} at {weight}kg")
+        return {"destination": destination, "weight": float(weight), "price": price}
+
+    def quote_many(self, destinations, weights):
+        prices = quote_many(destinations, [float(weight) for weight in weights])
+        return [None if price < 0 else int(price) for price in prices]
+
+    def quote_stats(self):
+        return quote_cache_stats()
+
+    # Customers
+
+    def add_customer(self, name, address, telephone):
+        with self.lock:
+            customer_id = add_customer(self.system, name, address, telephone)
+            save_customers_to_file(self.system)
+            return self.get_customer(customer_id)
+
+    def get_customer(self, customer_id):
+        with self.lock:
+            sync_system(self.system)
+            customer = self.system["store"].get_customer(int(customer_id))
+            if customer is None:
+                raise NotFound(f"Customer {customer_id} not found")
+            return dict(customer)
+
+    def search_customers(self, query, limit=10):
+        # Best matches first; see search.CustomerSearch
+        with self.lock:
+            sync_system(self.system)
+            return [dict(customer) for customer in search_customers(self.system, query, int(limit))]
+
+    # Parcels and bills
+
+    def book_parcel(self, customer_id, destination, weight, sender_name, sender_address, sender_telephone, consignment_number=None):
+        weight = float(weight)
+        if check_price(destination, weight) is None:
+            raise ValueError(f"No price for {destination} at {weight}kg")
+        with self.lock:
+            sync_system(self.system)
+            store = self.system["store"]
+            if store.get_customer(int(customer_id)) is None:
+                raise NotFound(f"Customer {customer_id} not found")
+            if consignment_number is not None and not store.has_consignment(consignment_number):
+                raise NotFound(f"Consignment {consignment_number} not found")
+            consignment_number, parcel_number = add_parcel(
+                self.system, int(customer_id), destination, weight,
+                sender_name, sender_address, sender_telephone, consignment_number, bill=self.billing is None
+            )
+            save_parcels_to_file(self.system)
+            if self.billing is None:
+                save_bills_to_file(self.system)
+            parcel = dict(store.get_parcel(parcel_number))
+        # Outside the lock: a full queue waits for the billing thread
+        if self.billing is not None:
+            self.billing.submit(parcel)
+        return parcel
+
+    def get_bill(self, consignment_number):
+        self._billed(str(consignment_number))
+        with self.lock:
+            sync_system(self.system)
+            bill = self.system["store"].get_bill(str(consignment_number))
+            if bill is None:
+                raise NotFound(f"Consignment {consignment_number} not found")
+            return dict(bill, items=list(bill["items"]))
+
+    def bills_by_customer(self, customer_id):
+        with self.lock:
+            customer = self.get_customer(customer_id)
+            parcels = [dict(parcel) for parcel in self.system["store"].parcels_for_customer(customer["id"])]
+            return {
+                "customer": customer,
+                "parcels": parcels,
+                "totals": self.system["rollups"].for_customer(customer["id"])
+            }
+
+    def bills_by_date(self, start_date, end_date, offset=0, limit=100):
+        # One page of the date-range report plus the totals for the range
+        with self.lock:
+            sync_system(self.system)
+            store = self.system["store"]
+            report = BillingReport(store.iter_parcels_between(start_date, end_date))
+            rows = []
+            for parcel in report.rows():
+                if offset:
+                    offset -= 1
+                elif len(rows) < limit:
+                    rows.append(dict(parcel))
+            return {"parcels": rows, "totals": report.summary()}
+
+    def revenue(self):
+        with self.lock:
+            sync_system(self.system)
+            rollups = self.system["rollups"]
+            return {"zones": rollups.zones(), "total": rollups.total()}
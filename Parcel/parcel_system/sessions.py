@@ -0,0 +1,132 @@
+import heapq
+import json
+import secrets
+import threading
+import time
+from collections import deque
+
+# A session not used for this long is logged out
+SESSION_IDLE_SECONDS = 30 * 60
+
+# Actions remembered per session for its audit trail
+AUDIT_ENTRIES = 100
+
+# Heap entries handled per login or lookup, so a request never waits for a
+# whole burst of sessions to expire; the rest are handled by the next ones
+EXPIRE_BATCH = 100
+
+
+class Session:
+    # One logged-in person. context says who and from where, and goes into
+    # every audit entry of the session.
+    def __init__(self, token, user, context, expires_at, sink=None):
+        self.token = token
+        self.user = user
+        self.context = context
+        self.expires_at = expires_at
+        self.actions = deque(maxlen=AUDIT_ENTRIES)
+        self.sink = sink
+
+    @property
+    def username(self):
+        return self.user["username"]
+
+    def audit(self, action, **details):
+        entry = {"at": time.time(), **self.context, "action": action, **details}
+        self.actions.append(entry)
+        if self.sink:
+            self.sink(entry)
+        return entry
+
+
+class SessionManager:
+    # Sessions keyed by a random token, so finding the session of a request
+    # is one dict lookup. Idle expiry uses a heap of (expires at, token)
+    # instead of scanning every session: using a session only moves its
+    # expires_at, and an entry popped from the heap for a session used since
+    # is pushed back with the new time, so each use costs O(1) and each
+    # expiry check O(log n) per session due.
+    def __init__(self, idle_seconds=SESSION_IDLE_SECONDS, audit=None, clock=time.monotonic):
+        self.idle_seconds = idle_seconds
+        self.audit = audit  # called with every audit entry, e.g. to write a log
+        self.clock = clock
+        self.sessions = {}
+        self.expiry = []
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def open(self, user, **context):
+        token = secrets.token_urlsafe(32)
+        context = {"session": token[:8], "username": user["username"], "role": user.get("role"), **context}
+        with self.lock:
+            now = self.clock()
+            self._expire(now, EXPIRE_BATCH)
+            session = Session(token, user, context, now + self.idle_seconds, self.audit)
+            self.sessions[token] = session
+            heapq.heappush(self.expiry, (session.expires_at, token))
+        session.audit("login")
+        return session
+
+    def get(self, token):
+        # The session, kept alive for another idle_seconds, or None when
+        # there is none or it expired
+        with self.lock:
+            now = self.clock()
+            self._expire(now, EXPIRE_BATCH)
+            session = self.sessions.get(token)
+            if session is None:
+                return None
+            if session.expires_at <= now:
+                # Due, but its heap entry was not reached yet
+                del self.sessions[token]
+                session.audit("expired")
+                return None
+            session.expires_at = now + self.idle_seconds
+            return session
+
+    def close(self, token):
+        # Its heap entry is dropped when it comes up
+        with self.lock:
+            session = self.sessions.pop(token, None)
+        if session is not None:
+            session.audit("logout")
+        return session
+
+    def expire(self):
+        with self.lock:
+            return self._expire(self.clock())
+
+    def _expire(self, now, limit=None):
+        # Handles up to limit (all with None) heap entries that are due
+        expired = []
+        expiry = self.expiry
+        handled = 0
+        while expiry and expiry[0][0] <= now and (limit is None or handled < limit):
+            handled += 1
+            _, token = heapq.heappop(expiry)
+            session = self.sessions.get(token)
+            if session is None:
+                continue
+            if session.expires_at > now:
+                heapq.heappush(expiry, (session.expires_at, token))
+            else:
+                del self.sessions[token]
+                expired.append(session)
+        for session in expired:
+            session.audit("expired")
+        return expired
+
+
+def audit_to_file(path):
+    # An audit callback for SessionManager appending each entry to path as
+    # a JSON line
+    file = open(path, 'a', buffering=1)
+    lock = threading.Lock()
+
+    def write(entry):
+        line = json.dumps(entry)
+        with lock:
+            file.write(line + '\n')
+    return write
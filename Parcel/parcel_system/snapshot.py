@@ -0,0 +1,370 @@
+# Binary snapshots of the parcels and bills files, written next to them as
+# <file>.snap. A snapshot is opened with mmap instead of parsed: the parcel
+# columns, the string table and the indexes are used in place as
+# memoryviews, so start-up costs about the same however many parcels there
+# are, and the pages are read from disk when something first touches them.
+#
+# Layout (all numbers in the byte order of the machine that wrote it,
+# recorded in the header; a snapshot from the other byte order is ignored):
+#
+#   header     HEADER: magic, FORMAT_VERSION, byte order, generation,
+#              journal offset, number of sections
+#   directory  one SECTION per section: name, offset, length
+#   sections   each starting on an 8-byte boundary
+#
+# The "meta" section is JSON: the file's other fields (the counters), the
+# values that do not fit the fixed-width columns, and so on. The rest are
+# arrays of fixed-width values:
+#
+#   parcels    column.<n>: one per parcel field, one value per row (see
+#              columns.ParcelTable); strings.offsets and strings.data: the
+#              string table of the text columns; cons.* and cust.*: the
+#              consignment and customer index chains; date_index;
+#              parcels.keys and parcels.rows, cons.keys and cust.keys: keys
+#              sorted for bisect, so lookups need no dict at start-up
+#   bills      bills.keys: consignment numbers in file order; bills.order:
+#              rows sorted by consignment number, for bisect; bills.offsets
+#              and bills.data: each bill as a JSON object (bills hold a list
+#              of items of no fixed shape, so they are decoded one at a time
+#              when used)
+#
+# generation and journal offset say which version of the data file the
+# snapshot matches: JournaledFile.load_binary uses it only while the data
+# file is at that generation, and replays the journal from that offset.
+# Compaction writes a new snapshot along with the new JSON file.
+#
+# Convert existing files (JSON backend only) with
+#
+#   python -m parcel_system.snapshot
+import bisect
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import MutableMapping
+
+from .columns import ABSENT, EncodedColumn, ParcelTable, RowChains, StringTable, TypedColumn
+from .store import build_indexes
+
+MAGIC = b'PARCSNAP'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<8sHBxqqI')
+SECTION = struct.Struct('<16sQQ')
+BYTE_ORDERS = {'little': 0, 'big': 1}
+
+# Typecodes used in snapshots; a machine whose arrays have other item sizes
+# cannot use the file
+TYPECODES = 'iIqd'
+
+
+def itemsizes():
+    return {typecode: array(typecode).itemsize for typecode in TYPECODES}
+
+
+def sorted_lookup(table, field, heads):
+    # key -> row pairs (rows whose field holds the key) as two arrays sorted
+    # by the packed key, plus a list of [key, row] for keys kept in the
+    # table's overrides
+    packed = table.columns[field].data
+    numbered, others = [], []
+    for key, row in heads:
+        overrides = table.overrides.get(row)
+        if overrides and field in overrides:
+            if key is not ABSENT:
+                others.append([key, row])
+        else:
+            numbered.append(row)
+    numbered.sort(key=packed.__getitem__)
+    return array('q', [packed[row] for row in numbered]), array('i', numbered), others
+
+
+def bisect_finder(keys, rows, others, pack):
+    # key -> row or None, from sorted_lookup's arrays; pack is the column's
+    def find(key):
+        if key in others:
+            return others[key]
+        key = pack(key)
+        if key is None:
+            return None
+        index = bisect.bisect_left(keys, key)
+        if index < len(keys) and keys[index] == key:
+            return rows[index]
+        return None
+    return find
+
+
+def parcel_sections(records, meta):
+    table = ParcelTable.from_records(records)
+    by_consignment, by_customer, date_index = build_indexes(table)
+
+    strings = table.strings
+    offsets, data = array('q', [0, 0]), bytearray()
+    for value in strings.values:
+        data += value.encode('utf-8', 'surrogatepass')
+        offsets.append(len(data))
+
+    sections = {"strings.offsets": offsets, "strings.data": data, "date_index": date_index}
+    for number, column in enumerate(table.columns.values()):
+        sections[f"column.{number}"] = column.data
+    meta["fields"] = list(table.columns)
+    meta["size"] = table.size
+
+    # Keys sorted for lookups without building the dicts
+    sections["parcels.keys"], sections["parcels.rows"], meta["parcels.others"] = sorted_lookup(table, "parcel_number", table.positions.items())
+    for name, field, chains in [("cons", "consignment_number", by_consignment), ("cust", "customer_id", by_customer)]:
+        sections[f"{name}.next"] = chains.next
+        sections[f"{name}.previous"] = chains.previous
+        sections[f"{name}.keys"], sections[f"{name}.heads"], meta[f"{name}.others"] = sorted_lookup(table, field, chains.heads.items())
+
+    # Values kept per row outside the columns; ABSENT (a missing field)
+    # cannot be written as JSON, so those fields are listed apart
+    meta["overrides"], meta["absent"] = {}, {}
+    for row, overrides in table.overrides.items():
+        values = {field: value for field, value in overrides.items() if value is not ABSENT}
+        absent = [field for field, value in overrides.items() if value is ABSENT]
+        if values:
+            meta["overrides"][row] = values
+        if absent:
+            meta["absent"][row] = absent
+    return sections
+
+
+# Consignment numbers packed as in the parcel table
+CONSIGNMENT_NUMBERS = TypedColumn('q', int, str)
+
+
+def bill_sections(records, meta):
+    # Consignment numbers that are not plain numbers are kept in meta, with
+    # 0 in their place in bills.keys
+    keys, offsets, data, others = array('q'), array('q', [0]), bytearray(), []
+    for position, bill in enumerate(records):
+        key = bill["consignment_number"]
+        number = CONSIGNMENT_NUMBERS.pack(key)
+        if number is None:
+            keys.append(0)
+            others.append([position, key])
+        else:
+            keys.append(number)
+        data += json.dumps(bill).encode()
+        offsets.append(len(data))
+    order = array('i', sorted(range(len(keys)), key=keys.__getitem__))
+    meta["others"] = others
+    return {"bills.keys": keys, "bills.order": order, "bills.offsets": offsets, "bills.data": data}
+
+
+SECTIONS = {"parcels": parcel_sections, "bills": bill_sections}
+
+
+def write_snapshot(path, kind, data, generation, journal_offset=0, journal_entries=0):
+    # Writes data (the contents of the parcels or bills file, as loaded) as
+    # the snapshot of that file at the given generation and journal offset.
+    # Written to a temp file and renamed over the old one, like the JSON.
+    records = data[kind]
+    meta = {
+        "kind": kind,
+        "data": {field: value for field, value in data.items() if field != kind},
+        "journal_entries": journal_entries,
+        "itemsizes": itemsizes(),
+    }
+    sections = SECTIONS[kind](records, meta)
+    sections = {"meta": json.dumps(meta).encode(), **{name: bytes(value) for name, value in sections.items()}}
+    assert all(len(name) <= 16 for name in sections), "section names are 16 bytes at most"
+
+    offset = HEADER.size + SECTION.size * len(sections)
+    directory = []
+    for name, value in sections.items():
+        offset += -offset % 8
+        directory.append(SECTION.pack(name.encode(), offset, len(value)))
+        offset += len(value)
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, FORMAT_VERSION, BYTE_ORDERS[sys.byteorder], generation, journal_offset, len(sections)))
+        file.write(b''.join(directory))
+        for value in sections.values():
+            file.write(bytes(-file.tell() % 8))
+            file.write(value)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+class Snapshot:
+    # An opened snapshot: its sections as memoryviews over the mapped file
+    def __init__(self, generation, journal_offset, meta, sections):
+        self.generation = generation
+        self.journal_offset = journal_offset
+        self.meta = meta
+        self.sections = sections
+        self.data = meta["data"]
+        self.journal_entries = meta["journal_entries"]
+
+    def array(self, name, typecode):
+        return self.sections[name].cast(typecode)
+
+    def parcels(self):
+        # (ParcelTable, indexes) for ParcelStore.load_parcels
+        strings = StringTable(self.array("strings.offsets", 'q'), self.sections["strings.data"])
+        table = ParcelTable(strings)
+        for number, field in enumerate(self.meta["fields"]):
+            column = table.columns[field]
+            typecode = 'I' if isinstance(column, EncodedColumn) else column.data.typecode
+            column.data = self.array(f"column.{number}", typecode)
+        table.size = self.meta["size"]
+        table.overrides = {int(row): values for row, values in self.meta["overrides"].items()}
+        for row, fields in self.meta["absent"].items():
+            table.overrides.setdefault(int(row), {}).update(dict.fromkeys(fields, ABSENT))
+        table._positions = None
+        table.find = self.finder("parcels", "parcels.rows", table.columns["parcel_number"])
+
+        def chains(name, column):
+            def load_heads():
+                heads = dict(zip(map(column.decode, self.array(f"{name}.keys", 'q')), self.array(f"{name}.heads", 'i')))
+                heads.update(self.meta[f"{name}.others"])
+                return heads
+            following, preceding = self.array(f"{name}.next", 'i'), self.array(f"{name}.previous", 'i')
+            return RowChains.mapped(following, preceding, load_heads, self.finder(name, f"{name}.heads", column))
+
+        columns = table.columns
+        indexes = (chains("cons", columns["consignment_number"]), chains("cust", columns["customer_id"]), self.array("date_index", 'q'))
+        return table, indexes
+
+    def finder(self, name, rows, column):
+        others = dict(self.meta[f"{name}.others"])
+        return bisect_finder(self.array(f"{name}.keys", 'q'), self.array(rows, 'i'), others, column.pack)
+
+    def bills(self):
+        return BillTable(
+            self.array("bills.keys", 'q'), self.array("bills.order", 'i'),
+            self.array("bills.offsets", 'q'), self.sections["bills.data"], self.meta["others"]
+        )
+
+
+def open_snapshot(path, kind):
+    # The snapshot at path, or None when there is none or it cannot be used
+    # here (another format version or byte order, a different kind)
+    try:
+        with open(path, 'rb') as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+    except (FileNotFoundError, ValueError):
+        return None
+    view = memoryview(mapped)
+    try:
+        magic, version, byte_order, generation, journal_offset, count = HEADER.unpack_from(view)
+        if magic != MAGIC or version != FORMAT_VERSION or byte_order != BYTE_ORDERS[sys.byteorder]:
+            return None
+        sections = {}
+        for number in range(count):
+            name, offset, length = SECTION.unpack_from(view, HEADER.size + number * SECTION.size)
+            if offset + length > len(view):
+                return None
+            sections[name.rstrip(b'\0').decode()] = view[offset:offset + length]
+        meta = json.loads(bytes(sections["meta"]))
+    except (struct.error, KeyError, ValueError):
+        return None
+    if meta["kind"] != kind or meta["itemsizes"] != itemsizes():
+        return None
+    return Snapshot(generation, journal_offset, meta, sections)
+
+
+class BillTable(MutableMapping):
+    # Consignment number -> bill, for bills read from a snapshot. Bills are
+    # decoded from the mapped file each time they are read; changes go to
+    # an overlay (None marks a deleted bill). Iterates in the same order as
+    # a dict loaded from the bills file would.
+    def __init__(self, numbers, order, offsets, data, others=()):
+        self.numbers = numbers  # consignment numbers in file order (0 for the others)
+        self.order = order
+        self.offsets = offsets
+        self.data = data
+        self.others = {key: position for position, key in others}  # keys that are not numbers
+        self.others_by_position = {position: key for position, key in others}
+        self.overlay = {}
+        self.moved = set()  # snapshot bills deleted and added again: they now come last
+        self.count = len(numbers)
+
+    def _position(self, key):
+        number = CONSIGNMENT_NUMBERS.pack(key)
+        if number is None:
+            return self.others.get(key)
+        index = bisect.bisect_left(self.order, number, key=self.numbers.__getitem__)
+        while index < len(self.order) and self.numbers[self.order[index]] == number:
+            if self.order[index] not in self.others_by_position:
+                return self.order[index]
+            index += 1
+        return None
+
+    def _key(self, position):
+        if position in self.others_by_position:
+            return self.others_by_position[position]
+        return str(self.numbers[position])
+
+    def __getitem__(self, key):
+        if key in self.overlay:
+            bill = self.overlay[key]
+        else:
+            position = self._position(key)
+            bill = None if position is None else json.loads(bytes(self.data[self.offsets[position]:self.offsets[position + 1]]))
+        if bill is None:
+            raise KeyError(key)
+        return bill
+
+    def __contains__(self, key):
+        if key in self.overlay:
+            return self.overlay[key] is not None
+        return self._position(key) is not None
+
+    def __setitem__(self, key, bill):
+        if key in self.overlay:
+            if self.overlay[key] is None:
+                del self.overlay[key]
+                self.count += 1
+                if self._position(key) is not None:
+                    self.moved.add(key)
+        elif self._position(key) is None:
+            self.count += 1
+        self.overlay[key] = bill
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        if self._position(key) is None:
+            del self.overlay[key]
+        else:
+            self.overlay[key] = None
+            self.moved.discard(key)
+        self.count -= 1
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        overlay, moved = self.overlay, self.moved
+        for position in range(len(self.numbers)):
+            key = self._key(position)
+            if key in overlay and (overlay[key] is None or key in moved):
+                continue
+            yield key
+        for key, bill in list(overlay.items()):
+            if bill is not None and (key in moved or self._position(key) is None):
+                yield key
+
+
+def main():
+    # Converts parcels.json and bills.json (with their journals) to binary
+    # snapshots. The running system writes new ones whenever it compacts.
+    from .storage import get_database, get_storage
+    if get_database():
+        print("The data is kept in SQLite; binary snapshots are for the JSON files.")
+        return
+    for name in ("parcels", "bills"):
+        storage = get_storage(name)
+        data = storage.write_binary()
+        size = os.path.getsize(storage.snapshot_path)
+        print(f"{storage.path}: {len(data[name])} {name} -> {storage.snapshot_path} ({size / 2 ** 20:.1f} MiB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,299 @@
+import json
+import sqlite3
+import sys
+
+from .journal import COMPACT_EVERY, NO_CHANGES, JournaledFile, RemoteChanges
+from .locking import LOCK_TIMEOUT
+from .tariff import tariff_from_json, tariff_to_json
+
+DATABASE_FILE = 'parcel_system.db'
+
+# table name -> (list field in the JSON file, key column, columns, meta fields)
+TABLES = {
+    "users": (None, "username", ["username", "password", "role", "id"], []),
+    "customers": ("customers", "id", ["id", "name", "address", "telephone"], ["current_customer_id"]),
+    "parcels": ("parcels", "parcel_number", [
+        "consignment_number", "parcel_number", "customer_id", "destination", "weight",
+        "sender_name", "sender_address", "sender_telephone", "price", "date"
+    ], ["current_consignment_number", "current_parcel_number"]),
+    "bills": ("bills", "consignment_number", [
+        "consignment_number", "date", "customer_name", "customer_address", "customer_telephone",
+        "items", "total_amount", "service_tax", "total_amount_with_tax"
+    ], []),
+}
+
+# Columns holding nested data, stored as JSON text
+JSON_COLUMNS = {"items"}
+
+# Keys looked up per query when reading the rows other processes changed
+# (SQLite allows 999 parameters in older versions)
+KEYS_PER_QUERY = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY, password TEXT, role TEXT, id INTEGER
+);
+CREATE TABLE IF NOT EXISTS customers (
+    id INTEGER PRIMARY KEY, name TEXT, address TEXT, telephone TEXT
+);
+CREATE TABLE IF NOT EXISTS parcels (
+    parcel_number TEXT PRIMARY KEY, consignment_number TEXT, customer_id INTEGER,
+    destination TEXT, weight REAL, sender_name TEXT, sender_address TEXT,
+    sender_telephone TEXT, price TEXT, date TEXT
+);
+CREATE INDEX IF NOT EXISTS parcels_consignment ON parcels (consignment_number);
+CREATE INDEX IF NOT EXISTS parcels_customer ON parcels (customer_id);
+CREATE INDEX IF NOT EXISTS parcels_date ON parcels (date);
+CREATE TABLE IF NOT EXISTS bills (
+    consignment_number TEXT PRIMARY KEY, date TEXT, customer_name TEXT,
+    customer_address TEXT, customer_telephone TEXT, items TEXT,
+    total_amount REAL, service_tax REAL, total_amount_with_tax REAL
+);
+CREATE TABLE IF NOT EXISTS pricing (
+    position INTEGER PRIMARY KEY, destination TEXT, below_1kg TEXT,
+    between_1kg_3kg TEXT, above_3kg TEXT
+);
+CREATE TABLE IF NOT EXISTS tariffs (
+    position INTEGER PRIMARY KEY, effective TEXT, zones TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY, value
+);
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, key, whole INTEGER DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS changes_name ON changes (name, seq);
+"""
+
+
+class SQLiteBackend:
+    def __init__(self, path=DATABASE_FILE):
+        # WAL lets other terminals read while one writes; writers wait for
+        # each other instead of failing straight away
+        self.connection = sqlite3.connect(path, timeout=LOCK_TIMEOUT, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+        # Databases from before user IDs; their users get an ID when loaded
+        if "id" not in {row[1] for row in self.connection.execute("PRAGMA table_info(users)")}:
+            self.connection.execute("ALTER TABLE users ADD COLUMN id INTEGER")
+
+    def table(self, name):
+        return SQLiteTable(self, name)
+
+    def load_pricing(self):
+        # The tariff versions as in pricing.json (see tariff.py); databases
+        # migrated before there were tariffs have the old table instead
+        rows = self.connection.execute("SELECT effective, zones FROM tariffs ORDER BY position").fetchall()
+        if rows:
+            return {"tariffs": [{"effective": effective, "zones": json.loads(zones)} for effective, zones in rows]}
+        rows = self.connection.execute(
+            "SELECT destination, below_1kg, between_1kg_3kg, above_3kg FROM pricing ORDER BY position"
+        ).fetchall()
+        return [list(row) for row in rows]
+
+    def save_pricing(self, data):
+        with self.connection:
+            self.connection.execute("DELETE FROM tariffs")
+            self.connection.execute("DELETE FROM pricing")
+            self.connection.executemany(
+                "INSERT INTO tariffs VALUES (?, ?, ?)",
+                [(position, version["effective"], json.dumps(version["zones"]))
+                 for position, version in enumerate(data["tariffs"])]
+            )
+
+    def close(self):
+        self.connection.close()
+
+
+class SQLiteTable:
+    # Same interface as journal.JournaledFile (load/append/refresh/compact),
+    # so the load_*/save_* functions and sync_system work the same with
+    # either backend.
+    #
+    # Every write also adds a row per changed key to the changes table, in
+    # the same transaction: (seq, table, key), with key NULL for a write of
+    # meta fields only and whole = 1 when the table was rewritten. Each
+    # process remembers the last seq it has seen, so refresh is one indexed
+    # query when nothing changed and otherwise re-reads only the changed
+    # rows. Writers cut each table's log back to its newest compact_every
+    # rows now and then; a process that has not looked since older ones
+    # were dropped (meta "pruned:<table>") reads the whole table again.
+    def __init__(self, backend, name, compact_every=COMPACT_EVERY):
+        self.connection = backend.connection
+        self.name = name
+        self.list_field, self.key_field, self.columns, self.meta_fields = TABLES[name]
+        self.json_columns = JSON_COLUMNS.intersection(self.columns)
+        self.compact_every = compact_every
+        self.seen = None  # the last changes.seq this process has read up to
+        self.in_memory = True  # False once opened with load_meta
+
+    def to_record(self, row):
+        record = dict(zip(self.columns, row))
+        for column in self.json_columns:
+            record[column] = json.loads(record[column])
+        return record
+
+    def to_row(self, record):
+        return tuple(
+            json.dumps(record.get(column)) if column in JSON_COLUMNS else record.get(column)
+            for column in self.columns
+        )
+
+    def load(self):
+        # The seq is read first: a change committed while the rows are read
+        # is read again by the next refresh, which is harmless
+        seen = self._last_seq()
+        cursor = self.connection.execute(f"SELECT {', '.join(self.columns)} FROM {self.name} ORDER BY rowid")
+        records = [self.to_record(row) for row in cursor]
+        self.seen = seen
+        if not self.list_field:
+            return records
+
+        data = {self.list_field: records}
+        data.update(self._meta(required=True))
+        return data
+
+    def load_meta(self):
+        # For a table the store queries instead of holding in memory (see
+        # sqlite_store.SQLiteStore): reads only the meta fields. From then
+        # on refresh does not re-read the whole table when it cannot tell
+        # which records changed; it only says so (complete, no records).
+        self.seen = self._last_seq()
+        self.in_memory = False
+        return self._meta(required=True)
+
+    def _last_seq(self):
+        return self.connection.execute("SELECT coalesce(max(seq), 0) FROM changes").fetchone()[0]
+
+    def _meta(self, required=False):
+        meta = {}
+        for field in self.meta_fields:
+            row = self.connection.execute("SELECT value FROM meta WHERE name = ?", (field,)).fetchone()
+            if row is None:
+                if required:
+                    raise FileNotFoundError(f"No {field} in the database")
+                continue
+            meta[field] = row[0]
+        return meta
+
+    def load_binary(self):
+        # Binary snapshots are for the JSON files only
+        return None
+
+    def append(self, changes, meta=None):
+        # All changes of one save go in a single transaction, which takes
+        # the write lock first so nobody writes between catching up and
+        # writing. Returns what other processes saved since this one last
+        # read the table (RemoteChanges), for the caller to merge, as
+        # JournaledFile.append does.
+        with self.connection:
+            self.connection.execute("BEGIN IMMEDIATE")
+            remote = self.refresh()
+            self._write(changes, meta)
+            self._prune()
+            self.seen = self._last_seq()
+        return remote
+
+    def refresh(self):
+        # What other processes saved since this one last read the table
+        if self.seen is None:
+            return NO_CHANGES
+        rows = self.connection.execute(
+            "SELECT seq, key, whole FROM changes WHERE name = ? AND seq > ? ORDER BY seq", (self.name, self.seen)
+        ).fetchall()
+        pruned = self.connection.execute("SELECT value FROM meta WHERE name = ?", (f"pruned:{self.name}",)).fetchone()
+        if pruned and pruned[0] > self.seen or any(whole for _, _, whole in rows):
+            # Rewritten, or changed more than the log still holds
+            if not self.in_memory:
+                self.seen = self._last_seq()
+                return RemoteChanges({}, self._meta(), True)
+            data = self.load()
+            records = data[self.list_field] if self.list_field else data
+            meta = {field: value for field, value in data.items() if field != self.list_field} if self.list_field else {}
+            return RemoteChanges({record[self.key_field]: record for record in records}, meta, True)
+        if not rows:
+            return NO_CHANGES
+
+        keys = list(dict.fromkeys(key for _, key, _ in rows if key is not None))
+        records = dict.fromkeys(keys)
+        for start in range(0, len(keys), KEYS_PER_QUERY):
+            chunk = keys[start:start + KEYS_PER_QUERY]
+            cursor = self.connection.execute(
+                f"SELECT {', '.join(self.columns)} FROM {self.name} "
+                f"WHERE {self.key_field} IN ({', '.join('?' for _ in chunk)})", chunk
+            )
+            for row in cursor:
+                record = self.to_record(row)
+                records[record[self.key_field]] = record
+        self.seen = rows[-1][0]
+        return RemoteChanges(records, self._meta(), False)
+
+    def _write(self, changes, meta, whole=False):
+        placeholders = ', '.join('?' for _ in self.columns)
+        self.connection.executemany(
+            f"INSERT OR REPLACE INTO {self.name} ({', '.join(self.columns)}) VALUES ({placeholders})",
+            [self.to_row(record) for record in changes.values() if record is not None]
+        )
+        self.connection.executemany(
+            f"DELETE FROM {self.name} WHERE {self.key_field} = ?",
+            [(key,) for key, record in changes.items() if record is None]
+        )
+        # Meta fields are counters; another process may have moved them further
+        self.connection.executemany(
+            "INSERT INTO meta VALUES (?, ?) ON CONFLICT (name) DO UPDATE SET value = max(value, excluded.value)",
+            list((meta or {}).items())
+        )
+        if whole:
+            logged = [(self.name, None, 1)]
+        else:
+            logged = [(self.name, key, 0) for key in changes] or ([(self.name, None, 0)] if meta else [])
+        self.connection.executemany("INSERT INTO changes (name, key, whole) VALUES (?, ?, ?)", logged)
+
+    def _prune(self):
+        # Once the table's change log holds twice compact_every rows, cuts
+        # it back to the newest compact_every
+        def nth_newest(offset):
+            return self.connection.execute(
+                "SELECT seq FROM changes WHERE name = ? ORDER BY seq DESC LIMIT 1 OFFSET ?", (self.name, offset)
+            ).fetchone()
+        if nth_newest(2 * self.compact_every) is not None:
+            cut = nth_newest(self.compact_every)[0]
+            self.connection.execute("DELETE FROM changes WHERE name = ? AND seq <= ?", (self.name, cut))
+            self._write({}, {f"pruned:{self.name}": cut})
+
+    def compact(self, data):
+        # Replace every row of the table, e.g. after a reset
+        records = data[self.list_field] if self.list_field else data
+        meta = {field: value for field, value in data.items() if field != self.list_field} if self.list_field else {}
+        with self.connection:
+            self.connection.execute("BEGIN IMMEDIATE")
+            self.connection.execute(f"DELETE FROM {self.name}")
+            self.connection.executemany("DELETE FROM meta WHERE name = ?", [(field,) for field in meta])
+            self._write({record[self.key_field]: record for record in records}, meta, whole=True)
+            self.seen = self._last_seq()
+
+
+def migrate_json_to_sqlite(database_path=DATABASE_FILE, pricing_file='pricing.json'):
+    # One-shot copy of users.json, customers.json, parcels.json, bills.json
+    # (including their journals) and pricing.json into a SQLite database
+    backend = SQLiteBackend(database_path)
+    for name, (list_field, key_field, _, _) in TABLES.items():
+        try:
+            data = JournaledFile(f'{name}.json', list_field, key_field).load()
+        except FileNotFoundError:
+            continue
+        backend.table(name).compact(data)
+        records = data[list_field] if list_field else data
+        print(f"Migrated {len(records)} {name}.")
+
+    try:
+        with open(pricing_file, 'r') as file:
+            backend.save_pricing(tariff_to_json(tariff_from_json(json.load(file))))
+        print("Migrated pricing table.")
+    except FileNotFoundError:
+        pass
+    backend.close()
+
+
+if __name__ == '__main__':
+    migrate_json_to_sqlite(*sys.argv[1:2])
@@ -0,0 +1,338 @@
+import heapq
+from itertools import chain
+
+from .columns import date_ordinal
+from .pricing_engine import parse_price
+from .rollups import Totals
+from .store import ParcelStore
+
+# Keys looked up per query (SQLite allows 999 parameters in older versions)
+KEYS_PER_QUERY = 500
+
+
+def by_date(parcel):
+    return str(parcel["date"])
+
+
+def check_dates(*dates):
+    # The ValueError ParcelStore's date index gives for a date that is not
+    # YYYY-MM-DD, before it is stored or compared as text in SQL
+    for text in dates:
+        date_ordinal(text)
+
+
+def as_totals(count, weight, amount_sen):
+    # A row of SQL sums as rollups.Totals.as_dict gives them
+    totals = Totals()
+    totals.count, totals.weight, totals.amount_sen = count, weight, amount_sen
+    return totals.as_dict()
+
+
+class SavedRecords:
+    # store.parcels or store.bills of a SQLiteStore: the table as saved, with
+    # the records changed here and not saved yet (store.changes) in place of
+    # the saved ones. Enough of a dict for the code that lists, counts or
+    # looks up records; changes go through the store's methods.
+    def __init__(self, store, name):
+        self.store = store
+        self.name = name
+        self.table = store.database.table(name)
+        self.connection = store.database.connection
+        self.key_field = self.table.key_field
+        self.selected = ', '.join(self.table.columns)
+
+    def pending(self):
+        return self.store.changes.get(self.name, {})
+
+    def get(self, key, default=None):
+        pending = self.pending()
+        if key in pending:
+            record = pending[key]
+            return default if record is None else record
+        row = self.connection.execute(
+            f"SELECT {self.selected} FROM {self.name} WHERE {self.key_field} = ?", (key,)
+        ).fetchone()
+        return default if row is None else self.table.to_record(row)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def select(self, where="1", params=(), order="rowid"):
+        # The saved records matching where, streamed in order, less those
+        # changed here since
+        pending = self.pending()
+        cursor = self.connection.execute(
+            f"SELECT {self.selected} FROM {self.name} WHERE {where} ORDER BY {order}", params
+        )
+        for row in cursor:
+            record = self.table.to_record(row)
+            if record[self.key_field] not in pending:
+                yield record
+
+    def unsaved(self, test=None):
+        # The records added or changed here since the last save, that pass test
+        return [record for record in self.pending().values() if record is not None and (test is None or test(record))]
+
+    def count(self, where="1", params=(), test=None):
+        # len(list(select(where)) + unsaved(test)) without reading the records
+        count = self.connection.execute(f"SELECT count(*) FROM {self.name} WHERE {where}", params).fetchone()[0]
+        keys = list(self.pending())
+        for start in range(0, len(keys), KEYS_PER_QUERY):
+            chunk = keys[start:start + KEYS_PER_QUERY]
+            count -= self.connection.execute(
+                f"SELECT count(*) FROM {self.name} WHERE ({where}) "
+                f"AND {self.key_field} IN ({', '.join('?' for _ in chunk)})", (*params, *chunk)
+            ).fetchone()[0]
+        return count + len(self.unsaved(test))
+
+    def values(self):
+        return chain(self.select(), self.unsaved())
+
+    def __iter__(self):
+        return (record[self.key_field] for record in self.values())
+
+    def __len__(self):
+        return self.count()
+
+    def __bool__(self):
+        return next(iter(self.values()), None) is not None
+
+    def numbers(self, field, prefix=''):
+        # As ParcelTable.numbers, for a NumberAllocator
+        return IssuedNumbers(self, field, prefix)
+
+
+class IssuedNumbers(set):
+    # The numbers in use in a numbered column, for a NumberAllocator: holds
+    # the highest saved one and those handed out here, and looks any other
+    # number up in the table, so a number another terminal saved is never
+    # handed out again. Numbers of deleted records may come round again;
+    # the counters saved with the table (current_parcel_number...) keep the
+    # allocator above the last one handed out.
+    def __init__(self, records, field, prefix=''):
+        self.records = records
+        self.field = field
+        self.prefix = prefix
+        start = len(prefix) + 1
+        highest = records.connection.execute(
+            f"SELECT max(CAST(substr({field}, ?) AS INTEGER)) FROM {records.name} "
+            f"WHERE {field} GLOB ? AND substr({field}, ?) NOT GLOB '*[^0-9]*'",
+            (start, prefix + '[0-9]*', start)
+        ).fetchone()[0]
+        super().__init__(() if highest is None else (highest,))
+
+    def __contains__(self, number):
+        if set.__contains__(self, number):
+            return True
+        value = f'{self.prefix}{number}'
+        return self.records.connection.execute(
+            f"SELECT 1 FROM {self.records.name} WHERE {self.field} = ? LIMIT 1", (value,)
+        ).fetchone() is not None
+
+
+class SQLiteStore(ParcelStore):
+    # The store for the SQLite backend. Customers are held as in ParcelStore;
+    # parcels and bills stay in the database and every lookup, consignment,
+    # customer and date-range query is answered from it through the table's
+    # indexes, with the changes not saved yet laid over the results. Start-up
+    # reads no parcels or bills, and what other terminals save is seen at
+    # the next query without merging it in.
+    def __init__(self, database):
+        super().__init__()
+        self.database = database
+        # Prices in sen inside queries, as parse_price reads them (NULL when
+        # not a valid price)
+        database.connection.create_function("price_sen", 1, parse_price, deterministic=True)
+        self.parcels = SavedRecords(self, "parcels")
+        self.bills = SavedRecords(self, "bills")
+
+    # Parcels
+
+    def add_parcel(self, parcel):
+        check_dates(parcel["date"])
+        old = self.parcels.get(parcel["parcel_number"])
+        if old is not None:
+            self._notify("parcel_removed", old)
+        self._notify("parcel_added", parcel)
+        self.mark_changed("parcels", parcel["parcel_number"], parcel)
+
+    def load_parcels(self, table, indexes=None):
+        # Writes a whole table of parcels (e.g. a ParcelTable read from a
+        # file) to the database in one go, in place of the saved ones. The
+        # database keeps its own indexes, so indexes is not used.
+        self.changes.pop("parcels", None)
+        self.database.table("parcels").compact({"parcels": list(table.values())})
+        self._notify("parcels_loaded", self.parcels)
+
+    def update_parcel(self, parcel_number, **fields):
+        parcel = self.parcels.get(parcel_number)
+        if parcel is not None:
+            check_dates(fields.get("date", parcel["date"]))
+            self._notify("parcel_removed", parcel)
+            parcel = dict(parcel, **fields)
+            self._notify("parcel_added", parcel)
+            self.mark_changed("parcels", parcel_number, parcel)
+        return parcel
+
+    def delete_parcel(self, parcel_number):
+        parcel = self.parcels.get(parcel_number)
+        if parcel is None:
+            return None
+        self._notify("parcel_removed", parcel)
+        self.mark_changed("parcels", parcel_number, None)
+        return parcel
+
+    def reassign_customers(self, mapping):
+        moved = []
+        for old, new in mapping.items():
+            for parcel in self.parcels_for_customer(old):
+                self._notify("parcel_removed", parcel)
+                parcel = dict(parcel, customer_id=new)
+                self._notify("parcel_added", parcel)
+                self.mark_changed("parcels", parcel["parcel_number"], parcel)
+                moved.append(parcel)
+        return moved
+
+    def _parcels(self, where, params, test, in_date_order=False):
+        # Saved parcels matching where, then (or, in date order, merged in)
+        # the unsaved ones that pass test, the same condition in Python
+        saved = self.parcels.select(where, params, "date, rowid" if in_date_order else "rowid")
+        unsaved = self.parcels.unsaved(test)
+        if not unsaved:
+            return saved
+        if in_date_order:
+            return heapq.merge(saved, sorted(unsaved, key=by_date), key=by_date)
+        return chain(saved, unsaved)
+
+    def has_consignment(self, consignment_number):
+        return bool(self.parcels_in_consignment(consignment_number))
+
+    def parcels_in_consignment(self, consignment_number):
+        return list(self._parcels(
+            "consignment_number = ?", (consignment_number,),
+            lambda parcel: parcel["consignment_number"] == consignment_number
+        ))
+
+    def parcels_for_customer(self, customer_id):
+        return list(self._parcels(
+            "customer_id = ?", (customer_id,), lambda parcel: parcel["customer_id"] == customer_id
+        ))
+
+    def count_between(self, start_date, end_date):
+        check_dates(start_date, end_date)
+        return self.parcels.count(
+            "date BETWEEN ? AND ?", (start_date, end_date), lambda parcel: start_date <= by_date(parcel) <= end_date
+        )
+
+    def iter_parcels_between(self, start_date, end_date):
+        check_dates(start_date, end_date)
+        return self._parcels(
+            "date BETWEEN ? AND ?", (start_date, end_date), lambda parcel: start_date <= by_date(parcel) <= end_date,
+            in_date_order=True
+        )
+
+    def iter_parcels_since(self, start_date):
+        check_dates(start_date)
+        return self._parcels(
+            "date >= ?", (start_date,), lambda parcel: by_date(parcel) >= start_date, in_date_order=True
+        )
+
+    def columns_between(self, start_date, end_date, fields):
+        # One query for just the fields, with prices in sen worked out by
+        # SQLite, instead of a dict per parcel
+        check_dates(start_date, end_date)
+        pending = self.parcels.pending()
+        selected = ', '.join("price_sen(price)" if field == "price" else field for field in fields)
+        if pending:
+            # The parcel number and date too, to leave out and merge in the
+            # parcels changed here
+            selected = f"parcel_number, date, {selected}"
+        rows = self.database.connection.execute(
+            f"SELECT {selected} FROM parcels WHERE date BETWEEN ? AND ? ORDER BY date, rowid", (start_date, end_date)
+        )
+        if pending:
+            unsaved = sorted((
+                (by_date(parcel), *(parse_price(parcel["price"]) if field == "price" else parcel.get(field) for field in fields))
+                for parcel in self.parcels.unsaved(lambda parcel: start_date <= by_date(parcel) <= end_date)
+            ), key=lambda row: row[0])
+            saved = (row[1:] for row in rows if row[0] not in pending)
+            rows = (row[1:] for row in heapq.merge(saved, unsaved, key=lambda row: row[0]))
+        columns = [list(column) for column in zip(*rows)]
+        return columns or [[] for _ in fields]
+
+    # Bills
+
+    def load_bills(self, bills):
+        # As load_parcels, for all bills (a dict, or snapshot.BillTable)
+        self.changes.pop("bills", None)
+        self.database.table("bills").compact({"bills": list(bills.values())})
+
+    def add_bill(self, bill):
+        self.mark_changed("bills", bill["consignment_number"], bill)
+
+    def get_bill(self, consignment_number):
+        return self.bills.get(consignment_number)
+
+    def delete_bill(self, consignment_number):
+        bill = self.bills.get(consignment_number)
+        if bill is not None:
+            self.mark_changed("bills", consignment_number, None)
+        return bill
+
+    # Changes saved by other processes
+
+    def merge(self, collection, records, complete=False, keep=()):
+        # Parcels and bills are read from the database, where the other
+        # processes' records already are
+        if collection == "customers":
+            super().merge(collection, records, complete, keep)
+
+    def clear_parcels_and_bills(self):
+        # The caller rewrites both tables right after (see reset_system),
+        # which tells the other processes
+        self.changes.pop("parcels", None)
+        self.changes.pop("bills", None)
+        with self.database.connection:
+            self.database.connection.execute("DELETE FROM parcels")
+            self.database.connection.execute("DELETE FROM bills")
+        self._notify("cleared")
+
+
+class SQLiteRollup:
+    # RevenueRollup's questions for a SQLiteStore, answered by SQL sums over
+    # the saved parcels (through the date and customer indexes where they
+    # help) rather than counters kept in memory, as the store does not hold
+    # the parcels to count them
+    def __init__(self, store):
+        self.store = store
+
+    def _totals(self, where="1", params=()):
+        return as_totals(*self.store.database.connection.execute(
+            "SELECT count(*), coalesce(sum(weight), 0), coalesce(sum(price_sen(price)), 0) "
+            f"FROM parcels WHERE {where}", params
+        ).fetchone())
+
+    def for_customer(self, customer_id):
+        # A deleted customer no longer appears in per-customer revenue
+        if self.store.get_customer(customer_id) is None:
+            return Totals().as_dict()
+        return self._totals("customer_id = ?", (customer_id,))
+
+    def for_zone(self, zone):
+        return self._totals("destination = ?", (zone,))
+
+    def for_day(self, day):
+        return self._totals("date = ?", (day,))
+
+    def for_cell(self, day, zone, customer_id):
+        return self._totals("date = ? AND destination = ? AND customer_id = ?", (day, zone, customer_id))
+
+    def zones(self):
+        cursor = self.store.database.connection.execute(
+            "SELECT destination, count(*), coalesce(sum(weight), 0), coalesce(sum(price_sen(price)), 0) "
+            "FROM parcels GROUP BY destination ORDER BY destination"
+        )
+        return {zone: as_totals(*sums) for zone, *sums in cursor}
+
+    def total(self):
+        return self._totals()
@@ -0,0 +1,67 @@
+from .journal import JournaledFile
+
+# File names for data
+CUSTOMERS_FILE = 'customers.json'
+PARCELS_FILE = 'parcels.json'
+BILLS_FILE = 'bills.json'
+COUNTERS_FILE = 'counters.json'
+USERS_FILE = 'users.json'
+PRICING_FILE = 'pricing.json'
+
+# 'json' keeps the data in the JSON files above; 'sqlite' keeps it in
+# sqlite_backend.DATABASE_FILE (run python -m parcel_system.sqlite_backend
+# once to migrate the JSON files), where parcels and bills are queried as
+# needed instead of loaded at start-up (see sqlite_store.py)
+STORAGE_BACKEND = 'json'
+
+# Parcel and consignment numbers and customer IDs are taken from
+# COUNTERS_FILE under its lock, so terminals sharing the data files never
+# hand out the same one. 0 (the default) claims each number as it is handed
+# out, so numbers run on without gaps from one session to the next. Busy
+# deployments can set this (or pass --number-blocks) to take numbers in
+# blocks of this size instead; unused numbers of a block are skipped when
+# the process exits.
+NUMBER_BLOCK_SIZE = 0
+
+# table name -> (file, list field, key field) for the JSON backend
+JSON_FILES = {
+    "users": (USERS_FILE, None, "username"),
+    "customers": (CUSTOMERS_FILE, "customers", "id"),
+    "parcels": (PARCELS_FILE, "parcels", "parcel_number"),
+    "bills": (BILLS_FILE, "bills", "consignment_number"),
+}
+
+# Tables whose files also get a binary snapshot (see snapshot.py)
+BINARY_SNAPSHOTS = {"parcels", "bills"}
+
+# Opened on first use, so importing the package touches no files
+_database = None
+_storages = {}
+
+
+def get_database():
+    # The SQLite backend, or None when the data lives in the JSON files
+    global _database
+    if STORAGE_BACKEND != 'sqlite':
+        return None
+    if _database is None:
+        from .sqlite_backend import DATABASE_FILE, SQLiteBackend
+        _database = SQLiteBackend(DATABASE_FILE)
+    return _database
+
+
+def get_storage(name):
+    # Each data file is a snapshot plus a journal of the changes made since;
+    # saving appends only the changed records to the journal
+    if name not in _storages:
+        database = get_database()
+        if database:
+            _storages[name] = database.table(name)
+        else:
+            _storages[name] = JournaledFile(*JSON_FILES[name], binary=name in BINARY_SNAPSHOTS)
+    return _storages[name]
+
+
+def number_block_size():
+    # How many numbers are taken from COUNTERS_FILE at a time
+    return NUMBER_BLOCK_SIZE or 1
@@ -0,0 +1,304 @@
+import bisect
+from array import array
+from collections import defaultdict
+
+from .columns import ABSENT, ParcelTable, RowChains, date_ordinal, growable
+
+# date_index entries are day number << ROW_BITS | row
+ROW_BITS = 32
+ROW_MASK = (1 << ROW_BITS) - 1
+
+
+def build_indexes(table):
+    # The consignment, customer and date indexes of a table filled in bulk
+    # (see ParcelTable.from_records), built a column at a time. Returns
+    # (parcels_by_consignment, parcels_by_customer, date_index).
+    rows = table.live_rows()
+    by_consignment = RowChains.build(rows, table.values_of("consignment_number", rows))
+    by_customer = RowChains.build(rows, table.values_of("customer_id", rows))
+
+    days = table.columns["date"].data
+    keys = []
+    for row in rows:
+        overrides = table.overrides.get(row)
+        if overrides and "date" in overrides:
+            try:
+                keys.append(date_ordinal(overrides["date"]) << ROW_BITS | row)
+            except (TypeError, ValueError):
+                pass  # no date (ABSENT) or not a date: not in the date index
+        else:
+            keys.append(days[row] << ROW_BITS | row)
+    keys.sort()
+    return by_consignment, by_customer, array('q', keys)
+
+
+class ParcelStore:
+    # Holds customers, parcels and bills keyed by their IDs, plus secondary
+    # indexes so lookups by consignment, customer or date do not scan the
+    # whole history. All changes must go through the methods below so the
+    # indexes stay in step with the records.
+    def __init__(self):
+        self.customers = {}  # customer id -> customer
+        self.parcels = ParcelTable()  # parcel number -> parcel (a row of the table)
+        self.bills = {}  # consignment number -> bill (a snapshot.BillTable when read from one)
+        self.max_customer_id = 0
+        # The SQLiteBackend when parcels and bills stay in the database and
+        # are read from it as needed (see sqlite_store.SQLiteStore)
+        self.database = None
+
+        # Indexes hold table rows rather than parcels
+        self.parcels_by_consignment = RowChains()
+        self.parcels_by_customer = RowChains()
+        self.date_index = array('q')  # sorted day number << ROW_BITS | row
+
+        # Records changed since the last save, per collection:
+        # key -> record, or key -> None when the record was deleted
+        self.changes = defaultdict(dict)
+
+        # Objects kept in step with the store (e.g. rollups). Each may define
+        # any of: customer_added, customer_updated, customer_removed,
+        # parcel_added, parcel_removed, parcels_loaded, cleared.
+        self.listeners = []
+
+    def _notify(self, event, *args):
+        for listener in self.listeners:
+            handler = getattr(listener, event, None)
+            if handler:
+                handler(*args)
+
+    def mark_changed(self, collection, key, record):
+        self.changes[collection][key] = record
+
+    def take_changes(self, collection):
+        return self.changes.pop(collection, {})
+
+    # Customers
+
+    def add_customer(self, customer):
+        self.customers[customer["id"]] = customer
+        self.max_customer_id = max(self.max_customer_id, customer["id"])
+        self.mark_changed("customers", customer["id"], customer)
+        self._notify("customer_added", customer)
+
+    def get_customer(self, customer_id):
+        return self.customers.get(customer_id)
+
+    def update_customer(self, customer_id, **fields):
+        customer = self.customers.get(customer_id)
+        if customer is not None:
+            customer.update(fields)
+            self.mark_changed("customers", customer_id, customer)
+            self._notify("customer_updated", customer)
+        return customer
+
+    def delete_customer(self, customer_id):
+        customer = self.customers.pop(customer_id, None)
+        if customer is not None:
+            self.mark_changed("customers", customer_id, None)
+            self._notify("customer_removed", customer)
+        return customer
+
+    def next_customer_id(self):
+        return self.max_customer_id + 1
+
+    # Parcels
+
+    def add_parcel(self, parcel):
+        parcel_number = parcel["parcel_number"]
+        # The index key first: a date the index cannot read raises before
+        # the table or any index has changed
+        day = date_ordinal(parcel["date"])
+        if parcel_number in self.parcels:
+            old = self.parcels[parcel_number]
+            self._unindex(old)
+            self._notify("parcel_removed", old)
+        row = self.parcels.add(parcel)
+        self._index(self.parcels.row(row), day)
+        # Listeners get the dict that was added (the same values as the row)
+        self._notify("parcel_added", parcel)
+        self.mark_changed("parcels", parcel_number, self.parcels.row(row))
+
+    def load_parcels(self, table, indexes=None):
+        # Takes a whole table of parcels at once (from the parcels file or
+        # its binary snapshot) into a store that holds none yet. indexes is
+        # what build_indexes returns, built here when not given. Listeners
+        # get one parcels_loaded event instead of one per parcel.
+        by_consignment, by_customer, date_index = indexes or build_indexes(table)
+        self.parcels = table
+        self.parcels_by_consignment = by_consignment
+        self.parcels_by_customer = by_customer
+        self.date_index = date_index
+        self._notify("parcels_loaded", table)
+
+    def get_parcel(self, parcel_number):
+        return self.parcels.get(parcel_number)
+
+    def update_parcel(self, parcel_number, **fields):
+        parcel = self.parcels.get(parcel_number)
+        if parcel is not None:
+            day = date_ordinal(fields.get("date", parcel["date"]))
+            self._unindex(parcel)
+            self._notify("parcel_removed", parcel)
+            parcel.update(fields)
+            self._index(parcel, day)
+            self._notify("parcel_added", parcel)
+            self.mark_changed("parcels", parcel_number, parcel)
+        return parcel
+
+    def delete_parcel(self, parcel_number):
+        # Returns the deleted parcel as a dict
+        parcel = self.parcels.get(parcel_number)
+        if parcel is None:
+            return None
+        self._unindex(parcel)
+        self._notify("parcel_removed", parcel)
+        self.mark_changed("parcels", parcel_number, None)
+        return self.parcels.remove(parcel_number)
+
+    def reassign_customers(self, mapping):
+        # Moves the parcels of each customer ID in mapping (old -> new) to the
+        # new ID, visiting only those parcels through the customer index.
+        # Returns the moved parcels.
+        moved = []
+        by_customer = self.parcels_by_customer
+        for old, new in mapping.items():
+            for row in by_customer.rows(old):
+                parcel = self.parcels.row(row)
+                self._notify("parcel_removed", parcel)
+                by_customer.remove(old, row)
+                parcel["customer_id"] = new
+                by_customer.add(new, row)
+                self._notify("parcel_added", parcel)
+                self.mark_changed("parcels", parcel["parcel_number"], parcel)
+                moved.append(parcel)
+        return moved
+
+    def has_consignment(self, consignment_number):
+        return consignment_number in self.parcels_by_consignment
+
+    def parcels_in_consignment(self, consignment_number):
+        return [self.parcels.row(row) for row in self.parcels_by_consignment.rows(consignment_number)]
+
+    def parcels_for_customer(self, customer_id):
+        return [self.parcels.row(row) for row in self.parcels_by_customer.rows(customer_id)]
+
+    def _date_range(self, start_date, end_date):
+        # Positions of a "YYYY-MM-DD" date range in date_index, in O(log n)
+        low = bisect.bisect_left(self.date_index, date_ordinal(start_date) << ROW_BITS)
+        high = bisect.bisect_left(self.date_index, (date_ordinal(end_date) + 1) << ROW_BITS)
+        return low, max(low, high)
+
+    def count_between(self, start_date, end_date):
+        low, high = self._date_range(start_date, end_date)
+        return high - low
+
+    def iter_parcels_between(self, start_date, end_date):
+        # Yields the parcels of a date range in date order, one at a time
+        low, high = self._date_range(start_date, end_date)
+        for position in range(low, high):
+            yield self.parcels.row(self.date_index[position] & ROW_MASK)
+
+    def _rows_between(self, start_date, end_date):
+        # The table rows of a date range, for reading it a column at a time
+        # (see ParcelTable.values_of)
+        low, high = self._date_range(start_date, end_date)
+        return [key & ROW_MASK for key in self.date_index[low:high]]
+
+    def columns_between(self, start_date, end_date, fields):
+        # The given fields of a date range's parcels as one list per field,
+        # in date order, for going through months of parcels without a dict
+        # per parcel. Prices come in sen; a field a parcel does not have, or
+        # a price that is not valid, comes as None.
+        rows = self._rows_between(start_date, end_date)
+        table = self.parcels
+        # Prices straight from the column in sen, instead of formatted as
+        # "RM.." and parsed back
+        columns = [table.packed_of(field, rows) if field == "price" else table.values_of(field, rows) for field in fields]
+        if table.overrides:
+            columns = [[None if value is ABSENT else value for value in column] for column in columns]
+        return columns
+
+    def iter_parcels_since(self, start_date):
+        # Parcels dated start_date or later, in date order
+        low = bisect.bisect_left(self.date_index, date_ordinal(start_date) << ROW_BITS)
+        for position in range(low, len(self.date_index)):
+            yield self.parcels.row(self.date_index[position] & ROW_MASK)
+
+    def _index(self, parcel, day):
+        # day is date_ordinal(parcel["date"]), worked out by the caller
+        # before changing anything
+        self.parcels_by_consignment.add(parcel["consignment_number"], parcel.row)
+        self.parcels_by_customer.add(parcel["customer_id"], parcel.row)
+        self.date_index = growable(self.date_index)
+        bisect.insort(self.date_index, day << ROW_BITS | parcel.row)
+
+    def _unindex(self, parcel):
+        self.parcels_by_consignment.remove(parcel["consignment_number"], parcel.row)
+        self.parcels_by_customer.remove(parcel["customer_id"], parcel.row)
+        try:
+            key = date_ordinal(parcel.get("date")) << ROW_BITS | parcel.row
+        except (TypeError, ValueError):
+            return  # loaded without a date the index reads: not in it (see build_indexes)
+        self.date_index = growable(self.date_index)
+        position = bisect.bisect_left(self.date_index, key)
+        if position < len(self.date_index) and self.date_index[position] == key:
+            del self.date_index[position]
+
+    # Bills
+
+    def load_bills(self, bills):
+        # Takes all bills at once (a dict, or snapshot.BillTable) into a
+        # store that holds none yet
+        self.bills = bills
+
+    def add_bill(self, bill):
+        # One bill per consignment; billing it again replaces the old bill
+        self.bills[bill["consignment_number"]] = bill
+        self.mark_changed("bills", bill["consignment_number"], bill)
+
+    def get_bill(self, consignment_number):
+        return self.bills.get(consignment_number)
+
+    def delete_bill(self, consignment_number):
+        bill = self.bills.pop(consignment_number, None)
+        if bill is not None:
+            self.mark_changed("bills", consignment_number, None)
+        return bill
+
+    # Changes saved by other processes
+
+    def merge(self, collection, records, complete=False, keep=()):
+        # Applies records another process saved (key -> record, or None when
+        # deleted) through the usual methods, so indexes and listeners stay
+        # in step, but without marking them as changed here. Records changed
+        # here and not saved yet, or listed in keep, win over the other
+        # process's. With complete, records is the whole collection and
+        # anything missing from it was deleted.
+        current = {"customers": self.customers, "parcels": self.parcels, "bills": self.bills}[collection]
+        add, delete = {
+            "customers": (self.add_customer, self.delete_customer),
+            "parcels": (self.add_parcel, self.delete_parcel),
+            "bills": (self.add_bill, self.delete_bill),
+        }[collection]
+        if complete:
+            records = {**{key: None for key in current if key not in records}, **records}
+        pending = self.changes[collection]
+        for key, record in records.items():
+            if key in pending or key in keep or current.get(key) == record:
+                continue
+            if record is None:
+                delete(key)
+            else:
+                add(record)
+            pending.pop(key, None)
+
+    def clear_parcels_and_bills(self):
+        # The caller is expected to rewrite the parcel and bill files in full
+        self.changes.pop("parcels", None)
+        self.changes.pop("bills", None)
+        self.parcels.clear()
+        self.bills = {}
+        self.parcels_by_consignment.clear()
+        self.parcels_by_customer.clear()
+        self.date_index = array('q')
+        self._notify("cleared")
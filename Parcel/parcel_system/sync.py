@@ -0,0 +1,41 @@
+from .storage import get_storage
+from .users import merge_remote_users
+
+# Collections held in the store, in the order they are saved
+STORE_COLLECTIONS = ("customers", "parcels", "bills")
+
+# collection -> (allocator key in the system, record field, number prefix)
+ALLOCATED_FIELDS = {
+    "customers": [("customer_allocator", "id", '')],
+    "parcels": [("parcel_allocator", "parcel_number", 'P'), ("consignment_allocator", "consignment_number", '')],
+}
+
+
+def merge_remote(system, collection, remote, written=()):
+    # Folds what other terminals saved (journal.RemoteChanges) into this
+    # process's store, counters and number allocators. Keys in written were
+    # just saved by this process after the others, so its own records win.
+    if not remote.records and not remote.meta:
+        return
+    system["store"].merge(collection, remote.records, remote.complete, keep=written)
+    for field, value in remote.meta.items():
+        system[field] = max(system[field], value)
+
+    for allocator_key, field, prefix in ALLOCATED_FIELDS.get(collection, ()):
+        allocator = system.get(allocator_key)
+        if allocator is None:
+            continue
+        for record in remote.records.values():
+            value = str(record[field]) if record else ''
+            if value.startswith(prefix) and value[len(prefix):].isdigit():
+                allocator.mark_issued(int(value[len(prefix):]))
+
+
+def sync_system(system):
+    # Picks up what other terminals saved since this one last looked. Never
+    # locks, and costs one small read per data file when nothing changed.
+    if system.is_loaded("users"):
+        merge_remote_users(system, get_storage("users").refresh())
+    if system.is_loaded("store"):
+        for collection in STORE_COLLECTIONS:
+            merge_remote(system, collection, get_storage(collection).refresh())
@@ -0,0 +1,80 @@
+from .auth import UserRegistry
+from .billing import load_bills_from_file
+from .customers import load_customers_from_file
+from .directory import UserDirectory
+from .numbering import FIRST_NUMBER
+from .parcels import load_parcels_from_file, reserve_number_blocks
+from . import storage
+from .rollups import RevenueRollup
+from .search import CustomerSearch
+from .sessions import SessionManager
+from .sqlite_store import SQLiteRollup, SQLiteStore
+from .store import ParcelStore
+from .users import load_users_from_file
+
+
+class System(dict):
+    # The system dict, with parts of the data loaded on first access:
+    # system["users"] reads only the users file, and system["store"] reads
+    # the customer, parcel and bill files. Keys already set are plain dict
+    # lookups.
+    def __init__(self, loaders=None, **values):
+        super().__init__(values)
+        self.loaders = dict(loaders or {})
+
+    def __missing__(self, key):
+        loader = self.loaders.get(key)
+        if loader is None:
+            raise KeyError(key)
+        # A loader fills in several keys; none of them load again
+        for name in [name for name, other in self.loaders.items() if other is loader]:
+            del self.loaders[name]
+        loader(self)
+        return self[key]
+
+    def is_loaded(self, key):
+        return key not in self.loaders
+
+
+def new_store(system, database=None):
+    # With the SQLite backend's database, parcels and bills are queried from
+    # it instead of held in memory (see sqlite_store.py)
+    if database:
+        store = SQLiteStore(database)
+        rollups = SQLiteRollup(store)
+    else:
+        store = ParcelStore()
+        rollups = RevenueRollup()
+    customer_search = CustomerSearch(store)
+    store.listeners.extend([rollups, customer_search])
+    system["store"] = store  # Customers, parcels and bills with their indexes
+    system["rollups"] = rollups  # Revenue per day, zone and customer, kept up to date by the store
+    system["customer_search"] = customer_search  # Name and telephone index, also kept up to date by the store
+    system["current_customer_id"] = 1
+    system["current_consignment_number"] = FIRST_NUMBER
+    system["current_parcel_number"] = FIRST_NUMBER
+
+def load_records(system):
+    new_store(system, storage.get_database())
+    load_customers_from_file(system)
+    load_parcels_from_file(system)
+    load_bills_from_file(system)
+    reserve_number_blocks(system, storage.number_block_size())
+
+USER_KEYS = ["users", "auth", "user_changes"]
+RECORD_KEYS = ["store", "rollups", "customer_search", "current_customer_id", "current_consignment_number", "current_parcel_number"]
+
+def initialize_system():
+    # An empty system that never reads the data files
+    system = System(current_user=None, current_bill_id=1, user_changes={}, sessions=SessionManager())
+    system["users"] = UserDirectory()  # Users by stable user ID, with a set of IDs per role
+    system["auth"] = UserRegistry()  # Users keyed by username, with hashed passwords
+    new_store(system)
+    return system
+
+def load_system():
+    # A system that reads each data file the first time it is needed, so
+    # start-up costs the same however much data there is
+    loaders = dict.fromkeys(USER_KEYS, load_users_from_file)
+    loaders.update(dict.fromkeys(RECORD_KEYS, load_records))
+    return System(loaders, current_user=None, current_bill_id=1, sessions=SessionManager())
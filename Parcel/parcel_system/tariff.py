@@ -0,0 +1,155 @@
+from bisect import bisect_right
+from datetime import date, datetime
+from functools import lru_cache
+
+from .pricing_engine import NO_PRICE, PricingEngine, ZoneRate, format_price, parse_price
+
+# Effective date of a tariff converted from the old pricing table, which
+# had no dates: it covers every parcel and bill on file
+FIRST_DAY = date(1, 1, 1)
+
+# Weight bands of the old pricing table: below 1kg, 1kg to 3kg, above 3kg
+LEGACY_LIMITS = [("below", 1.0), ("up_to", 3.0)]
+
+
+@lru_cache(maxsize=4096)
+def parse_day(text):
+    # Parcel dates are YYYY-MM-DD and bill dates DD/MM/YYYY
+    if isinstance(text, date):
+        return text
+    for layout in ("%Y-%m-%d", "%d/%m/%Y"):
+        try:
+            return datetime.strptime(text, layout).date()
+        except ValueError:
+            pass
+    raise ValueError(f"not a date: {text!r}")
+
+
+class TariffVersion:
+    # The zone rates in force from `effective` until the next version starts
+    def __init__(self, effective, rates):
+        self.effective = effective
+        self.zones = {}
+        for rate in rates:
+            self.zones.setdefault(rate.zone, rate)
+        self._engine = None
+
+    def engine(self):
+        # Compiled on first use; edits through Tariff drop it
+        if self._engine is None:
+            self._engine = PricingEngine(self.zones.values())
+        return self._engine
+
+    def copy(self, effective):
+        return TariffVersion(effective, [rate.copy() for rate in self.zones.values()])
+
+
+class Tariff:
+    # Effective-dated versions of the zone rates, kept in date order. The
+    # version in force on a day is found with one bisect over the versions'
+    # day numbers, so pricing a parcel or bill from any date costs the same
+    # as pricing one from today.
+    def __init__(self, versions):
+        self.versions = sorted(versions, key=lambda version: version.effective)
+        self.days = [version.effective.toordinal() for version in self.versions]
+
+    def position(self, day):
+        # Index of the version in force on day, or -1 before the first one
+        return bisect_right(self.days, parse_day(day).toordinal()) - 1
+
+    def in_force(self, day):
+        position = self.position(day)
+        return self.versions[position] if position >= 0 else None
+
+    def latest(self):
+        return self.versions[-1] if self.versions else None
+
+    def edit(self, day):
+        # The version starting on day, for changing prices from that day on.
+        # Unless one already starts then, the version in force is copied to
+        # start on day, so parcels and bills from before keep their prices.
+        day = parse_day(day)
+        position = self.position(day)
+        if position >= 0 and self.versions[position].effective == day:
+            version = self.versions[position]
+            version._engine = None
+            return version
+        current = self.versions[position] if position >= 0 else TariffVersion(day, [])
+        version = current.copy(day)
+        self.versions.insert(position + 1, version)
+        self.days.insert(position + 1, day.toordinal())
+        return version
+
+
+def tariff_from_table(table_price):
+    # The old pricing table (rows of zone, below 1kg, 1-3kg, above 3kg) as
+    # a single version in force from FIRST_DAY
+    rates = [ZoneRate(row[0], LEGACY_LIMITS, [stored_price_to_sen(price) for price in row[1:4]]) for row in table_price]
+    return Tariff([TariffVersion(FIRST_DAY, rates)])
+
+
+def price_to_sen(price):
+    # 'RM8.00' -> 800, and '' (no price) -> NO_PRICE; raises ValueError for
+    # anything else, so a mistyped price is never taken as "no price"
+    if price is None or not str(price).strip():
+        return NO_PRICE
+    sen = parse_price(price)
+    if sen is None:
+        raise ValueError(f"not a price: {price!r}")
+    return sen
+
+
+def stored_price_to_sen(price):
+    # price_to_sen for prices read from the pricing file, where older
+    # versions kept whatever was typed: those count as no price
+    sen = parse_price(price)
+    return NO_PRICE if sen is None else sen
+
+
+def sen_to_price(sen):
+    return '' if sen == NO_PRICE else format_price(sen)
+
+
+# pricing.json holds {"tariffs": [version, ...]} with each version as
+#   {"effective": "2024-01-01", "zones": [
+#       {"zone": "Zone A",
+#        "bands": [{"below": 1, "price": "RM8.00"}, {"up_to": 3, "price": "RM16.00"}, {"price": "RM18.00"}],
+#        "surcharge": {"above": 30, "per_kg": "RM1.00"}}]}
+# "surcharge" is optional. A plain list is the old pricing table.
+
+def tariff_from_json(data):
+    if isinstance(data, list):
+        return tariff_from_table(data)
+    versions = []
+    for version in data["tariffs"]:
+        rates = []
+        for zone in version["zones"]:
+            bands = zone["bands"]
+            limits = []
+            for band in bands[:-1]:
+                kind = "below" if "below" in band else "up_to"
+                limits.append((kind, float(band[kind])))
+            surcharge = zone.get("surcharge")
+            if surcharge:
+                per_kg = parse_price(surcharge["per_kg"])
+                if per_kg is None:
+                    raise ValueError(f"{zone['zone']}: bad surcharge {surcharge['per_kg']!r}")
+                surcharge = (float(surcharge["above"]), per_kg)
+            rates.append(ZoneRate(zone["zone"], limits, [stored_price_to_sen(band["price"]) for band in bands], surcharge))
+        versions.append(TariffVersion(parse_day(version["effective"]), rates))
+    return Tariff(versions)
+
+
+def tariff_to_json(tariff):
+    versions = []
+    for version in tariff.versions:
+        zones = []
+        for rate in version.zones.values():
+            bands = [{kind: kg, "price": sen_to_price(price)} for (kind, kg), price in zip(rate.limits, rate.prices)]
+            bands.append({"price": sen_to_price(rate.prices[-1])})
+            zone = {"zone": rate.zone, "bands": bands}
+            if rate.surcharge:
+                zone["surcharge"] = {"above": rate.surcharge[0], "per_kg": sen_to_price(rate.surcharge[1])}
+            zones.append(zone)
+        versions.append({"effective": version.effective.isoformat(), "zones": zones})
+    return {"tariffs": versions}
@@ -0,0 +1,156 @@
+from contextlib import nullcontext
+
+from .auth import UserRegistry, hash_password
+from .directory import DEFAULT_ROLE, ROLE_CAPABILITIES, UserDirectory
+from .storage import get_storage
+
+# User management functions
+
+def open_session(system, username, password, lock=None, **context):
+    # A new session in system["sessions"] for the user, or None when the
+    # password is wrong. Many sessions can be open at once; context (e.g.
+    # terminal or client address) goes into the session's audit entries.
+    # lock (the caller's lock on the system) is held to load the users, to
+    # save an upgraded hash and to register the session, but not while the
+    # password is checked, which is slow on purpose.
+    lock = lock or nullcontext()
+    with lock:
+        registry = system["auth"]
+    user, upgraded = registry.authenticate(username, password)
+    if user is None:
+        return None
+    with lock:
+        if upgraded:
+            # Old plaintext password replaced by its hash
+            mark_user_changed(system, username, user)
+            save_users_to_file(system)
+        return system["sessions"].open(user, **context)
+
+def login(system, username, password, **context):
+    # open_session for the interactive menus, where one person at a time
+    # uses the terminal as system["current_user"]
+    session = open_session(system, username, password, **context)
+    if session is not None:
+        system["current_user"] = session.user
+    return session
+
+def logout(system, session):
+    system["sessions"].close(session.token)
+    if system.get("current_user") is session.user:
+        system["current_user"] = None
+
+def mark_user_changed(system, username, user):
+    # Users are tracked apart from the store, so managing them never loads
+    # the customer, parcel and bill files
+    system["user_changes"][username] = user
+
+def add_user(system, username, password, role=DEFAULT_ROLE):
+    # Returns the new user, or None when the username is taken or the role
+    # is unknown
+    role = role or DEFAULT_ROLE
+    if role not in ROLE_CAPABILITIES:
+        print(f"Invalid role! Choose one of: {', '.join(ROLE_CAPABILITIES)}")
+        return None
+    if username in system["users"]:
+        print("Username already exists!")
+        return None
+    # Hashed at the registry's cost, the same one logins check and upgrade with
+    user = {"username": username, "password": hash_password(password, system["auth"].iterations), "role": role}
+    system["users"].add(user)
+    system["auth"].add(user)
+    mark_user_changed(system, username, user)
+    return user
+
+def set_roles(system, user_ids, role):
+    # Gives every user in user_ids the role; the changes are saved together
+    # by the next save_users_to_file. Returns how many users changed.
+    directory = system["users"]
+    changed = 0
+    for user_id in user_ids:
+        user = directory.get(user_id)
+        if user is None:
+            print(f"Invalid user ID: {user_id}")
+        elif _is_current(system, user):
+            print("You cannot change your own role.")
+        elif directory.set_role(user_id, role):
+            mark_user_changed(system, user["username"], user)
+            print(f"{user['username']} is now {role}.")
+            changed += 1
+        else:
+            print(f"{user['username']} is already {role}.")
+    return changed
+
+def assign_admin_role(system, user_ids):
+    return set_roles(system, user_ids, "administrator")
+
+def remove_admin_role(system, user_ids):
+    return set_roles(system, user_ids, "operator")
+
+def delete_users(system, user_ids):
+    # Returns how many users were deleted
+    deleted = 0
+    for user_id in user_ids:
+        user = system["users"].get(user_id)
+        if user is None:
+            print(f"Invalid user ID: {user_id}")
+            continue
+        if _is_current(system, user):
+            print("You cannot delete yourself.")
+            continue
+        system["users"].remove(user["username"])
+        system["auth"].remove(user["username"])
+        mark_user_changed(system, user["username"], None)
+        print(f"{user['username']} deleted.")
+        deleted += 1
+    return deleted
+
+def _is_current(system, user):
+    # Administrators cannot lock themselves out
+    current = system.get("current_user")
+    return current is not None and current["username"] == user["username"]
+
+def get_users_by_role(system, role):
+    # Ordered by user ID, from the directory's set of the role's users
+    return system["users"].in_role(role)
+
+def save_users_to_file(system, compact=False):
+    storage = get_storage("users")
+    changes = system["user_changes"]
+    system["user_changes"] = {}
+    if compact:
+        storage.compact(system["users"].users())
+    else:
+        merge_remote_users(system, storage.append(changes), written=changes)
+
+def merge_remote_users(system, remote, written=()):
+    # Applies users added, changed or deleted by other terminals
+    # (journal.RemoteChanges); unsaved or just-written changes here win
+    records = remote.records
+    if not records:
+        return
+    directory = system["users"]
+    if remote.complete:
+        records = {**{username: None for username in directory.ids if username not in records}, **records}
+    for username, user in records.items():
+        if username in system["user_changes"] or username in written:
+            continue
+        if user is None:
+            directory.remove(username)
+            system["auth"].remove(username)
+        elif directory.find(username) != user:
+            for renumbered in directory.add(user):
+                mark_user_changed(system, renumbered["username"], renumbered)
+            system["auth"].add(user)
+
+def load_users_from_file(system):
+    system["users"] = UserDirectory()  # Users by stable user ID, with a set of IDs per role
+    system["auth"] = UserRegistry()  # Users keyed by username, with hashed passwords
+    system["user_changes"] = {}
+    try:
+        records = get_storage("users").load()
+    except FileNotFoundError:
+        return
+    # Users from before there were user IDs keep the ones given here once saved
+    for user in system["users"].load(records):
+        mark_user_changed(system, user["username"], user)
+    system["auth"] = UserRegistry(system["users"].users())